@@ -0,0 +1,86 @@
+"""
+Compares the bytes on the wire and the CPU cost of compressing contact lists of different page sizes::
+
+    python benchmarks/compression.py --pages 10 100 1000 10000
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import date, timedelta
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NAMES = ["Olena", "Ivan", "Nikita", "Olya", "Boris", "Maria", "Taras", "Iryna"]
+SURNAMES = ["Ivanov", "Petrenko", "Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko"]
+DOMAINS = ["gmail.com", "ukr.net", "yahoo.com", "outlook.com"]
+
+
+def contacts_page(size: int, rng: random.Random) -> bytes:
+    """
+    Builds the JSON body of a contact list like the one returned by /api/contacts/.
+
+    :param size: Number of contacts.
+    :type size: int
+    :param rng: Random number generator.
+    :type rng: random.Random
+    :return: JSON body.
+    :rtype: bytes
+    """
+    contacts = []
+    for contact_id in range(1, size + 1):
+        name, surname = rng.choice(NAMES), rng.choice(SURNAMES)
+        contacts.append({
+            "name": name,
+            "surname": surname,
+            "phone_number": f"+380{rng.randrange(10 ** 8, 10 ** 9)}",
+            "id": contact_id,
+            "email": f"{name.lower()}.{surname.lower()}{rng.randrange(100)}@{rng.choice(DOMAINS)}",
+            "birthday": (date(1960, 1, 1) + timedelta(days=rng.randrange(20000))).isoformat(),
+        })
+    return json.dumps(contacts).encode()
+
+
+def measure(compress, body: bytes, repeat: int) -> tuple:
+    """
+    Compresses the body several times.
+
+    :param compress: Compression function.
+    :type compress: Callable[[bytes], bytes]
+    :param body: Body to compress.
+    :type body: bytes
+    :param repeat: Number of repetitions.
+    :type repeat: int
+    :return: Compressed size in bytes and CPU time per compression in milliseconds.
+    :rtype: tuple
+    """
+    started = time.process_time()
+    for _ in range(repeat):
+        compressed = compress(body)
+    return len(compressed), (time.process_time() - started) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    codecs = {f"gzip-{level}": (lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0))
+              for level in (1, 6, 9)}
+    if brotli is not None:
+        codecs.update({f"br-{quality}": (lambda body, quality=quality: brotli.compress(body, quality=quality))
+                       for quality in (1, 4, 11)})
+
+    print(f"{'contacts':>8} {'codec':>8} {'bytes':>10} {'ratio':>6} {'cpu ms':>8}")
+    for page in args.pages:
+        body = contacts_page(page, random.Random(args.seed))
+        print(f"{page:>8} {'none':>8} {len(body):>10} {1:>6.2f} {0:>8.3f}")
+        repeat = max(3, 20000 // page)
+        for name, compress in codecs.items():
+            size, cpu = measure(compress, body, repeat)
+            print(f"{page:>8} {name:>8} {size:>10} {len(body) / size:>6.2f} {cpu:>8.3f}")
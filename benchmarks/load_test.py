@@ -0,0 +1,84 @@
+"""
+Closed-loop load test for a running server.
+
+Start the server with a different number of workers and compare the throughput::
+
+    WEB_CONCURRENCY=1 python -m src.server
+    python benchmarks/load_test.py --url http://localhost:8000 --path /api/contacts/ --token <access token>
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, path: str, deadline: float, latencies: list, errors: list) -> None:
+    """
+    Sends requests one after another until the deadline.
+
+    :param client: HTTP client.
+    :type client: httpx.AsyncClient
+    :param path: Requested path.
+    :type path: str
+    :param deadline: Time when the test stops.
+    :type deadline: float
+    :param latencies: Collected latencies of successful requests.
+    :type latencies: list
+    :param errors: Collected status codes of failed requests.
+    :type errors: list
+    :return: None.
+    :rtype: None
+    """
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get(path)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(response.status_code)
+
+
+async def run(url: str, path: str, token: str | None, concurrency: int, duration: float) -> None:
+    """
+    Runs the load test and prints the throughput and latency percentiles.
+
+    :param url: Base url of the server.
+    :type url: str
+    :param path: Requested path.
+    :type path: str
+    :param token: Access token sent as a bearer token.
+    :type token: str | None
+    :param concurrency: Number of concurrent connections.
+    :type concurrency: int
+    :param duration: Test duration in seconds.
+    :type duration: float
+    :return: None.
+    :rtype: None
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(worker(client, path, deadline, latencies, errors) for _ in range(concurrency)))
+    if not latencies:
+        print(f"no successful requests, errors: {len(errors)}")
+        return
+    latencies.sort()
+    print(f"requests/s: {len(latencies) / duration:.1f}")
+    print(f"p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"errors: {len(errors)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/contacts/")
+    parser.add_argument("--token")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.path, args.token, args.concurrency, args.duration))
@@ -0,0 +1,68 @@
+"""
+Measures the cold start of the application: the time to import ``src.main`` and the time until
+the first response is served. Every sample runs in a fresh interpreter::
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import src.main
+print(time.perf_counter() - started)
+"""
+
+FIRST_RESPONSE_SNIPPET = """
+import time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+from src.main import app
+response = TestClient(app).get("/openapi.json")
+assert response.status_code == 200, response.text
+print(time.perf_counter() - started)
+"""
+
+
+def sample(snippet: str, runs: int) -> list:
+    """
+    Runs the snippet in fresh interpreters and collects the printed timings.
+
+    :param snippet: Python code printing a duration in seconds.
+    :type snippet: str
+    :param runs: Number of interpreters to start.
+    :type runs: int
+    :return: Durations in seconds.
+    :rtype: list
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", snippet], check=True, capture_output=True, text=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    """
+    Prints the median and the best of the collected timings.
+
+    :param name: Name of the measurement.
+    :type name: str
+    :param timings: Durations in seconds.
+    :type timings: list
+    :return: None.
+    :rtype: None
+    """
+    print(f"{name}: median {statistics.median(timings) * 1000:.0f} ms, best {min(timings) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    report("import src.main", sample(IMPORT_SNIPPET, args.runs))
+    report("time to first response", sample(FIRST_RESPONSE_SNIPPET, args.runs))
@@ -0,0 +1,59 @@
+"""
+Measures the wall time of the test suite, serially and with pytest-xdist workers, and keeps a history
+of the timings so a slowdown of the suite shows up like any other regression::
+
+    python benchmarks/test_suite.py --workers 0 4 --runs 3 --history benchmarks/test_suite.jsonl
+
+With ``--budget`` the script fails when the serial median is slower than the given number of seconds.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def sample(workers: int, runs: int) -> list:
+    """
+    Runs the whole suite several times in fresh interpreters.
+
+    :param workers: Number of pytest-xdist workers, 0 runs the suite in a single process.
+    :type workers: int
+    :param runs: Number of runs.
+    :type runs: int
+    :return: Wall time of every run in seconds.
+    :rtype: list
+    """
+    command = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider"]
+    if workers:
+        command += ["-n", str(workers)]
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True)
+        timings.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            sys.exit(f"The test suite has failed:\n{result.stdout[-2000:]}")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--history", help="JSON lines file the medians are appended to")
+    parser.add_argument("--budget", type=float, help="Fail when the serial median exceeds it, in seconds")
+    args = parser.parse_args()
+    medians = {}
+    for workers in args.workers:
+        timings = sample(workers, args.runs)
+        medians[workers] = statistics.median(timings)
+        print(f"{workers or 'no'} workers: median {medians[workers]:.2f} s, best {min(timings):.2f} s")
+    if args.history:
+        with open(args.history, "a") as history:
+            history.write(json.dumps({"at": datetime.now().isoformat(timespec="seconds"),
+                                      "medians": {str(workers): median for workers, median in medians.items()}}) + "\n")
+    if args.budget is not None and medians.get(0, 0) > args.budget:
+        sys.exit(f"The serial run took {medians[0]:.2f} s, over the budget of {args.budget:.2f} s")
@@ -0,0 +1,54 @@
+"""Normalized email and phone keys of contacts
+
+Revision ID: 3c9e1f0a7b21
+Revises: 5f35d99924f8
+Create Date: 2026-10-19 10:12:41.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.services.normalize import normalize_email, normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f0a7b21'
+down_revision = '5f35d99924f8'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('email_key', sa.String(length=100), nullable=True))
+    op.add_column('contacts', sa.Column('phone_key', sa.String(length=20), nullable=True))
+
+    contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('email', sa.String),
+                        sa.column('phone_number', sa.String), sa.column('email_key', sa.String),
+                        sa.column('phone_key', sa.String))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contacts.c.id, contacts.c.email, contacts.c.phone_number)
+            .where(contacts.c.id > last_id).order_by(contacts.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            contacts.update().where(contacts.c.id == sa.bindparam('contact_id')),
+            [{'contact_id': row.id, 'email_key': normalize_email(row.email),
+              'phone_key': normalize_phone(row.phone_number)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_contacts_user_id_email_key', 'contacts', ['user_id', 'email_key'])
+    op.create_index('ix_contacts_user_id_phone_key', 'contacts', ['user_id', 'phone_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_phone_key', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_email_key', table_name='contacts')
+    op.drop_column('contacts', 'phone_key')
+    op.drop_column('contacts', 'email_key')
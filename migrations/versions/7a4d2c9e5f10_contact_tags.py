@@ -0,0 +1,41 @@
+"""Tags of contacts
+
+Revision ID: 7a4d2c9e5f10
+Revises: 3c9e1f0a7b21
+Create Date: 2026-10-19 12:40:07.918263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4d2c9e5f10'
+down_revision = '3c9e1f0a7b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=25), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'name', name='uq_tags_user_id_name')
+    )
+    op.create_table('contact_tags',
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('contact_id', 'tag_id')
+    )
+    op.create_index('ix_contact_tags_tag_id', 'contact_tags', ['tag_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_tags_tag_id', table_name='contact_tags')
+    op.drop_table('contact_tags')
+    op.drop_table('tags')
@@ -0,0 +1,53 @@
+"""Email domain and creation time of contacts
+
+Revision ID: 9b1e4f2d6c83
+Revises: 7a4d2c9e5f10
+Create Date: 2026-10-19 14:05:52.614730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.services.normalize import email_domain
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1e4f2d6c83'
+down_revision = '7a4d2c9e5f10'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('email_domain', sa.String(length=100), nullable=True))
+    # The creation time of the existing contacts is unknown, they are left out of the weekly statistics.
+    op.add_column('contacts', sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('email', sa.String),
+                        sa.column('email_domain', sa.String))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contacts.c.id, contacts.c.email)
+            .where(contacts.c.id > last_id).order_by(contacts.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            contacts.update().where(contacts.c.id == sa.bindparam('contact_id')),
+            [{'contact_id': row.id, 'email_domain': email_domain(row.email)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_contacts_user_id_email_domain', 'contacts', ['user_id', 'email_domain'])
+    op.create_index('ix_contacts_user_id_created_at', 'contacts', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_created_at', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_email_domain', table_name='contacts')
+    op.drop_column('contacts', 'created_at')
+    op.drop_column('contacts', 'email_domain')
@@ -0,0 +1,56 @@
+"""Expiry of refresh tokens and indexes of the maintenance job
+
+Revision ID: a7e2c5f9d1b4
+Revises: f1c8d4a7b3e9
+Create Date: 2026-10-19 21:12:36.904517
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.repository.users import token_expiry
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e2c5f9d1b4'
+down_revision = 'f1c8d4a7b3e9'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('refresh_token_expires_at', sa.DateTime(), nullable=True))
+
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('refresh_token', sa.String),
+                     sa.column('refresh_token_expires_at', sa.DateTime))
+    connection = op.get_bind()
+    now = datetime.utcnow()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(users.c.id, users.c.refresh_token)
+            .where(users.c.id > last_id).where(users.c.refresh_token.isnot(None))
+            .order_by(users.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        # A token without a readable expiry is treated as expired and cleared by the next maintenance run.
+        connection.execute(
+            users.update().where(users.c.id == sa.bindparam('user_id')),
+            [{'user_id': row.id, 'refresh_token_expires_at': token_expiry(row.refresh_token) or now}
+             for row in rows],
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_users_confirmed_crated_at', 'users', ['confirmed', 'crated_at'])
+    op.create_index('ix_users_refresh_token_expires_at', 'users', ['refresh_token_expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_refresh_token_expires_at', table_name='users')
+    op.drop_index('ix_users_confirmed_crated_at', table_name='users')
+    op.drop_column('users', 'refresh_token_expires_at')
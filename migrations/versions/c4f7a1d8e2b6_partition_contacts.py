@@ -0,0 +1,90 @@
+"""Hash partitioning of contacts by user_id
+
+Revision ID: c4f7a1d8e2b6
+Revises: 9b1e4f2d6c83
+Create Date: 2026-10-19 15:31:08.207413
+
+Every query of the contacts repository is scoped by user_id, so on Postgres the contacts table is turned
+into a table partitioned by hash of user_id and the planner reads a single partition per request.
+The ORM model is not changed. On other databases the migration does nothing.
+
+The rows are copied into the new table in one statement, run it in a maintenance window.
+A primary key of a partitioned table must contain the partition key, so it becomes (user_id, id)
+and contact_tags can no longer reference contacts.id by a foreign key; the ORM removes the tags
+of a removed contact, and the tags of removed users are removed by the tags.user_id cascade.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f7a1d8e2b6'
+down_revision = '9b1e4f2d6c83'
+branch_labels = None
+depends_on = None
+
+PARTITIONS = 16
+
+INDEXES = {
+    'ix_contacts_user_id_email_key': ['user_id', 'email_key'],
+    'ix_contacts_user_id_phone_key': ['user_id', 'phone_key'],
+    'ix_contacts_user_id_email_domain': ['user_id', 'email_domain'],
+    'ix_contacts_user_id_created_at': ['user_id', 'created_at'],
+}
+
+
+def move_sequence(connection, old_table: str) -> None:
+    sequence = connection.execute(sa.text(f"SELECT pg_get_serial_sequence('{old_table}', 'id')")).scalar()
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY contacts.id")
+
+
+def create_indexes() -> None:
+    op.create_foreign_key('contacts_user_id_fkey', 'contacts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'contacts', columns)
+    op.execute("ANALYZE contacts")
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        return
+    orphans = connection.execute(sa.text("SELECT count(*) FROM contacts WHERE user_id IS NULL")).scalar()
+    if orphans:
+        raise RuntimeError(f"{orphans} contacts have no user, remove them before partitioning by user_id")
+
+    op.drop_constraint('contact_tags_contact_id_fkey', 'contact_tags', type_='foreignkey')
+    op.rename_table('contacts', 'contacts_heap')
+    op.execute("CREATE TABLE contacts (LIKE contacts_heap INCLUDING DEFAULTS) PARTITION BY HASH (user_id)")
+    for remainder in range(PARTITIONS):
+        op.execute(f"CREATE TABLE contacts_p{remainder} PARTITION OF contacts "
+                   f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})")
+    op.execute("INSERT INTO contacts SELECT * FROM contacts_heap")
+    move_sequence(connection, 'contacts_heap')
+    op.drop_table('contacts_heap')
+
+    op.create_primary_key('contacts_pkey', 'contacts', ['user_id', 'id'])
+    # The ORM updates and removes contacts by id alone, this index keeps those a probe per partition.
+    op.create_index('ix_contacts_id', 'contacts', ['id'])
+    create_indexes()
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        return
+
+    op.rename_table('contacts', 'contacts_partitioned')
+    op.execute("CREATE TABLE contacts (LIKE contacts_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO contacts SELECT * FROM contacts_partitioned")
+    move_sequence(connection, 'contacts_partitioned')
+    op.drop_table('contacts_partitioned')
+
+    op.create_primary_key('contacts_pkey', 'contacts', ['id'])
+    op.alter_column('contacts', 'user_id', existing_type=sa.Integer(), nullable=True)
+    create_indexes()
+    op.execute("DELETE FROM contact_tags WHERE contact_id NOT IN (SELECT id FROM contacts)")
+    op.create_foreign_key('contact_tags_contact_id_fkey', 'contact_tags', 'contacts', ['contact_id'], ['id'],
+                          ondelete='CASCADE')
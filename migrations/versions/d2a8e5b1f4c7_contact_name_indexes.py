@@ -0,0 +1,25 @@
+"""Indexes of contacts by name and surname
+
+Revision ID: d2a8e5b1f4c7
+Revises: c4f7a1d8e2b6
+Create Date: 2026-10-19 16:48:23.590114
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8e5b1f4c7'
+down_revision = 'c4f7a1d8e2b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_user_id_name', 'contacts', ['user_id', 'name'])
+    op.create_index('ix_contacts_user_id_surname', 'contacts', ['user_id', 'surname'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_surname', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_name', table_name='contacts')
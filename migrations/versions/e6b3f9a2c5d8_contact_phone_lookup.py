@@ -0,0 +1,52 @@
+"""E.164 phone numbers of contacts and their lookup index
+
+Revision ID: e6b3f9a2c5d8
+Revises: d2a8e5b1f4c7
+Create Date: 2026-10-19 18:21:07.402815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.services.normalize import phone_e164, phone_reversed
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3f9a2c5d8'
+down_revision = 'd2a8e5b1f4c7'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('phone_e164', sa.String(length=16), nullable=True))
+    op.add_column('contacts', sa.Column('phone_reversed', sa.String(length=15), nullable=True))
+
+    contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('phone_number', sa.String),
+                        sa.column('phone_e164', sa.String), sa.column('phone_reversed', sa.String))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contacts.c.id, contacts.c.phone_number)
+            .where(contacts.c.id > last_id).order_by(contacts.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            contacts.update().where(contacts.c.id == sa.bindparam('contact_id')),
+            [{'contact_id': row.id, 'phone_e164': phone_e164(row.phone_number),
+              'phone_reversed': phone_reversed(row.phone_number)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    # Built after the backfill, so the rows are not indexed one update at a time.
+    op.create_index('ix_contacts_user_id_phone_reversed', 'contacts', ['user_id', 'phone_reversed'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_phone_reversed', table_name='contacts')
+    op.drop_column('contacts', 'phone_reversed')
+    op.drop_column('contacts', 'phone_e164')
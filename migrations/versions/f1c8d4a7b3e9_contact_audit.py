@@ -0,0 +1,33 @@
+"""Audit log of contact changes
+
+Revision ID: f1c8d4a7b3e9
+Revises: e6b3f9a2c5d8
+Create Date: 2026-10-19 19:37:44.158302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c8d4a7b3e9'
+down_revision = 'e6b3f9a2c5d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('contact_audit',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_audit_user_id_contact_id_id', 'contact_audit', ['user_id', 'contact_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_audit_user_id_contact_id_id', table_name='contact_audit')
+    op.drop_table('contact_audit')
@@ -1,5 +1,11 @@
+from datetime import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
 from pydantic import BaseSettings
 
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
 
 class Settings(BaseSettings):
     """
@@ -7,6 +13,12 @@ class Settings(BaseSettings):
 
     :param sqlalchemy_database_url: Url of our database.
     :type sqlalchemy_database_url: str
+    :param sqlalchemy_replica_urls: Urls of the read replicas of our database, as a JSON list.
+    :type sqlalchemy_replica_urls: List[str]
+    :param replica_ejection_seconds: How long a replica that failed to connect is skipped.
+    :type replica_ejection_seconds: int
+    :param replica_read_after_write_seconds: How long a client reads from the primary after a write.
+    :type replica_read_after_write_seconds: int
     :param secret_key: Secret key.
     :type secret_key: str
     :param algorithm: Encoding algorithm.
@@ -21,12 +33,151 @@ class Settings(BaseSettings):
     :type mail_port: int
     :param mail_server: Mail domain for mailing.
     :type mail_server: str
+    :param statement_timeout: How long a statement of a request may run, in seconds, 0 for no limit.
+    :type statement_timeout: float
+    :param statement_timeouts: Statement timeouts of the routes that differ from statement_timeout,
+        by the name of the route function.
+    :type statement_timeouts: Dict[str, float]
     :param redis_host: Redis host.
     :type redis_host: str
     :param redis_port: Redis port.
     :type redis_port: int
+    :param redis_db: Redis database number.
+    :type redis_db: int
+    :param redis_max_connections: How many connections to Redis the pool of a worker holds at most.
+    :type redis_max_connections: int
+    :param redis_pool_timeout: How long a command waits for a free connection of the pool, in seconds.
+    :type redis_pool_timeout: float
+    :param redis_socket_timeout: How long connecting to Redis and a command may take, in seconds; the pub/sub of
+        the change streams waits for messages without it.
+    :type redis_socket_timeout: float
+    :param redis_health_check_interval: After how many idle seconds a pooled connection is checked before use.
+    :type redis_health_check_interval: int
+    :param idempotency_ttl: How long the response of an idempotent request is kept, in seconds.
+    :type idempotency_ttl: int
+    :param idempotency_lock_timeout: How long a request with the same Idempotency-Key may run, in seconds.
+    :type idempotency_lock_timeout: int
+    :param scheduler_enabled: Whether the worker runs the daily background jobs.
+    :type scheduler_enabled: bool
+    :param birthday_digest_time: Time of day in UTC when the birthday digests are computed.
+    :type birthday_digest_time: time
+    :param maintenance_time: Time of day in UTC when stale users and expired refresh tokens are removed.
+    :type maintenance_time: time
+    :param maintenance_batch_size: How many rows one transaction of the maintenance job changes.
+    :type maintenance_batch_size: int
+    :param maintenance_batch_pause: Pause between the transactions of the maintenance job, in seconds.
+    :type maintenance_batch_pause: float
+    :param unconfirmed_user_max_age_days: After how many days a user who has not confirmed the email is removed.
+    :type unconfirmed_user_max_age_days: int
+    :param birthday_digest_days: How many days ahead the birthday digests look.
+    :type birthday_digest_days: int
+    :param birthday_digest_email: Whether the birthday digests are emailed to the users.
+    :type birthday_digest_email: bool
+    :param birthday_digest_email_batch: How many birthday digests are emailed at once.
+    :type birthday_digest_email_batch: int
+    :param contact_stats_ttl: How long the contact statistics of a user are cached, in seconds.
+    :type contact_stats_ttl: int
+    :param contact_stats_weeks: How many recent weeks the contact statistics count added contacts for.
+    :type contact_stats_weeks: int
+    :param contact_stats_domains: How many of the most frequent email domains the contact statistics list.
+    :type contact_stats_domains: int
+    :param contact_events_queue_size: How many contact changes may wait for a stream before it is reset.
+    :type contact_events_queue_size: int
+    :param contact_events_heartbeat: How often an idle stream of contact changes sends a heartbeat, in seconds.
+    :type contact_events_heartbeat: float
+    :param contact_audit_batch_size: How many audit entries are written to the database at once.
+    :type contact_audit_batch_size: int
+    :param contact_audit_flush_interval: The longest time an audit entry waits to be written, in seconds.
+    :type contact_audit_flush_interval: float
+    :param contact_audit_max_pending: How many audit entries a worker keeps in memory before writes wait for them.
+    :type contact_audit_max_pending: int
+    :param contact_audit_max_wait: How long a write waits for room in the audit buffer before its entries are dropped.
+    :type contact_audit_max_wait: float
+    :param contact_audit_max_attempts: How many times a batch of audit entries is written before it is discarded.
+    :type contact_audit_max_attempts: int
+    :param contact_unindexed_sort_limit: Up to how many contacts a user may sort them in an order no index serves.
+    :type contact_unindexed_sort_limit: int
+    :param contact_import_max_rows: How many contacts one import may contain.
+    :type contact_import_max_rows: int
+    :param contact_import_chunk_size: How many imported contacts are written to the database at once.
+    :type contact_import_chunk_size: int
+    :param phone_country_code: Country code of the national phone numbers, used to bring them to E.164.
+    :type phone_country_code: str
+    :param phone_trunk_prefix: Prefix that is dialed before the national phone numbers, like the 0 of 097 123 45 67.
+    :type phone_trunk_prefix: str
+    :param phone_national_length: Number of digits of a national phone number without the trunk prefix.
+    :type phone_national_length: int
+    :param contact_lookup_min_suffix: The fewest digits that contacts are looked up by the ending of their phone.
+    :type contact_lookup_min_suffix: int
+    :param avatar_storage_dir: Directory where the uploaded avatars are kept.
+    :type avatar_storage_dir: str
+    :param avatar_accel_redirect: Internal nginx location that serves avatar_storage_dir, the avatars are then sent
+        by nginx.
+    :type avatar_accel_redirect: str | None
+    :param avatar_sizes: Side lengths of the rendered avatars, in pixels.
+    :type avatar_sizes: List[int]
+    :param avatar_default_size: Side length of the avatar whose URL is stored for the user.
+    :type avatar_default_size: int
+    :param avatar_max_bytes: The largest avatar upload, in bytes.
+    :type avatar_max_bytes: int
+    :param avatar_max_pixels: The largest avatar image that is decoded, in pixels.
+    :type avatar_max_pixels: int
+    :param avatar_processes: Number of processes that render avatars in a worker.
+    :type avatar_processes: int
+    :param compression_minimum_size: The smallest response body that is compressed, in bytes.
+    :type compression_minimum_size: int
+    :param compression_gzip_level: Gzip compression level from 1 to 9.
+    :type compression_gzip_level: int
+    :param compression_brotli_quality: Brotli quality from 0 to 11.
+    :type compression_brotli_quality: int
+    :param compression_content_types: Content types of the responses that are compressed.
+    :type compression_content_types: List[str]
+    :param compression_exclude_paths: Path prefixes whose responses are never compressed.
+    :type compression_exclude_paths: List[str]
+    :param admission_limit: How many requests a worker processes at once.
+    :type admission_limit: int
+    :param admission_queue_size: How many requests may wait for a worker.
+    :type admission_queue_size: int
+    :param admission_max_wait: How long a request may wait for a worker before it is shed, in seconds.
+    :type admission_max_wait: float
+    :param login_failure_window: How long failed logins are counted, in seconds.
+    :type login_failure_window: int
+    :param login_account_free_failures: Failed logins to an account that are not slowed down.
+    :type login_account_free_failures: int
+    :param login_account_lockout_failures: Failed logins after which an account is locked.
+    :type login_account_lockout_failures: int
+    :param login_ip_free_failures: Failed logins from an IP that are not slowed down.
+    :type login_ip_free_failures: int
+    :param login_ip_lockout_failures: Failed logins after which an IP is locked.
+    :type login_ip_lockout_failures: int
+    :param login_backoff_base: The first block after the free failed logins, in seconds, it doubles with every failure.
+    :type login_backoff_base: float
+    :param login_backoff_max: The longest block before the lockout, in seconds.
+    :type login_backoff_max: float
+    :param login_lockout_seconds: How long a locked account or IP stays locked.
+    :type login_lockout_seconds: int
+    :param login_dummy_verify_rate: How many logins with an unknown email a worker answers as slowly as a wrong
+        password per second.
+    :type login_dummy_verify_rate: float
+    :param admission_retry_after: Retry-After of the shed requests, in seconds.
+    :type admission_retry_after: int
+    :param admission_critical_paths: Path prefixes admitted before all other requests.
+    :type admission_critical_paths: List[str]
+    :param admission_bulk_paths: Path prefixes admitted after all other requests.
+    :type admission_bulk_paths: List[str]
+    :param admission_exclude_paths: Path prefixes that are not limited, like long-lived streams.
+    :type admission_exclude_paths: List[str]
+    :param server_host: Host the production server binds to.
+    :type server_host: str
+    :param server_port: Port the production server binds to.
+    :type server_port: int
+    :param web_concurrency: Number of worker processes started by the production server.
+    :type web_concurrency: int
     """
     sqlalchemy_database_url: str
+    sqlalchemy_replica_urls: List[str] = []
+    replica_ejection_seconds: int = 30
+    replica_read_after_write_seconds: int = 5
     secret_key: str
     algorithm: str
     mail_username: str
@@ -34,8 +185,77 @@ class Settings(BaseSettings):
     mail_from: str
     mail_port: int
     mail_server: str
+    statement_timeout: float = 5
+    statement_timeouts: Dict[str, float] = {"read_contact": 1, "read_batch": 2, "read_batch_post": 2,
+                                            "read_stats": 15, "read_duplicates": 15, "import_contacts": 300,
+                                            "lookup_contacts": 1}
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    redis_db: int = 0
+    redis_max_connections: int = 50
+    redis_pool_timeout: float = 5
+    redis_socket_timeout: float = 5
+    redis_health_check_interval: int = 30
+    idempotency_ttl: int = 24 * 60 * 60
+    idempotency_lock_timeout: int = 30
+    scheduler_enabled: bool = True
+    birthday_digest_time: time = time(6, 0)
+    maintenance_time: time = time(3, 0)
+    maintenance_batch_size: int = 500
+    maintenance_batch_pause: float = 0.05
+    unconfirmed_user_max_age_days: int = 7
+    birthday_digest_days: int = 7
+    birthday_digest_email: bool = False
+    birthday_digest_email_batch: int = 50
+    contact_stats_ttl: int = 10 * 60
+    contact_stats_weeks: int = 12
+    contact_stats_domains: int = 5
+    contact_unindexed_sort_limit: int = 10000
+    contact_import_max_rows: int = 1000000
+    contact_import_chunk_size: int = 10000
+    contact_events_queue_size: int = 100
+    contact_events_heartbeat: float = 15
+    contact_audit_batch_size: int = 500
+    contact_audit_flush_interval: float = 1
+    contact_audit_max_pending: int = 10000
+    contact_audit_max_wait: float = 0.5
+    contact_audit_max_attempts: int = 5
+    phone_country_code: str = "380"
+    phone_trunk_prefix: str = "0"
+    phone_national_length: int = 9
+    contact_lookup_min_suffix: int = 4
+    avatar_storage_dir: str = str(BASE_DIR / "media" / "avatars")
+    avatar_accel_redirect: Optional[str] = None
+    avatar_sizes: List[int] = [64, 128, 256]
+    avatar_default_size: int = 128
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_max_pixels: int = 40_000_000
+    avatar_processes: int = 2
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_content_types: List[str] = ["application/json", "text/csv"]
+    compression_exclude_paths: List[str] = ["/api/auth"]
+    admission_limit: int = 32
+    admission_queue_size: int = 128
+    admission_max_wait: float = 2.0
+    admission_retry_after: int = 1
+    login_failure_window: int = 60 * 60
+    login_account_free_failures: int = 3
+    login_account_lockout_failures: int = 10
+    login_ip_free_failures: int = 20
+    login_ip_lockout_failures: int = 100
+    login_backoff_base: float = 1
+    login_backoff_max: float = 300
+    login_lockout_seconds: int = 15 * 60
+    login_dummy_verify_rate: float = 5
+    admission_critical_paths: List[str] = ["/api/auth/refresh_token"]
+    admission_bulk_paths: List[str] = ["/api/contacts/batch", "/api/contacts/duplicates", "/api/contacts/stats",
+                                       "/api/contacts/import"]
+    admission_exclude_paths: List[str] = ["/api/contacts/stream", "/metrics"]
+    server_host: str = '0.0.0.0'
+    server_port: int = 8000
+    web_concurrency: int = 1
 
     class Config:
         """
@@ -46,7 +266,7 @@ class Settings(BaseSettings):
         :param env_file_encoding: How to encode our configuration.
         :type env_file_encoding: str
         """
-        env_file = "../.env"
+        env_file = BASE_DIR / ".env"
         env_file_encoding = "utf-8"
 
 
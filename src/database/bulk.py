@@ -0,0 +1,128 @@
+import io
+from itertools import islice
+from typing import Iterable, List, Sequence
+
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy.engine import Connection
+
+
+def chunks(rows: Iterable[Sequence], size: int) -> Iterable[List[Sequence]]:
+    """
+    Splits rows into lists of at most size rows, without reading more than one list ahead.
+
+    :param rows: Rows of any length.
+    :type rows: Iterable[Sequence]
+    :param size: Number of rows per list.
+    :type size: int
+    :return: Lists of rows.
+    :rtype: Iterable[List[Sequence]]
+    """
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_text(chunk: List[Sequence]) -> str:
+    """
+    Writes rows in the text format of COPY.
+
+    None is written as \\N, which COPY reads as NULL, so an empty string stays an empty string. Backslashes,
+    tabs and line breaks in the values are escaped.
+
+    :param chunk: Rows.
+    :type chunk: List[Sequence]
+    :return: One line per row with the values separated by tabs.
+    :rtype: str
+    """
+    return "".join("\t".join("\\N" if value is None else str(value).translate(ESCAPES) for value in row) + "\n"
+                   for row in chunk)
+
+
+def copy_chunk(connection: Connection, table: str, columns: Sequence[str], chunk: List[Sequence]) -> None:
+    """
+    Streams rows into a Postgres table with COPY FROM STDIN in the text format.
+
+    :param connection: Connection to Postgres.
+    :type connection: Connection
+    :param table: Name of the table.
+    :type table: str
+    :param columns: Names of the columns, in the order of the row values.
+    :type columns: Sequence[str]
+    :param chunk: Rows.
+    :type chunk: List[Sequence]
+    :return: None.
+    :rtype: None
+    """
+    buffer = io.StringIO(copy_text(chunk))
+    with connection.connection.driver_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def insert_rows(connection: Connection, table: Table, columns: Sequence[str], rows: Iterable[Sequence],
+                chunk_size: int = 10000) -> int:
+    """
+    Writes many rows into a table in chunks, bypassing the ORM.
+
+    Postgres receives every chunk with COPY, the other databases with a single executemany INSERT.
+    COPY does not apply the Python column defaults of the models, only the server defaults of the table, so rows
+    must contain every value without a server default. The INSERT applies the column defaults like the ORM does.
+    The rows are written in the transaction of the connection, committing is up to the caller.
+
+    :param connection: Database connection.
+    :type connection: Connection
+    :param table: The table.
+    :type table: Table
+    :param columns: Names of the columns, in the order of the row values.
+    :type columns: Sequence[str]
+    :param rows: Rows as tuples of values, read lazily.
+    :type rows: Iterable[Sequence]
+    :param chunk_size: Number of rows written at once.
+    :type chunk_size: int
+    :return: Number of written rows.
+    :rtype: int
+    """
+    written = 0
+    for chunk in chunks(rows, chunk_size):
+        if connection.dialect.name == "postgresql":
+            copy_chunk(connection, table.name, columns, chunk)
+        else:
+            connection.execute(table.insert(), [dict(zip(columns, row)) for row in chunk])
+        written += len(chunk)
+    return written
+
+
+def merge_rows(connection: Connection, table: Table, columns: Sequence[str], rows: Iterable[Sequence],
+               chunk_size: int = 10000) -> int:
+    """
+    Imports many rows into a table, applying the column defaults of the ORM models.
+
+    On Postgres the rows are streamed with COPY into a temporary staging table and moved into the table
+    with a single INSERT ... SELECT, which also fills in the column defaults that COPY would leave empty.
+    Other databases get the rows with chunked executemany INSERTs.
+    The rows are written in the transaction of the connection, committing is up to the caller.
+
+    :param connection: Database connection.
+    :type connection: Connection
+    :param table: The table.
+    :type table: Table
+    :param columns: Names of the columns, in the order of the row values.
+    :type columns: Sequence[str]
+    :param rows: Rows as tuples of values, read lazily.
+    :type rows: Iterable[Sequence]
+    :param chunk_size: Number of rows written at once.
+    :type chunk_size: int
+    :return: Number of imported rows.
+    :rtype: int
+    """
+    if connection.dialect.name != "postgresql":
+        return insert_rows(connection, table, columns, rows, chunk_size)
+    staging = Table(f"{table.name}_staging", MetaData(), *(Column(name, table.c[name].type) for name in columns),
+                    prefixes=["TEMPORARY"], postgresql_on_commit="DROP")
+    staging.create(connection)
+    insert_rows(connection, staging, columns, rows, chunk_size)
+    imported = connection.execute(table.insert().from_select(columns, staging.select())).rowcount
+    staging.drop(connection)
+    return imported
@@ -1,9 +1,17 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import sys
+import hashlib
+import itertools
+import time
+from functools import partial
+from typing import Dict, List
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine, ExceptionContext
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
 
-sys.path.append("..")
 from src.conf.config import settings
+from src.services.redis import get_redis
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
@@ -11,16 +19,221 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+class ReplicaRouter:
+    """
+    A class that spreads read-only sessions over the replicas.
+
+    Replicas are taken in turn without connecting to them first. A replica whose connection fails, in whichever
+    session, is ejected for a while, and when no replica is available the primary is used. So a failing replica
+    costs the request that found it, not a connection check on every request.
+
+    :param primary: Engine of the primary database.
+    :type primary: Engine
+    :param replicas: Engines of the replicas.
+    :type replicas: List[Engine]
+    :param ejection_seconds: How long a failed replica is skipped.
+    :type ejection_seconds: int
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine], ejection_seconds: int):
+        self.primary = primary
+        self.replicas = replicas
+        self.ejection_seconds = ejection_seconds
+        self.ejected_until: Dict[Engine, float] = {}
+        self.turns = itertools.count()
+        for replica in replicas:
+            event.listen(replica, "handle_error", partial(self.on_error, replica))
+
+    def candidates(self) -> List[Engine]:
+        """
+        Lists the replicas that are not ejected, starting with the next one in turn.
+
+        :return: Available replicas.
+        :rtype: List[Engine]
+        """
+        if not self.replicas:
+            return []
+        start = next(self.turns) % len(self.replicas)
+        now = time.monotonic()
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if self.ejected_until.get(replica, 0) <= now]
+
+    def eject(self, replica: Engine) -> None:
+        """
+        Skips a replica for ejection_seconds.
+
+        :param replica: The failed replica.
+        :type replica: Engine
+        :return: None.
+        :rtype: None
+        """
+        self.ejected_until[replica] = time.monotonic() + self.ejection_seconds
+
+    def on_error(self, replica: Engine, context: ExceptionContext) -> None:
+        """
+        Ejects a replica when connecting to it fails or its connection is lost.
+
+        Errors of the statements themselves, like a statement timeout, leave the replica in turn.
+        A failed pre-ping is not counted either, the pool connects again right after it.
+
+        :param replica: The replica of the failed operation.
+        :type replica: Engine
+        :param context: The failed operation.
+        :type context: ExceptionContext
+        :return: None.
+        :rtype: None
+        """
+        if not context.is_pre_ping and (context.connection is None or context.is_disconnect):
+            self.eject(replica)
+
+    def choose(self) -> Engine:
+        """
+        Picks the engine for a read-only session.
+
+        :return: The next replica that is not ejected, or the primary if there is none.
+        :rtype: Engine
+        """
+        return next(iter(self.candidates()), self.primary)
+
+
+replica_engines = [create_engine(url, pool_pre_ping=True) for url in settings.sqlalchemy_replica_urls]
+replica_router = ReplicaRouter(engine, replica_engines, settings.replica_ejection_seconds)
+
+
+def statement_timeout(request: Request) -> float:
+    """
+    Looks up the statement timeout of the route that handles a request.
+
+    :param request: The current request.
+    :type request: Request
+    :return: The timeout in seconds from statement_timeouts by the name of the route function,
+        or statement_timeout; 0 means no timeout.
+    :rtype: float
+    """
+    name = getattr(request.scope.get("endpoint"), "__name__", None)
+    return settings.statement_timeouts.get(name, settings.statement_timeout)
+
+
+@event.listens_for(Session, "after_begin")
+def apply_statement_timeout(session: Session, transaction, connection: Connection) -> None:
+    """
+    Limits the statements of a session that was created with a statement_timeout in its info.
+
+    Postgres cancels a statement that runs longer than the timeout. SQLite has no statement timeout,
+    there a progress handler interrupts the statements once the timeout has passed since the transaction began.
+
+    :param session: The session that has begun a transaction.
+    :type session: Session
+    :param transaction: The transaction.
+    :type transaction: SessionTransaction
+    :param connection: Connection of the transaction.
+    :type connection: Connection
+    :return: None.
+    :rtype: None
+    """
+    timeout = session.info.get("statement_timeout")
+    if not timeout:
+        return
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+    elif connection.dialect.name == "sqlite":
+        deadline = time.monotonic() + timeout
+        connection.connection.driver_connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+
+
+def reset_progress_handler(dbapi_connection, connection_record) -> None:
+    """
+    Removes the SQLite progress handler of a timed session when its connection goes back to the pool.
+
+    :param dbapi_connection: The returned connection.
+    :type dbapi_connection: sqlite3.Connection
+    :param connection_record: Pool record of the connection.
+    :type connection_record: _ConnectionRecord
+    :return: None.
+    :rtype: None
+    """
+    dbapi_connection.set_progress_handler(None, 0)
+
+
+for bound in [engine, *replica_engines]:
+    if bound.dialect.name == "sqlite":
+        event.listen(bound, "checkin", reset_progress_handler)
+
+
+def is_statement_timeout(error: OperationalError) -> bool:
+    """
+    Checks whether a statement has failed because of its timeout.
+
+    :param error: The error of the statement.
+    :type error: OperationalError
+    :return: Whether the statement was cancelled by statement_timeout on Postgres or interrupted on SQLite.
+    :rtype: bool
+    """
+    return getattr(error.orig, "pgcode", None) == "57014" or str(error.orig) == "interrupted"
+
+
+def primary_pin_key(request: Request) -> str:
+    """
+    Builds the Redis key that pins the reads of a client to the primary.
+
+    :param request: The current request.
+    :type request: Request
+    :return: Redis key.
+    :rtype: str
+    """
+    client = request.headers.get("Authorization") or (request.client.host if request.client else "")
+    return f"primary_pin:{hashlib.sha256(client.encode()).hexdigest()}"
+
+
+async def pin_primary(request: Request) -> None:
+    """
+    Sends the reads of the client to the primary for a while, so it reads its own writes.
+
+    Used as a dependency of the write routes.
+
+    :param request: The current request.
+    :type request: Request
+    :return: None.
+    :rtype: None
+    """
+    if replica_router.replicas:
+        await get_redis().set(primary_pin_key(request), 1, ex=settings.replica_read_after_write_seconds)
+
+
 # Dependency
-def get_db():
+def get_db(request: Request):
     """
-    Create a database session.
+    Create a database session with the statement timeout of the route.
 
+    :param request: The current request.
+    :type request: Request
     :return: database session.
     :rtype: SessionLocal() | None
     """
-    db = SessionLocal()
+    db = SessionLocal(info={"statement_timeout": statement_timeout(request)})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency
+async def get_read_db(request: Request):
+    """
+    Create a read-only database session bound to a replica, with the statement timeout of the route.
+
+    Clients that have written recently, and all clients when no replica is available, get the primary.
+
+    :param request: The current request.
+    :type request: Request
+    :return: database session.
+    :rtype: Session | None
+    """
+    bind = engine
+    if replica_router.replicas and not await get_redis().exists(primary_pin_key(request)):
+        bind = replica_router.choose()
+    db = SessionLocal(bind=bind, info={"statement_timeout": statement_timeout(request)})
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
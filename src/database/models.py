@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Boolean, func, Table, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, func, Table, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql.sqltypes import Date, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+contact_tags = Table(
+    "contact_tags",
+    Base.metadata,
+    Column("contact_id", ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_contact_tags_tag_id", "tag_id"),
+)
+
+
 class Contact(Base):
     """
     This is the class that describes the user's contact 
@@ -21,10 +30,24 @@ class Contact(Base):
     :type email: str
     :param birthday: User's date of birth.
     :type birthday: Date
+    :param email_key: Normalized email, used to find duplicates.
+    :type email_key: str
+    :param phone_key: Digits of the phone number.
+    :type phone_key: str
+    :param email_domain: Domain of the normalized email, used in the statistics.
+    :type email_domain: str
+    :param phone_e164: Phone number in the E.164 format, used to look up contacts and find duplicates.
+    :type phone_e164: str
+    :param phone_reversed: Digits of the E.164 phone number in reverse order, used to look up contacts by phone.
+    :type phone_reversed: str
+    :param created_at: Contact creation time.
+    :type created_at: DateTime
     :param user_id: ID of the user who owns this contact.
     :type user_id: int
     :param user: The user who owns the contact.
     :type user: User
+    :param tags: Tags of the contact, loaded together with the contacts by a single extra query.
+    :type tags: List[Tag]
     """
     __tablename__ = "contacts"
     id = Column(Integer, primary_key=True)
@@ -33,8 +56,70 @@ class Contact(Base):
     phone_number = Column(String(12), nullable=False)
     email = Column(String(100), nullable=False)
     birthday = Column(Date, nullable=False)
+    email_key = Column(String(100), nullable=True)
+    phone_key = Column(String(20), nullable=True)
+    email_domain = Column(String(100), nullable=True)
+    phone_e164 = Column(String(16), nullable=True)
+    phone_reversed = Column(String(15), nullable=True)
+    created_at = Column(DateTime, default=func.now())
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref="contacts")
+    tags = relationship('Tag', secondary=contact_tags, lazy='selectin', order_by='Tag.name')
+    __table_args__ = (
+        Index('ix_contacts_user_id_email_key', 'user_id', 'email_key'),
+        Index('ix_contacts_user_id_phone_key', 'user_id', 'phone_key'),
+        Index('ix_contacts_user_id_email_domain', 'user_id', 'email_domain'),
+        Index('ix_contacts_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_contacts_user_id_name', 'user_id', 'name'),
+        Index('ix_contacts_user_id_surname', 'user_id', 'surname'),
+        Index('ix_contacts_user_id_phone_reversed', 'user_id', 'phone_reversed'),
+    )
+
+
+class ContactAudit(Base):
+    """
+    This is the class that describes an entry of the append-only history of contact changes
+
+    :param id: Unique entry ID, increasing with the order in which the entries are written.
+    :type id: int
+    :param user_id: ID of the user who changed the contact.
+    :type user_id: int
+    :param contact_id: ID of the changed contact, kept after the contact is removed; None for an import.
+    :type contact_id: int
+    :param action: What has happened: created, updated, removed, merged or imported.
+    :type action: str
+    :param changed_at: Time of the change.
+    :type changed_at: DateTime
+    """
+    __tablename__ = "contact_audit"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    contact_id = Column(Integer, nullable=True)
+    action = Column(String(20), nullable=False)
+    changed_at = Column(DateTime, nullable=False)
+    __table_args__ = (
+        Index('ix_contact_audit_user_id_contact_id_id', 'user_id', 'contact_id', 'id'),
+    )
+
+
+class Tag(Base):
+    """
+    This is the class that describes a tag by which the user groups contacts
+
+    :param id: Unique tag ID.
+    :type id: int
+    :param name: Tag name, unique for the user.
+    :type name: str
+    :param user_id: ID of the user who owns this tag.
+    :type user_id: int
+    """
+    __tablename__ = "tags"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(25), nullable=False)
+    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'name', name='uq_tags_user_id_name'),
+    )
 
 
 class User(Base):
@@ -57,6 +142,8 @@ class User(Base):
     :type avatar: str
     :param refresh_token: Unique token for access to the user account.
     :type refresh_token: str
+    :param refresh_token_expires_at: When the refresh token expires, used to clear expired tokens.
+    :type refresh_token_expires_at: DateTime
     :param confirmed: Variable that checks if the user's mail is confirmed.
     :type confirmed: bool
     """
@@ -68,4 +155,9 @@ class User(Base):
     created_at = Column('crated_at', DateTime, default=func.now())
     avatar = Column(String(255), nullable=True)
     refresh_token = Column(String(255), nullable=True)
-    confirmed = Column(Boolean, default=False)
\ No newline at end of file
+    refresh_token_expires_at = Column(DateTime, nullable=True)
+    confirmed = Column(Boolean, default=False)
+    __table_args__ = (
+        Index('ix_users_confirmed_crated_at', 'confirmed', 'crated_at'),
+        Index('ix_users_refresh_token_expires_at', 'refresh_token_expires_at'),
+    )
\ No newline at end of file
@@ -0,0 +1,115 @@
+import json
+import re
+from typing import Any, List, NamedTuple, Optional, Set, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+TRANSACTION_CONTROL = re.compile(r"\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b", re.IGNORECASE)
+SQLITE_ACCESS = re.compile(r"(SEARCH|SCAN) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+)| USING (INTEGER PRIMARY KEY))?")
+
+
+class QueryLog:
+    """
+    A context manager that records the statements executed through an engine or a connection.
+
+    Transaction control (BEGIN, SAVEPOINT, RELEASE...) is not recorded, so the log holds the queries
+    a piece of code sends to the database, in order, with their parameters.
+
+    :param bind: The engine or connection that is watched.
+    :type bind: Engine | Connection
+    """
+
+    def __init__(self, bind: Union[Engine, Connection]):
+        self.bind = bind
+        self.statements: List[Tuple[str, Any]] = []
+
+    def __enter__(self) -> "QueryLog":
+        event.listen(self.bind, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.bind, "before_cursor_execute", self.record)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def record(self, connection, cursor, statement: str, parameters: Any, context, executemany: bool) -> None:
+        """
+        Records a statement, called by SQLAlchemy before it is executed.
+
+        :param statement: SQL in the form of the DBAPI, with placeholders.
+        :type statement: str
+        :param parameters: Parameters of the statement.
+        :type parameters: Any
+        :return: None.
+        :rtype: None
+        """
+        if not TRANSACTION_CONTROL.match(statement):
+            self.statements.append((statement, parameters))
+
+
+class QueryPlan(NamedTuple):
+    """
+    What the planner chose for a statement.
+
+    :param indexes: Names of the used indexes, with the primary key of SQLite as ``<table>_pkey``.
+    :type indexes: Set[str]
+    :param full_scans: Tables that are read completely, also when they are read in the order of an index.
+    :type full_scans: Set[str]
+    :param rows: The most rows a scan is estimated to return, None where the database does not estimate them.
+    :type rows: float | None
+    :param text: The plan as the database has printed it.
+    :type text: str
+    """
+    indexes: Set[str]
+    full_scans: Set[str]
+    rows: Optional[float]
+    text: str
+
+
+def explain(connection: Connection, statement: str, parameters: Any = ()) -> QueryPlan:
+    """
+    Asks the database how it executes a statement, without executing it.
+
+    SQLite answers EXPLAIN QUERY PLAN, Postgres EXPLAIN (FORMAT JSON) with the row estimates.
+
+    :param connection: Connection to the database.
+    :type connection: Connection
+    :param statement: SQL in the form of the DBAPI, as recorded by QueryLog.
+    :type statement: str
+    :param parameters: Parameters of the statement.
+    :type parameters: Any
+    :return: The plan.
+    :rtype: QueryPlan
+    :raises NotImplementedError: For other databases.
+    """
+    if connection.dialect.name == "sqlite":
+        details = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        indexes, full_scans = set(), set()
+        for detail in details:
+            match = SQLITE_ACCESS.match(detail)
+            if match is None:
+                continue
+            access, table, index, primary_key = match.groups()
+            if index or primary_key:
+                indexes.add(index or f"{table}_pkey")
+            if access == "SCAN":
+                full_scans.add(table)
+        return QueryPlan(indexes, full_scans, None, "\n".join(details))
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        indexes, full_scans, rows = set(), set(), 0.0
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get("Plans", ()))
+            if "Index Name" in node:
+                indexes.add(node["Index Name"])
+            if node["Node Type"] == "Seq Scan":
+                full_scans.add(node["Relation Name"])
+            if "Relation Name" in node:
+                rows = max(rows, node["Plan Rows"])
+        return QueryPlan(indexes, full_scans, rows, json.dumps(plan, indent=2))
+    raise NotImplementedError(f"Query plans of {connection.dialect.name} are not supported")
@@ -1,19 +1,77 @@
-from fastapi import Depends, FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-import redis.asyncio as redis
-import sys
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import OperationalError
 
-sys.path.append("..")
-from src.routes import contacts, auth
+from src.routes import contacts, auth, tags, users
+from src.database.db import engine, is_statement_timeout
+from src.conf.config import settings
+from src.middleware.admission import AdmissionMiddleware
+from src.middleware.compression import CompressionMiddleware
+from src.middleware.disconnect import CancelOnDisconnectMiddleware
+from src.middleware.redis_calls import RedisCallsMiddleware
+from src.services.redis import init_redis, close_redis
+from src.services.scheduler import scheduler
+from src.services.birthdays import birthday_digest_job
+from src.services.maintenance import maintenance_job
+from src.services.events import hub
+from src.services.audit import audit_log
+from src.services.avatars import processor
+from src.services.metrics import metrics
 from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
+from src.services.throttle import Throttle
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates the resources of a worker process on startup and releases them on shutdown.
 
-app = FastAPI()
+    Connections inherited from a parent process are dropped, so every worker opens its own
+    database connections and Redis pool. The Redis pool is also used to limit the number of requests
+    and to make sure the daily jobs run in one worker only.
+
+    :param app: The application instance.
+    :type app: FastAPI
+    :return: None.
+    :rtype: None
+    """
+    engine.dispose(close=False)
+    r = await init_redis()
+    await FastAPILimiter.init(r)
+    audit_log.start(engine)
+    if settings.scheduler_enabled:
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    await hub.stop()
+    await audit_log.stop()
+    processor.stop()
+    await close_redis()
+    engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+scheduler.daily("birthday_digest", settings.birthday_digest_time, birthday_digest_job)
+scheduler.daily("maintenance", settings.maintenance_time, maintenance_job)
 origins = [ 
     "http://localhost:8000"
     "http://localhost:6379"
     ]
 
+app.add_middleware(
+    AdmissionMiddleware,
+    limit=settings.admission_limit,
+    queue_size=settings.admission_queue_size,
+    max_wait=settings.admission_max_wait,
+    retry_after=settings.admission_retry_after,
+    critical_paths=settings.admission_critical_paths,
+    bulk_paths=settings.admission_bulk_paths,
+    exclude_paths=settings.admission_exclude_paths,
+)
+app.add_middleware(CancelOnDisconnectMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -21,23 +79,42 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+    content_types=settings.compression_content_types,
+    exclude_paths=settings.compression_exclude_paths,
+)
+app.add_middleware(RedisCallsMiddleware)
 
-app.include_router(contacts.router, prefix='/api')
-app.include_router(auth.router, prefix='/api')
-
-
-@app.on_event("startup")
-async def startup():
+@app.exception_handler(OperationalError)
+async def statement_timeout_handler(request: Request, error: OperationalError):
     """
-    Creates a limit on the number of requests.
+    Answers a request whose statement has run longer than the statement timeout of its route.
 
-    :return: An object that helps limit requests.
-    :rtype: None
+    :param request: The current request.
+    :type request: Request
+    :param error: The error of the statement.
+    :type error: OperationalError
+    :return: 503 response.
+    :rtype: JSONResponse
     """
-    r = await redis.Redis(host='localhost', port=6379, db=0, encoding="utf-8", decode_responses=True)
-    await FastAPILimiter.init(r)
+    if not is_statement_timeout(error):
+        raise error
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content={"detail": "The request took too long, narrow it down or retry later"},
+                        headers={"Retry-After": str(settings.admission_retry_after)})
+
 
-@app.get("/", dependencies=[Depends(RateLimiter(times=2, seconds=5))])
+app.include_router(contacts.router, prefix='/api')
+app.include_router(auth.router, prefix='/api')
+app.include_router(tags.router, prefix='/api')
+app.include_router(users.router, prefix='/api')
+
+
+@app.get("/", dependencies=[Depends(Throttle(times=2, seconds=5))])
 def read_root():
     """
     Creates the main API page.
@@ -45,4 +122,15 @@ def read_root():
     :return: Display as a dictionary on the main page.
     :rtype: dict
     """
-    return {"message": "Hello World"}
\ No newline at end of file
+    return {"message": "Hello World"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """
+    Exposes the metrics of the worker for Prometheus.
+
+    :return: The metrics in the Prometheus text format.
+    :rtype: str
+    """
+    return metrics.render()
@@ -0,0 +1,224 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+from typing import Iterable, List
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.services.metrics import metrics
+
+CRITICAL, READ, WRITE, BULK = range(4)
+PRIORITY_NAMES = {CRITICAL: "critical", READ: "read", WRITE: "write", BULK: "bulk"}
+
+metrics.describe("admission_in_flight", "Requests being processed by the worker.")
+metrics.describe("admission_queued", "Requests waiting for admission.")
+metrics.describe("admission_admitted_total", "Requests admitted, by priority.")
+metrics.describe("admission_rejected_total", "Requests shed with 503, by priority and reason.")
+metrics.describe("admission_wait_seconds_total", "Time the admitted requests have waited, by priority.")
+
+
+class AdmissionController:
+    """
+    A class that limits the number of requests a worker processes at once.
+
+    Requests over the limit wait in a bounded queue and are admitted by priority, then by arrival.
+    When the queue is full, a request with a higher priority than the last waiting one takes its place
+    and the displaced request is shed; otherwise the new request is shed. A request that waits longer
+    than max_wait is shed as well.
+
+    :param limit: How many requests are processed at once.
+    :type limit: int
+    :param queue_size: How many requests may wait.
+    :type queue_size: int
+    :param max_wait: How long a request may wait, in seconds.
+    :type max_wait: float
+    """
+
+    def __init__(self, limit: int, queue_size: int, max_wait: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiters: List[list] = []
+        self.arrivals = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        """
+        Counts the waiting requests.
+
+        :return: Number of requests in the queue.
+        :rtype: int
+        """
+        return sum(1 for waiter in self.waiters if not waiter[2].done())
+
+    async def acquire(self, priority: int) -> str | None:
+        """
+        Waits until the request may be processed.
+
+        :param priority: Priority of the request, lower is more important.
+        :type priority: int
+        :return: None if the request is admitted, otherwise why it is shed: queue_full, displaced or timeout.
+        :rtype: str | None
+        """
+        if self.in_flight < self.limit and not self.queued:
+            self.in_flight += 1
+            return None
+        if self.queued >= self.queue_size and not self.displace(priority):
+            return "queue_full"
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, [priority, next(self.arrivals), future])
+        try:
+            return await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            return "timeout"
+        except asyncio.CancelledError:
+            # The client has gone while its request was being admitted, the place goes to the next one.
+            if future.done() and not future.cancelled() and future.result() is None:
+                self.release()
+            raise
+        finally:
+            self.compact()
+
+    def displace(self, priority: int) -> bool:
+        """
+        Sheds the last waiting request if it is less important than a new one.
+
+        :param priority: Priority of the new request.
+        :type priority: int
+        :return: Whether a place in the queue was freed.
+        :rtype: bool
+        """
+        waiting = [waiter for waiter in self.waiters if not waiter[2].done()]
+        if not waiting:
+            return False
+        last = max(waiting, key=lambda waiter: (waiter[0], waiter[1]))
+        if last[0] <= priority:
+            return False
+        last[2].set_result("displaced")
+        return True
+
+    def release(self) -> None:
+        """
+        Frees the place of a finished request, the most important waiting request takes it.
+
+        :return: None.
+        :rtype: None
+        """
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def compact(self) -> None:
+        """
+        Drops the finished waiters from the queue.
+
+        :return: None.
+        :rtype: None
+        """
+        if any(waiter[2].done() for waiter in self.waiters):
+            self.waiters = [waiter for waiter in self.waiters if not waiter[2].done()]
+            heapq.heapify(self.waiters)
+
+
+class AdmissionMiddleware:
+    """
+    A middleware that sheds the requests a worker cannot process in time with 503 and Retry-After.
+
+    Auth refresh is admitted first, then reads, then writes, and bulk routes last.
+    Excluded paths, like long-lived streams, bypass the limit.
+
+    :param app: The wrapped application.
+    :type app: ASGIApp
+    :param limit: How many requests are processed at once.
+    :type limit: int
+    :param queue_size: How many requests may wait.
+    :type queue_size: int
+    :param max_wait: How long a request may wait, in seconds.
+    :type max_wait: float
+    :param retry_after: Value of the Retry-After header of shed requests, in seconds.
+    :type retry_after: int
+    :param critical_paths: Path prefixes that are admitted first.
+    :type critical_paths: Iterable[str]
+    :param bulk_paths: Path prefixes that are admitted last.
+    :type bulk_paths: Iterable[str]
+    :param exclude_paths: Path prefixes that bypass the limit.
+    :type exclude_paths: Iterable[str]
+    """
+
+    def __init__(self, app: ASGIApp, limit: int = 32, queue_size: int = 128, max_wait: float = 2.0,
+                 retry_after: int = 1, critical_paths: Iterable[str] = (), bulk_paths: Iterable[str] = (),
+                 exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.controller = AdmissionController(limit, queue_size, max_wait)
+        self.retry_after = retry_after
+        self.critical_paths = tuple(critical_paths)
+        self.bulk_paths = tuple(bulk_paths)
+        self.exclude_paths = tuple(exclude_paths)
+
+    def priority(self, scope: Scope) -> int:
+        """
+        Classifies a request.
+
+        :param scope: The request scope.
+        :type scope: Scope
+        :return: Priority of the request, lower is more important.
+        :rtype: int
+        """
+        path = scope["path"]
+        if path.startswith(self.critical_paths):
+            return CRITICAL
+        if path.startswith(self.bulk_paths):
+            return BULK
+        return READ if scope["method"] in ("GET", "HEAD", "OPTIONS") else WRITE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        priority = self.priority(scope)
+        name = PRIORITY_NAMES[priority]
+        started = time.monotonic()
+        reason = await self.controller.acquire(priority)
+        self.update_gauges()
+        if reason is not None:
+            metrics.inc("admission_rejected_total", priority=name, reason=reason)
+            await self.reject(send)
+            return
+        metrics.inc("admission_admitted_total", priority=name)
+        metrics.inc("admission_wait_seconds_total", time.monotonic() - started, priority=name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+            self.update_gauges()
+
+    def update_gauges(self) -> None:
+        """
+        Publishes the number of processed and waiting requests.
+
+        :return: None.
+        :rtype: None
+        """
+        metrics.set("admission_in_flight", self.controller.in_flight)
+        metrics.set("admission_queued", self.controller.queued)
+
+    async def reject(self, send: Send) -> None:
+        """
+        Sends the 503 response of a shed request.
+
+        :param send: The send callable of the server.
+        :type send: Send
+        :return: None.
+        :rtype: None
+        """
+        body = json.dumps({"detail": "Server is overloaded, retry later"}).encode()
+        await send({"type": "http.response.start", "status": 503,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                                (b"retry-after", str(self.retry_after).encode())]})
+        await send({"type": "http.response.body", "body": body})
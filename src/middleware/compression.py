@@ -0,0 +1,215 @@
+import gzip
+import zlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """
+    Parses the Accept-Encoding header.
+
+    :param accept_encoding: Value of the header.
+    :type accept_encoding: str
+    :return: Encodings the client accepts.
+    :rtype: set
+    """
+    encodings = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name, params = name.strip().lower(), params.strip()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            encodings.add(name)
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    A middleware that compresses responses with brotli or gzip.
+
+    Only responses with an allowed content type and at least minimum_size bytes are compressed,
+    and paths with an excluded prefix are never compressed. Brotli is used when the client
+    accepts it and the brotli package is installed.
+
+    :param app: The wrapped application.
+    :type app: ASGIApp
+    :param minimum_size: The smallest body that is compressed, in bytes.
+    :type minimum_size: int
+    :param gzip_level: Gzip compression level from 1 to 9.
+    :type gzip_level: int
+    :param brotli_quality: Brotli quality from 0 to 11.
+    :type brotli_quality: int
+    :param content_types: Content types that are compressed.
+    :type content_types: Iterable[str]
+    :param exclude_paths: Path prefixes that are not compressed.
+    :type exclude_paths: Iterable[str]
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 content_types: Iterable[str] = ("application/json",), exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = set(content_types)
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in encodings:
+            encoding = "br"
+        elif "gzip" in encodings:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+        await CompressionResponder(self, encoding, send).run(scope, receive)
+
+
+class CompressionResponder:
+    """
+    A class that compresses a single response.
+
+    A body sent at once is compressed only when it is large enough; a streamed body is compressed chunk by chunk.
+
+    :param middleware: The middleware with the settings.
+    :type middleware: CompressionMiddleware
+    :param encoding: Chosen encoding, br or gzip.
+    :type encoding: str
+    :param send: The send callable of the server.
+    :type send: Send
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        """
+        Runs the wrapped application for the request.
+
+        :param scope: The request scope.
+        :type scope: Scope
+        :param receive: The receive callable of the server.
+        :type receive: Receive
+        :return: None.
+        :rtype: None
+        """
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    def compressible(self, headers: Headers) -> bool:
+        """
+        Checks whether the response may be compressed.
+
+        :param headers: Response headers.
+        :type headers: Headers
+        :return: Whether the content type is allowed and the body is not encoded yet.
+        :rtype: bool
+        """
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.middleware.content_types and "content-encoding" not in headers
+
+    def compress(self, body: bytes) -> bytes:
+        """
+        Compresses a whole body.
+
+        :param body: Response body.
+        :type body: bytes
+        :return: Compressed body.
+        :rtype: bytes
+        """
+        if self.encoding == "br":
+            return brotli.compress(body, quality=self.middleware.brotli_quality)
+        return gzip.compress(body, compresslevel=self.middleware.gzip_level, mtime=0)
+
+    def start_stream(self) -> None:
+        """
+        Creates the compressor of a streamed body.
+
+        :return: None.
+        :rtype: None
+        """
+        if self.encoding == "br":
+            self.compressor = brotli.Compressor(quality=self.middleware.brotli_quality)
+        else:
+            self.compressor = zlib.compressobj(self.middleware.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress_chunk(self, chunk: bytes, last: bool) -> bytes:
+        """
+        Compresses a chunk of a streamed body.
+
+        :param chunk: Chunk of the body.
+        :type chunk: bytes
+        :param last: Whether this is the last chunk.
+        :type last: bool
+        :return: Compressed data that is ready to be sent.
+        :rtype: bytes
+        """
+        if self.encoding == "br":
+            data = self.compressor.process(chunk)
+            return data + (self.compressor.finish() if last else self.compressor.flush())
+        data = self.compressor.compress(chunk)
+        return data + self.compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    async def send_compressed(self, message: Message) -> None:
+        """
+        Intercepts the messages of the wrapped application and compresses the body.
+
+        :param message: ASGI message.
+        :type message: Message
+        :return: None.
+        :rtype: None
+        """
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(scope=start)
+            if not self.compressible(headers):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                if len(body) >= self.middleware.minimum_size:
+                    body = self.compress(body)
+                    headers["Content-Encoding"] = self.encoding
+                    headers["Content-Length"] = str(len(body))
+                self.passthrough = True
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            self.start_stream()
+            headers["Content-Encoding"] = self.encoding
+            del headers["Content-Length"]
+            await self.send(start)
+
+        await self.send({"type": "http.response.body", "body": self.compress_chunk(body, not more_body),
+                         "more_body": more_body})
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.metrics import metrics
+
+metrics.describe("disconnect_cancelled_total", "Requests cancelled because the client has disconnected.")
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    A middleware that cancels the handling of a request when its client disconnects.
+
+    The request is cancelled at its next await, its database session is closed and the connection goes
+    back to the pool, so abandoned reads stop holding connections between their statements. A statement
+    that is already running is bounded by the statement timeout of the route. Only requests with one of
+    the given methods are cancelled, a write is always finished.
+
+    :param app: The wrapped application.
+    :type app: ASGIApp
+    :param methods: Methods of the requests that are cancelled.
+    :type methods: Iterable[str]
+    """
+
+    def __init__(self, app: ASGIApp, methods: Iterable[str] = ("GET", "HEAD")):
+        self.app = app
+        self.methods = set(methods)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue = asyncio.Queue()
+        handler = asyncio.create_task(self.app(scope, messages.get, send))
+        disconnected = asyncio.Event()
+
+        async def watch() -> None:
+            while True:
+                message: Message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not handler.done():
+                        disconnected.set()
+                        handler.cancel()
+                        metrics.inc("disconnect_cancelled_total")
+                    return
+
+        watcher = asyncio.create_task(watch())
+        try:
+            # A cancellation of the request by the server is passed on to the handler as well.
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise
+        finally:
+            watcher.cancel()
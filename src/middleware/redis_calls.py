@@ -0,0 +1,39 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.services.metrics import metrics
+from src.services.redis import request_calls
+
+metrics.describe("redis_requests_total", "Requests by the number of their round trips to Redis, 4 or more as 4+.")
+metrics.describe("redis_round_trips_total", "Round trips to Redis made by requests.")
+metrics.describe("redis_commands_total", "Commands sent to Redis by requests, several per round trip when pipelined.")
+
+
+class RedisCallsMiddleware:
+    """
+    A middleware that counts the round trips to Redis of every request.
+
+    Pipelined commands are sent in one round trip. Dividing redis_round_trips_total by the sum of
+    redis_requests_total gives the average round trips per request, redis_requests_total shows how many
+    requests need more than one.
+
+    :param app: The wrapped application.
+    :type app: ASGIApp
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        calls = [0, 0]
+        token = request_calls.set(calls)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_calls.reset(token)
+            round_trips, commands = calls
+            metrics.inc("redis_requests_total", round_trips=str(round_trips) if round_trips < 4 else "4+")
+            metrics.inc("redis_round_trips_total", round_trips)
+            metrics.inc("redis_commands_total", commands)
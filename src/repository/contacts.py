@@ -1,16 +1,38 @@
-from typing import List
-from sqlalchemy import and_
-from datetime import date, datetime
-from sqlalchemy.orm import Session
-import sys
+import calendar
+from itertools import groupby
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import and_, func, or_, extract, case
+from datetime import date, datetime, time, timedelta
+from sqlalchemy.orm import Query, Session
+from starlette.concurrency import run_in_threadpool
 
-sys.path.append("..")
+from src.database.bulk import merge_rows
+from src.database.models import Contact, ContactAudit, Tag, User
+from src.schemas import ContactModel, ContactFilter
+from src.services.events import contact_changed
+from src.services.normalize import normalize_email, normalize_phone, email_domain, phone_e164, phone_reversed
 
-from src.database.models import Contact, User
-from src.schemas import ContactModel
 
+def filter_by_tag(query: Query, user: User, tag: str) -> Query:
+    """
+    Narrows a contact query down to the contacts with a tag.
+
+    The tag is found by the unique (user_id, name) index and its contacts by the tag_id index
+    of the association table, so the filter is a join within the same query.
+
+    :param query: Query of contacts.
+    :type query: Query
+    :param user: The user who owns the tag.
+    :type user: User
+    :param tag: The tag name.
+    :type tag: str
+    :return: The narrowed query.
+    :rtype: Query
+    """
+    return query.join(Contact.tags).filter(and_(Tag.user_id == user.id, Tag.name == tag))
 
-async def get_contacts(skip: int, user: User, limit: int, db: Session) -> List[Contact]:
+
+async def get_contacts(skip: int, user: User, limit: int, db: Session, tag: Optional[str] = None) -> List[Contact]:
     """
     Retrieves a list of contacts for a specific user with specified pagination parameters.
 
@@ -22,12 +44,147 @@ async def get_contacts(skip: int, user: User, limit: int, db: Session) -> List[C
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
     :return: A list of contacts.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+    query = db.query(Contact).filter(Contact.user_id == user.id)
+    if tag:
+        query = filter_by_tag(query, user, tag)
+    return query.offset(skip).limit(limit).all()
+
+# Sort keys with the column and whether an index over (user_id, column) serves the order.
+SORT_KEYS = {
+    "id": (Contact.id, True),
+    "name": (Contact.name, True),
+    "surname": (Contact.surname, True),
+    "email": (Contact.email_key, True),
+    "created_at": (Contact.created_at, True),
+    "birthday": (Contact.birthday, False),
+}
+
+
+def parse_sort(sort: Optional[str]) -> List[Tuple[str, bool]]:
+    """
+    Parses the sort parameter of the contact list, e.g. "surname,-created_at".
+
+    :param sort: Comma separated sort keys, a key with a leading minus sorts in descending order.
+    :type sort: str | None
+    :return: Sort keys with the flag of descending order.
+    :rtype: List[Tuple[str, bool]]
+    :raises ValueError: If a key is unknown.
+    """
+    order = {}
+    for item in (sort or "").split(","):
+        item = item.strip()
+        key = item.lstrip("-")
+        if not key:
+            continue
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {key}, use one of {', '.join(SORT_KEYS)}")
+        order.setdefault(key, item.startswith("-"))
+    return list(order.items())
+
+
+def is_indexed(order: List[Tuple[str, bool]]) -> bool:
+    """
+    Checks whether the database can read the contacts in the order from an index.
+
+    The indexes cover user_id and a single column, so only an order by one indexed key is served by an index;
+    several keys are not, even if each of them has an index of its own.
+
+    :param order: Sort keys parsed by parse_sort.
+    :type order: List[Tuple[str, bool]]
+    :return: Whether the order is served by an index.
+    :rtype: bool
+    """
+    return len(order) <= 1 and all(SORT_KEYS[key][1] for key, _ in order)
+
 
-async def get_days_to_birthday(skip: int, user: User, limit: int, db: Session) -> List[Contact]:
+async def search_contacts(skip: int, user: User, limit: int, db: Session, filters: ContactFilter,
+                          order: List[Tuple[str, bool]] = ()) -> List[Contact]:
+    """
+    Retrieves a list of contacts that match all the given criteria for a specific user.
+
+    The criteria are combined into a single parameterized query. Name, surname, email and email domain
+    are compared by equality with the columns of the (user_id, column) indexes, the email after
+    the same normalization as on write. The contacts are ordered by ID after the given sort keys,
+    so the pages are stable.
+
+    :param skip: The number of contacts to skip.
+    :type skip: int
+    :param user: The user to retrieve contacts for.
+    :type user: User
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: Session
+    :param filters: The criteria.
+    :type filters: ContactFilter
+    :param order: Sort keys parsed by parse_sort.
+    :type order: List[Tuple[str, bool]]
+    :return: A list of contacts.
+    :rtype: List[Contact]
+    """
+    conditions = [Contact.user_id == user.id]
+    if filters.name is not None:
+        conditions.append(Contact.name == filters.name)
+    if filters.surname is not None:
+        conditions.append(Contact.surname == filters.surname)
+    if filters.email is not None:
+        conditions.append(Contact.email_key == normalize_email(filters.email))
+    if filters.email_domain is not None:
+        conditions.append(Contact.email_domain == filters.email_domain.strip().lower())
+    if filters.birthday_month is not None:
+        conditions.append(extract('month', Contact.birthday) == filters.birthday_month)
+    query = db.query(Contact).filter(and_(*conditions))
+    if filters.tag:
+        query = filter_by_tag(query, user, filters.tag)
+
+    columns = [SORT_KEYS[key][0].desc() if descending else SORT_KEYS[key][0] for key, descending in order]
+    if "id" not in dict(order):
+        columns.append(Contact.id)
+    return query.order_by(*columns).offset(skip).limit(limit).all()
+
+
+async def count_contacts(user: User, db: Session) -> int:
+    """
+    Counts the contacts of a specific user.
+
+    :param user: The user to count contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Number of contacts.
+    :rtype: int
+    """
+    return db.query(func.count(Contact.id)).filter(Contact.user_id == user.id).scalar()
+
+def birthday_filter(today: date, days: int):
+    """
+    Builds the condition that a contact's birthday falls within the next days.
+
+    The birthday is compared by month and day, so the condition is evaluated by the database
+    and works across the turn of the year. Birthdays on February 29 are celebrated on February 28
+    in non-leap years.
+
+    :param today: The first day of the period.
+    :type today: date
+    :param days: The number of days after today that are included.
+    :type days: int
+    :return: SQL condition.
+    :rtype: ColumnElement
+    """
+    dates = [today + timedelta(days=offset) for offset in range(days + 1)]
+    month_days = {(day.month, day.day) for day in dates}
+    month_days.update((2, 29) for day in dates if (day.month, day.day) == (2, 28) and not calendar.isleap(day.year))
+    month, day = extract('month', Contact.birthday), extract('day', Contact.birthday)
+    return or_(*(and_(month == m, day == d) for m, d in sorted(month_days)))
+
+
+async def get_days_to_birthday(skip: int, user: User, limit: int, db: Session, days: int = 7,
+                               today: Optional[date] = None) -> List[Contact]:
     """
     Retrieves a list of contacts, whose birthday is this week, for a specific user with specified pagination parameters.
 
@@ -39,19 +196,37 @@ async def get_days_to_birthday(skip: int, user: User, limit: int, db: Session) -
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param days: The number of days after today that are included.
+    :type days: int
+    :param today: The first day of the period, the current day in UTC by default.
+    :type today: date | None
     :return: A list of contacts.
     :rtype: List[Contact]
     """
-    birthday_days = []
-    nowdays_date = datetime.now().date()
-    days = db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
-    for i in days:
-        birtday_year = date(year=i.birthday.year+(nowdays_date.year-i.birthday.year), month=i.birthday.month, day=i.birthday.day)
-        if (birtday_year-nowdays_date).days <=7 and (birtday_year-nowdays_date).days >=0:
-            birthday_days.append(i)
-    return birthday_days
+    today = today or datetime.utcnow().date()
+    return db.query(Contact).filter(and_(Contact.user_id == user.id, birthday_filter(today, days)))\
+        .order_by(Contact.id).offset(skip).limit(limit).all()
+
+
+async def get_upcoming_birthdays(today: date, days: int, db: Session) -> List[Contact]:
+    """
+    Retrieves the contacts of all users whose birthday falls within the next days, in a single query.
+
+    The query covers the contacts of all users, so it runs in a worker thread rather than blocking the event loop.
+
+    :param today: The first day of the period.
+    :type today: date
+    :param days: The number of days after today that are included.
+    :type days: int
+    :param db: The database session.
+    :type db: Session
+    :return: A list of contacts ordered by the user who owns them.
+    :rtype: List[Contact]
+    """
+    query = db.query(Contact).filter(birthday_filter(today, days)).order_by(Contact.user_id, Contact.id)
+    return await run_in_threadpool(query.all)
 
-async def get_by_name(skip: int, user: User, limit: int, name: str, db: Session) -> List[Contact]:
+async def get_by_name(skip: int, user: User, limit: int, name: str, db: Session, tag: Optional[str] = None) -> List[Contact]:
     """
     Retrieves a list of contacts by specified name for a specific user.
 
@@ -65,12 +240,17 @@ async def get_by_name(skip: int, user: User, limit: int, name: str, db: Session)
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
     :return: The list of contacts where each of them has the specified name, or None if it does not exist.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter(and_(Contact.name == name, Contact.user_id == user.id)).offset(skip).limit(limit).all()
+    query = db.query(Contact).filter(and_(Contact.name == name, Contact.user_id == user.id))
+    if tag:
+        query = filter_by_tag(query, user, tag)
+    return query.offset(skip).limit(limit).all()
 
-async def get_by_surname(skip: int, user: User, limit: int, surname: str, db: Session) -> List[Contact]:
+async def get_by_surname(skip: int, user: User, limit: int, surname: str, db: Session, tag: Optional[str] = None) -> List[Contact]:
     """
     Retrieves a list of contacts by specified surname for a specific user.
 
@@ -84,12 +264,17 @@ async def get_by_surname(skip: int, user: User, limit: int, surname: str, db: Se
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
     :return: The list of contacts where each of them has the specified surname, or None if it does not exist.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter(and_(Contact.surname == surname, Contact.user_id == user.id)).offset(skip).limit(limit).all()
+    query = db.query(Contact).filter(and_(Contact.surname == surname, Contact.user_id == user.id))
+    if tag:
+        query = filter_by_tag(query, user, tag)
+    return query.offset(skip).limit(limit).all()
 
-async def get_by_email(skip: int, user: User, limit: int, email: str, db: Session) -> List[Contact]:
+async def get_by_email(skip: int, user: User, limit: int, email: str, db: Session, tag: Optional[str] = None) -> List[Contact]:
     """
     Retrieves a list of contacts by specified email for a specific user.
 
@@ -103,10 +288,65 @@ async def get_by_email(skip: int, user: User, limit: int, email: str, db: Sessio
     :type user: User
     :param db: The database session.
     :type db: Session
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
     :return: The list of contacts where each of them has the specified email, or None if it does not exist.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter(and_(Contact.email == email, Contact.user_id == user.id)).offset(skip).limit(limit).all()
+    query = db.query(Contact).filter(and_(Contact.email == email, Contact.user_id == user.id))
+    if tag:
+        query = filter_by_tag(query, user, tag)
+    return query.offset(skip).limit(limit).all()
+
+def suffix_upper_bound(key: str) -> str | None:
+    """
+    Finds the smallest key that is greater than every key starting with the given digits.
+
+    :param key: Reversed digits of a phone number ending.
+    :type key: str
+    :return: The digits with the last one that is not 9 incremented, or None if all digits are 9.
+    :rtype: str | None
+    """
+    stripped = key.rstrip("9")
+    if not stripped:
+        return None
+    return stripped[:-1] + str(int(stripped[-1]) + 1)
+
+
+async def lookup_contacts(phone: str, user: User, limit: int, db: Session, suffix: bool = False) -> List[Contact]:
+    """
+    Finds the contacts of a specific user by phone number with a single probe of the phone_reversed index.
+
+    The index keeps the digits of the E.164 numbers in reverse order, so a whole number is found by
+    equality and the numbers with a given ending by a range of keys that start with the reversed ending.
+
+    :param phone: The phone number, or its last digits when suffix is True.
+    :type phone: str
+    :param user: The user to retrieve the contacts for.
+    :type user: User
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: Session
+    :param suffix: Whether the contacts whose numbers end with the given digits are found.
+    :type suffix: bool
+    :return: The found contacts.
+    :rtype: List[Contact]
+    """
+    query = db.query(Contact).filter(Contact.user_id == user.id)
+    if suffix:
+        key = normalize_phone(phone)[::-1]
+        upper = suffix_upper_bound(key)
+        query = query.filter(Contact.phone_reversed >= key)
+        if upper is not None:
+            query = query.filter(Contact.phone_reversed < upper)
+    else:
+        key = phone_reversed(phone)
+        if key is None:
+            return []
+        query = query.filter(Contact.phone_reversed == key)
+    return query.order_by(Contact.phone_reversed).limit(limit).all()
+
 
 async def get_contact(contact_id: int, user: User, db: Session) -> Contact:
     """
@@ -124,6 +364,26 @@ async def get_contact(contact_id: int, user: User, db: Session) -> Contact:
     return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
 
 
+async def get_contacts_by_ids(contact_ids: List[int], user: User, db: Session) -> dict:
+    """
+    Retrieves the contacts with the specified IDs for a specific user in a single query.
+
+    :param contact_ids: The IDs of the contacts to retrieve, repeated IDs are returned once.
+    :type contact_ids: List[int]
+    :param user: The user to retrieve the contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The contacts in the requested order and the IDs that do not exist or belong to another user.
+    :rtype: dict
+    """
+    ids = list(dict.fromkeys(contact_ids))
+    found = {contact.id: contact for contact in
+             db.query(Contact).filter(and_(Contact.user_id == user.id, Contact.id.in_(ids))).all()}
+    return {"contacts": [found[contact_id] for contact_id in ids if contact_id in found],
+            "missing": [contact_id for contact_id in ids if contact_id not in found]}
+
+
 async def create_contact(body: ContactModel, user: User, db: Session) -> Contact:
     """
     Creates a new contact for a specific user.
@@ -138,13 +398,61 @@ async def create_contact(body: ContactModel, user: User, db: Session) -> Contact
     :rtype: Contact
     """
     contact = Contact(name=body.name, surname=body.surname, phone_number=body.phone_number,\
-                      email=body.email, birthday=body.birthday, user_id=user.id)
+                      email=body.email, birthday=body.birthday, user_id=user.id,\
+                      email_key=normalize_email(body.email), phone_key=normalize_phone(body.phone_number),\
+                      email_domain=email_domain(body.email), phone_e164=phone_e164(body.phone_number),\
+                      phone_reversed=phone_reversed(body.phone_number))
     db.add(contact)
     db.commit()
     db.refresh(contact)
+    await contact_changed(user.id, "created", [contact.id])
     return contact
 
 
+IMPORT_COLUMNS = ("name", "surname", "phone_number", "email", "birthday", "email_key", "phone_key", "email_domain",
+                  "phone_e164", "phone_reversed", "user_id")
+
+
+async def import_contacts(bodies: Iterable[ContactModel], user: User, db: Session, chunk_size: int = 10000) -> int:
+    """
+    Creates many contacts for a specific user at once, bypassing the ORM.
+
+    The contacts are normalized like in create_contact and written by merge_rows: on Postgres with COPY into
+    a staging table and a single INSERT ... SELECT, elsewhere with chunked bulk inserts. The contacts are read
+    and written in a worker thread, so the event loop keeps serving other requests. Either all contacts are
+    imported or, if reading them fails, none. The streams of the user get a single imported event
+    without IDs and reload the contacts.
+
+    :param bodies: The data for the contacts to create, read lazily.
+    :type bodies: Iterable[ContactModel]
+    :param user: The user to create the contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :param chunk_size: Number of contacts written at once.
+    :type chunk_size: int
+    :return: Number of imported contacts.
+    :rtype: int
+    :raises ValueError: If reading the contacts fails.
+    """
+    rows = ((body.name, body.surname, body.phone_number, body.email, body.birthday, normalize_email(body.email),
+             normalize_phone(body.phone_number), email_domain(body.email), phone_e164(body.phone_number),
+             phone_reversed(body.phone_number), user.id) for body in bodies)
+
+    def merge() -> int:
+        imported = merge_rows(db.connection(), Contact.__table__, IMPORT_COLUMNS, rows, chunk_size)
+        db.commit()
+        return imported
+
+    try:
+        imported = await run_in_threadpool(merge)
+    except Exception:
+        db.rollback()
+        raise
+    await contact_changed(user.id, "imported", [])
+    return imported
+
+
 async def remove_contact(contact_id: int, user: User, db: Session) -> Contact | None:
     """
     Removes a single contact with the specified ID for a specific user.
@@ -162,6 +470,7 @@ async def remove_contact(contact_id: int, user: User, db: Session) -> Contact |
     if contact:
         db.delete(contact)
         db.commit()
+        await contact_changed(user.id, "removed", [contact_id])
     return contact
 
 
@@ -182,10 +491,147 @@ async def update_contact(contact_id: int, body: ContactModel, user: User, db: Se
     """
     contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
     if contact:
-        contact.name=body.name, 
-        contact.surname=body.surname, 
-        contact.phone_number=body.phone_number,
-        contact.email=body.email, 
-        contact.birthday=body.birthday
+        contact.name = body.name
+        contact.surname = body.surname
+        contact.phone_number = body.phone_number
+        contact.email = body.email
+        contact.birthday = body.birthday
+        contact.email_key = normalize_email(body.email)
+        contact.phone_key = normalize_phone(body.phone_number)
+        contact.email_domain = email_domain(body.email)
+        contact.phone_e164 = phone_e164(body.phone_number)
+        contact.phone_reversed = phone_reversed(body.phone_number)
+        db.commit()
+        await contact_changed(user.id, "updated", [contact.id])
+    return contact
+
+
+async def get_history(contact_id: int, skip: int, user: User, limit: int, db: Session) -> List[ContactAudit]:
+    """
+    Retrieves the changes of a single contact of a specific user, newest first.
+
+    The history stays available after the contact is removed. Changes are written to the audit log
+    in batches, the latest of them may not be listed yet.
+
+    :param contact_id: The ID of the contact.
+    :type contact_id: int
+    :param skip: The number of changes to skip.
+    :type skip: int
+    :param user: The user to retrieve the changes for.
+    :type user: User
+    :param limit: The maximum number of changes to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: Session
+    :return: The changes of the contact.
+    :rtype: List[ContactAudit]
+    """
+    return db.query(ContactAudit)\
+        .filter(and_(ContactAudit.user_id == user.id, ContactAudit.contact_id == contact_id))\
+        .order_by(ContactAudit.id.desc()).offset(skip).limit(limit).all()
+
+
+async def get_duplicates(user: User, db: Session) -> List[dict]:
+    """
+    Finds groups of contacts of a specific user that share a normalized email or phone number.
+
+    Phone numbers are compared in the E.164 format, so a national number and the same number with the country
+    code are duplicates. Contacts are counted per key with window functions over the contacts of the user,
+    so the duplicates are found in a single query without loading the other contacts.
+
+    :param user: The user to find duplicates for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Groups with the shared field, its normalized value and the contacts.
+    :rtype: List[dict]
+    """
+    counts = db.query(Contact.id,
+                      func.count().over(partition_by=Contact.email_key).label("email_count"),
+                      func.count().over(partition_by=Contact.phone_e164).label("phone_count"))\
+        .filter(Contact.user_id == user.id).subquery()
+    rows = db.query(Contact, counts.c.email_count, counts.c.phone_count)\
+        .join(counts, Contact.id == counts.c.id)\
+        .filter(or_(counts.c.email_count > 1, counts.c.phone_count > 1)).all()
+
+    groups = []
+    for field, key, count_index in (("email", "email_key", 1), ("phone_number", "phone_e164", 2)):
+        duplicated = sorted((row[0] for row in rows if row[count_index] > 1 and getattr(row[0], key) is not None),
+                            key=lambda c: (getattr(c, key), c.id))
+        for value, contacts in groupby(duplicated, key=lambda c: getattr(c, key)):
+            groups.append({"field": field, "key": value, "contacts": list(contacts)})
+    return groups
+
+
+async def merge_contacts(contact_id: int, duplicate_ids: List[int], user: User, db: Session) -> Contact | None:
+    """
+    Merges duplicates into a single contact of a specific user: the contact is kept and gets the tags
+    of the duplicates, the duplicates are removed.
+
+    :param contact_id: The ID of the contact to keep.
+    :type contact_id: int
+    :param duplicate_ids: The IDs of the contacts to remove.
+    :type duplicate_ids: List[int]
+    :param user: The user to merge the contacts for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The kept contact, or None if it does not exist.
+    :rtype: Contact | None
+    """
+    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    if contact:
+        duplicates = db.query(Contact).filter(and_(Contact.id.in_(set(duplicate_ids) - {contact_id}),
+                                                   Contact.user_id == user.id)).all()
+        contact.tags = list({tag.id: tag for c in [contact, *duplicates] for tag in c.tags}.values())
+        for duplicate in duplicates:
+            db.delete(duplicate)
         db.commit()
+        await contact_changed(user.id, "merged", [contact.id, *(duplicate.id for duplicate in duplicates)])
     return contact
+
+
+async def get_stats(user: User, db: Session, today: date, weeks: int = 12, domains: int = 5) -> dict:
+    """
+    Computes the statistics of the contacts of a specific user.
+
+    Every figure is counted by the database with a GROUP BY over the contacts of the user,
+    no contact is loaded. The weeks are the buckets of a CASE expression, so the same query
+    works on every database.
+
+    :param user: The user to compute the statistics for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :param today: The current day, its week is the last one counted.
+    :type today: date
+    :param weeks: The number of recent weeks to count added contacts for.
+    :type weeks: int
+    :param domains: The number of the most frequent email domains to list.
+    :type domains: int
+    :return: Total, birthdays per month, contacts added per week and the top email domains.
+    :rtype: dict
+    """
+    month = extract('month', Contact.birthday)
+    per_month = {int(number): total for number, total in
+                 db.query(month, func.count(Contact.id)).filter(Contact.user_id == user.id).group_by(month).all()}
+
+    monday = today - timedelta(days=today.weekday())
+    starts = [monday - timedelta(weeks=weeks - 1 - number) for number in range(weeks)]
+    week = case(*((Contact.created_at >= datetime.combine(start, time.min), number)
+                  for number, start in reversed(list(enumerate(starts)))))
+    per_week = dict(db.query(week, func.count(Contact.id))
+                    .filter(and_(Contact.user_id == user.id, Contact.created_at >= datetime.combine(starts[0], time.min)))
+                    .group_by(week).all())
+
+    count = func.count(Contact.id)
+    top_domains = db.query(Contact.email_domain, count)\
+        .filter(and_(Contact.user_id == user.id, Contact.email_domain.isnot(None)))\
+        .group_by(Contact.email_domain).order_by(count.desc(), Contact.email_domain).limit(domains).all()
+
+    return {
+        "total": sum(per_month.values()),
+        "birthdays_per_month": {m: per_month.get(m, 0) for m in range(1, 13)},
+        "added_per_week": [{"week": start, "count": per_week.get(number, 0)} for number, start in enumerate(starts)],
+        "top_email_domains": [{"domain": domain, "count": total} for domain, total in top_domains],
+    }
@@ -0,0 +1,197 @@
+from typing import List
+
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.database.models import Contact, Tag, User, contact_tags
+from src.schemas import TagModel
+from src.services.events import contact_changed
+
+
+async def get_tags(skip: int, user: User, limit: int, db: Session) -> List[Tag]:
+    """
+    Retrieves a list of tags for a specific user with specified pagination parameters.
+
+    :param skip: The number of tags to skip.
+    :type skip: int
+    :param limit: The maximum number of tags to return.
+    :type limit: int
+    :param user: The user to retrieve tags for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: A list of tags.
+    :rtype: List[Tag]
+    """
+    return db.query(Tag).filter(Tag.user_id == user.id).order_by(Tag.name).offset(skip).limit(limit).all()
+
+
+async def get_tag(tag_id: int, user: User, db: Session) -> Tag:
+    """
+    Retrieves a single tag with the specified ID for a specific user.
+
+    :param tag_id: The ID of the tag to retrieve.
+    :type tag_id: int
+    :param user: The user to retrieve the tag for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The tag with the specified ID, or None if it does not exist.
+    :rtype: Tag | None
+    """
+    return db.query(Tag).filter(and_(Tag.id == tag_id, Tag.user_id == user.id)).first()
+
+
+async def get_tag_by_name(name: str, user: User, db: Session) -> Tag:
+    """
+    Retrieves a single tag with the specified name for a specific user.
+
+    :param name: The name of the tag to retrieve.
+    :type name: str
+    :param user: The user to retrieve the tag for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The tag with the specified name, or None if it does not exist.
+    :rtype: Tag | None
+    """
+    return db.query(Tag).filter(and_(Tag.name == name, Tag.user_id == user.id)).first()
+
+
+async def get_tagged_contact_ids(tag_id: int, db: Session) -> List[int]:
+    """
+    Retrieves the IDs of the contacts that have a tag.
+
+    :param tag_id: The ID of the tag.
+    :type tag_id: int
+    :param db: The database session.
+    :type db: Session
+    :return: IDs of the tagged contacts.
+    :rtype: List[int]
+    """
+    return [row.contact_id for row in db.query(contact_tags.c.contact_id).filter(contact_tags.c.tag_id == tag_id).all()]
+
+
+async def create_tag(body: TagModel, user: User, db: Session) -> Tag | None:
+    """
+    Creates a new tag for a specific user.
+
+    The name is checked by the unique constraint of the table, so two concurrent requests cannot both create it.
+
+    :param body: The data for the tag to create.
+    :type body: TagModel
+    :param user: The user to create the tag for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The newly created tag, or None if the user already has a tag with this name.
+    :rtype: Tag | None
+    """
+    tag = Tag(name=body.name, user_id=user.id)
+    db.add(tag)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    db.refresh(tag)
+    return tag
+
+
+async def update_tag(tag_id: int, body: TagModel, user: User, db: Session) -> Tag | None:
+    """
+    Renames a single tag with the specified ID for a specific user, the tagged contacts are reported as updated.
+
+    :param tag_id: The ID of the tag to update.
+    :type tag_id: int
+    :param body: The updated data for the tag.
+    :type body: TagModel
+    :param user: The user to update the tag for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The updated tag, or None if it does not exist.
+    :rtype: Tag | None
+    """
+    tag = db.query(Tag).filter(and_(Tag.id == tag_id, Tag.user_id == user.id)).first()
+    if tag and tag.name != body.name:
+        tag.name = body.name
+        db.commit()
+        contact_ids = await get_tagged_contact_ids(tag.id, db)
+        if contact_ids:
+            await contact_changed(user.id, "updated", contact_ids)
+    return tag
+
+
+async def remove_tag(tag_id: int, user: User, db: Session) -> Tag | None:
+    """
+    Removes a single tag with the specified ID for a specific user, the tagged contacts are kept and reported
+    as updated.
+
+    :param tag_id: The ID of the tag to remove.
+    :type tag_id: int
+    :param user: The user to remove the tag for.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The removed tag, or None if it does not exist.
+    :rtype: Tag | None
+    """
+    tag = db.query(Tag).filter(and_(Tag.id == tag_id, Tag.user_id == user.id)).first()
+    if tag:
+        contact_ids = await get_tagged_contact_ids(tag.id, db)
+        db.delete(tag)
+        db.commit()
+        if contact_ids:
+            await contact_changed(user.id, "updated", contact_ids)
+    return tag
+
+
+async def tag_contact(contact_id: int, tag_id: int, user: User, db: Session) -> Contact | None:
+    """
+    Adds a tag to a contact of a specific user.
+
+    :param contact_id: The ID of the contact to tag.
+    :type contact_id: int
+    :param tag_id: The ID of the tag to add.
+    :type tag_id: int
+    :param user: The user who owns the contact and the tag.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The tagged contact, or None if the contact or the tag does not exist.
+    :rtype: Contact | None
+    """
+    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    tag = db.query(Tag).filter(and_(Tag.id == tag_id, Tag.user_id == user.id)).first()
+    if contact is None or tag is None:
+        return None
+    if tag not in contact.tags:
+        contact.tags.append(tag)
+        db.commit()
+        await contact_changed(user.id, "updated", [contact_id])
+    return contact
+
+
+async def untag_contact(contact_id: int, tag_id: int, user: User, db: Session) -> Contact | None:
+    """
+    Removes a tag from a contact of a specific user.
+
+    :param contact_id: The ID of the contact to untag.
+    :type contact_id: int
+    :param tag_id: The ID of the tag to remove.
+    :type tag_id: int
+    :param user: The user who owns the contact.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The untagged contact, or None if it does not exist.
+    :rtype: Contact | None
+    """
+    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    if contact and any(tag.id == tag_id for tag in contact.tags):
+        contact.tags = [tag for tag in contact.tags if tag.id != tag_id]
+        db.commit()
+        await contact_changed(user.id, "updated", [contact_id])
+    return contact
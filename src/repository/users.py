@@ -1,8 +1,7 @@
-from libgravatar import Gravatar
-from sqlalchemy.orm import Session
-import sys
+from datetime import datetime
 
-sys.path.append("..")
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
 
 from src.database.models import User
 from src.schemas import UserModel
@@ -33,6 +32,8 @@ async def create_user(body: UserModel, db: Session) -> User:
     :return: The newly created user.
     :rtype: User
     """
+    from libgravatar import Gravatar
+
     avatar = None
     try:
         g = Gravatar(body.email)
@@ -46,6 +47,25 @@ async def create_user(body: UserModel, db: Session) -> User:
     return new_user
 
 
+def token_expiry(token: str) -> datetime | None:
+    """
+    Reads the expiry of a token issued by the application, without verifying it.
+
+    :param token: The token.
+    :type token: str
+    :return: The expiry in UTC, or None if the token has none.
+    :rtype: datetime | None
+    """
+    from jose import jwt
+    from jose.exceptions import JWTError
+
+    try:
+        expires = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    return datetime.utcfromtimestamp(expires) if expires is not None else None
+
+
 async def update_token(user: User, token: str | None, db: Session) -> None:
     """
     Updates a token.
@@ -60,6 +80,7 @@ async def update_token(user: User, token: str | None, db: Session) -> None:
     :rtype: None
     """
     user.refresh_token = token
+    user.refresh_token_expires_at = token_expiry(token) if token else None
     db.commit()
 
 
@@ -76,4 +97,71 @@ async def confirmed_email(email: str, db: Session) -> None:
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
\ No newline at end of file
+    db.commit()
+
+async def update_avatar(user: User, url: str, db: Session) -> User:
+    """
+    Updates the avatar of a specific user.
+
+    :param user: The user to update the avatar for.
+    :type user: User
+    :param url: URL of the new avatar.
+    :type url: str
+    :param db: The database session.
+    :type db: Session
+    :return: The updated user.
+    :rtype: User
+    """
+    user.avatar = url
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+async def remove_unconfirmed_users(before: datetime, limit: int, db: Session) -> int:
+    """
+    Removes a batch of users who have not confirmed their email since before a time, in a short transaction.
+
+    The batch is found by the (confirmed, crated_at) index. A user who confirms in the meantime is kept.
+
+    :param before: Users who have signed up before this time are removed.
+    :type before: datetime
+    :param limit: The most users removed at once.
+    :type limit: int
+    :param db: The database session.
+    :type db: Session
+    :return: Number of removed users, less than limit once none are left.
+    :rtype: int
+    """
+    ids = [user_id for user_id, in db.query(User.id)
+           .filter(and_(User.confirmed == False, User.created_at < before)).limit(limit)]
+    if not ids:
+        return 0
+    removed = db.query(User).filter(and_(User.id.in_(ids), User.confirmed == False))\
+        .delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+async def clear_expired_tokens(now: datetime, limit: int, db: Session) -> int:
+    """
+    Clears a batch of refresh tokens that have expired, in a short transaction.
+
+    The batch is found by the refresh_token_expires_at index.
+
+    :param now: Tokens that expire before this time are cleared.
+    :type now: datetime
+    :param limit: The most tokens cleared at once.
+    :type limit: int
+    :param db: The database session.
+    :type db: Session
+    :return: Number of cleared tokens, less than limit once none are left.
+    :rtype: int
+    """
+    ids = [user_id for user_id, in db.query(User.id).filter(User.refresh_token_expires_at < now).limit(limit)]
+    if not ids:
+        return 0
+    cleared = db.query(User).filter(and_(User.id.in_(ids), User.refresh_token_expires_at < now))\
+        .update({User.refresh_token: None, User.refresh_token_expires_at: None}, synchronize_session=False)
+    db.commit()
+    return cleared
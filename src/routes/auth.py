@@ -1,55 +1,69 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException, Depends, status, Security
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
-from fastapi_limiter.depends import RateLimiter
-import sys, os
-sys.path.append(os.path.abspath('..'))
+from src.services.throttle import Throttle
 
 from src.database.db import get_db
 from src.schemas import UserModel, UserResponse, TokenModel
 from src.repository import users as repository_users
 from src.services.auth import auth_service
 
-from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request, Header
 from src.services.email import send_email
+from src.services.idempotency import idempotency
+from src.services.login_guard import login_guard
 
 
 router = APIRouter(prefix='/auth', tags=["auth"])
 security = HTTPBearer()
 
 
-@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(Throttle(times=2, seconds=5))])
+async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request,
+                 idempotency_key: Optional[str] = Header(None, max_length=255), db: Session = Depends(get_db)):
     """
     Processing the /signup route - pages for user registration.
 
+    A retry with the same Idempotency-Key header gets the first response back without hashing the password again.
+
     :param body: User View Model.
     :type body: UserModel
     :param background_tasks: A variable that for asynchronously sending emails.
     :type background_tasks: BackgroundTasks
     :param request: Variable for http requests.
     :type request: Request
+    :param idempotency_key: Unique key of the request chosen by the client.
+    :type idempotency_key: str | None
     :param db: The database session.
     :type db: Session
     :return: Returns the new user and notification of the success of the operation.
     :rtype: dict
     """
-    exist_user = await repository_users.get_user_by_email(body.email, db)
-    if exist_user:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
-    new_user = await repository_users.create_user(body, db)
-    background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
-    return {"user": new_user, "detail": "User successfully created. Check your email for confirmation."}
+    async def create():
+        exist_user = await repository_users.get_user_by_email(body.email, db)
+        if exist_user:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
+        user = body.copy(update={"password": auth_service.get_password_hash(body.password)})
+        new_user = await repository_users.create_user(user, db)
+        background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
+        return UserResponse(user=new_user, detail="User successfully created. Check your email for confirmation.")
+
+    return await idempotency.run("signup", idempotency_key, body, create, status.HTTP_201_CREATED,
+                                 exclude={"password"})
 
 
 @router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
     Processing the /login route - pages for user authorization.
 
+    After repeated failures the account and the client IP are blocked for a growing time, a blocked login
+    gets 429 with Retry-After before the user is loaded or the password is hashed.
+
+    :param request: Variable for http requests.
+    :type request: Request
     :param body: A variable that contains the name and password of a specific user.
     :type body: OAuth2PasswordRequestForm
     :param db: The database session.
@@ -57,13 +71,23 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
     :return: Returns unique tokens for accessing the user account.
     :rtype: dict
     """
+    ip = request.client.host if request.client else ""
+    retry_after = await login_guard.check(body.username, ip)
+    if retry_after:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many failed login attempts, retry later",
+                            headers={"Retry-After": str(retry_after)})
     user = await repository_users.get_user_by_email(body.username, db)
     if user is None:
+        login_guard.dummy_verify(body.password)
+        await login_guard.failed(body.username, ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
     if not auth_service.verify_password(body.password, user.password):
+        await login_guard.failed(body.username, ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+    await login_guard.succeeded(body.username)
     # Generate JWT
     access_token = await auth_service.create_access_token(data={"sub": user.email})
     refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
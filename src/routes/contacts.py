@@ -1,30 +1,47 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, status, Header, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import sys, os
-sys.path.append(os.path.abspath('..'))
 
 from src.services.auth import auth_service
 from src.database.models import User
-from src.database.db import get_db
-from src.schemas import ContactModel, ContactResponse
+from src.database.db import get_db, get_read_db, pin_primary
+from src.schemas import ContactModel, ContactResponse, DuplicateGroup, ContactMergeModel, ContactStats,\
+    ContactBatchModel, ContactBatchResponse, ContactFilter, ContactImportResponse, ContactAuditResponse
 from src.repository import contacts as repository_contacts
+from src.services.idempotency import idempotency
+from src.services import digests, events
+from src.services.contact_import import read_contacts_csv
+from src.services.normalize import normalize_phone, phone_e164
+from src.services import stats as contact_stats
+from src.conf.config import settings
 
-from fastapi_limiter.depends import RateLimiter
+from src.services.throttle import Throttle
 
 router = APIRouter(prefix='/contacts', tags=["contacts"])
 
+MAX_BATCH_QUERY_IDS = 100
+
 
 @router.get("/", response_model=List[ContactResponse])
-async def read_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db),\
+async def read_contacts(skip: int = 0, limit: int = 100, filters: ContactFilter = Depends(), sort: Optional[str] = None,\
+                        db: Session = Depends(get_read_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Processing the / route - pages to view all user contacts.
 
+    The criteria can be combined and are matched by a single query. Sorting by a key without an index
+    is rejected for users with more than contact_unindexed_sort_limit contacts.
+
     :param skip: The number of contacts to skip.
     :type skip: int
     :param limit: The maximum number of contacts to return.
     :type limit: int
+    :param filters: The criteria the contacts must match.
+    :type filters: ContactFilter
+    :param sort: Comma separated sort keys, a key with a leading minus sorts in descending order.
+    :type sort: str | None
     :param current_user: User data.
     :type current_user: User
     :param db: The database session.
@@ -32,15 +49,27 @@ async def read_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(g
     :return: Returns the user's contact list.
     :rtype: list
     """
-    contacts = await repository_contacts.get_contacts(skip, current_user, limit, db)
+    try:
+        order = repository_contacts.parse_sort(sort)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(error))
+    if not repository_contacts.is_indexed(order) and \
+            await repository_contacts.count_contacts(current_user, db) > settings.contact_unindexed_sort_limit:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Sorting more than {settings.contact_unindexed_sort_limit} contacts by this key "
+                                   f"is not supported")
+    contacts = await repository_contacts.search_contacts(skip, current_user, limit, db, filters, order)
     return contacts
 
 @router.get("/days_to_birthday", response_model=List[ContactResponse])
-async def read_birthdays(skip: int = 0, limit: int = 100, db: Session = Depends(get_db),\
+async def read_birthdays(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Processing the /days_to_birthday route - pages to view a user's contacts who have a birthday this week.
 
+    The digest precomputed by the daily job is served when it is ready and the user has not changed their contacts
+    since, otherwise the contacts are queried.
+
     :param skip: The number of contacts to skip.
     :type skip: int
     :param limit: The maximum number of contacts to return.
@@ -52,11 +81,40 @@ async def read_birthdays(skip: int = 0, limit: int = 100, db: Session = Depends(
     :return: Returns the user's contact list whose birthday is this week.
     :rtype: list
     """
-    contacts = await repository_contacts.get_days_to_birthday(skip, current_user, limit, db)
+    today = digests.utc_today()
+    digest = await digests.get_digest(current_user, today)
+    if digest is not None:
+        return digest[skip:skip + limit]
+    contacts = await repository_contacts.get_days_to_birthday(skip, current_user, limit, db,
+                                                              days=settings.birthday_digest_days, today=today)
     return contacts
 
+@router.get("/stats", response_model=ContactStats)
+async def read_stats(db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /stats route - pages to view the statistics of a user's contacts.
+
+    The statistics are cached until the contacts change or for contact_stats_ttl seconds. They are computed
+    on the primary, a replica that lags behind a change could cache old statistics under the new version.
+
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns total contacts, birthdays per month, contacts added per week and top email domains.
+    :rtype: dict
+    """
+    version, stats = await contact_stats.get_cached_stats(current_user.id)
+    if stats is None:
+        stats = await repository_contacts.get_stats(current_user, db, datetime.utcnow().date(),
+                                                    weeks=settings.contact_stats_weeks,
+                                                    domains=settings.contact_stats_domains)
+        await contact_stats.cache_stats(current_user.id, version, stats)
+    return stats
+
 @router.get("/get_by_name", response_model=List[ContactResponse])
-async def read_names(skip: int = 0, limit: int = 100, name: str = "Olya", db: Session = Depends(get_db),\
+async def read_names(skip: int = 0, limit: int = 100, name: str = "Olya", tag: Optional[str] = None,\
+                        db: Session = Depends(get_read_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Processing the /get_by_name route - pages to view a user's contacts with a specific name.
@@ -67,6 +125,8 @@ async def read_names(skip: int = 0, limit: int = 100, name: str = "Olya", db: Se
     :type limit: int
     :param name: The name by which to search for contacts.
     :type name: str
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
     :param current_user: User data.
     :type current_user: User
     :param db: The database session.
@@ -74,11 +134,12 @@ async def read_names(skip: int = 0, limit: int = 100, name: str = "Olya", db: Se
     :return: Returns the user's contact list with given name.
     :rtype: list
     """
-    contacts = await repository_contacts.get_by_name(skip, current_user, limit, name, db)
+    contacts = await repository_contacts.get_by_name(skip, current_user, limit, name, db, tag=tag)
     return contacts
 
 @router.get("/get_by_surname", response_model=List[ContactResponse])
-async def read_surname(skip: int = 0, limit: int = 100, surname: str = "Ivanov", db: Session = Depends(get_db),\
+async def read_surname(skip: int = 0, limit: int = 100, surname: str = "Ivanov", tag: Optional[str] = None,\
+                        db: Session = Depends(get_read_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Processing the /get_by_surname route - pages to view a user's contacts with a specific surname.
@@ -89,6 +150,8 @@ async def read_surname(skip: int = 0, limit: int = 100, surname: str = "Ivanov",
     :type limit: int
     :param surname: The surname by which to search for contacts.
     :type surname: str
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
     :param current_user: User data.
     :type current_user: User
     :param db: The database session.
@@ -96,11 +159,12 @@ async def read_surname(skip: int = 0, limit: int = 100, surname: str = "Ivanov",
     :return: Returns the user's contact list with given surname.
     :rtype: list
     """
-    contacts = await repository_contacts.get_by_surname(skip, current_user, limit, surname, db)
+    contacts = await repository_contacts.get_by_surname(skip, current_user, limit, surname, db, tag=tag)
     return contacts
 
 @router.get("/get_by_email", response_model=List[ContactResponse])
-async def read_email(skip: int = 0, limit: int = 100, email: str = "TestEmail@gmail.com", db: Session = Depends(get_db),\
+async def read_email(skip: int = 0, limit: int = 100, email: str = "TestEmail@gmail.com", tag: Optional[str] = None,\
+                        db: Session = Depends(get_read_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Processing the /get_by_email route - pages to view a user's contacts with a specific email.
@@ -111,6 +175,8 @@ async def read_email(skip: int = 0, limit: int = 100, email: str = "TestEmail@gm
     :type limit: int
     :param email: The email by which to search for contacts.
     :type email: str
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
     :param current_user: User data.
     :type current_user: User
     :param db: The database session.
@@ -118,12 +184,121 @@ async def read_email(skip: int = 0, limit: int = 100, email: str = "TestEmail@gm
     :return: Returns the user's contact list with given email.
     :rtype: list
     """
-    contacts = await repository_contacts.get_by_email(skip, current_user, limit, email, db)
+    contacts = await repository_contacts.get_by_email(skip, current_user, limit, email, db, tag=tag)
     return contacts
 
 
+@router.get("/lookup", response_model=List[ContactResponse])
+async def lookup_contacts(phone: str = Query(..., max_length=32), match: str = Query("exact", regex="^(exact|suffix)$"),\
+                          limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_read_db),\
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /lookup route - finds who is calling: the user's contacts with a phone number.
+
+    The number is brought to E.164, so +380 97 123 45 67 and 097-123-45-67 find the same contacts.
+    With match=suffix the contacts whose numbers end with the given digits are found.
+
+    :param phone: The phone number, or its last digits.
+    :type phone: str
+    :param match: exact or suffix.
+    :type match: str
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the user's contacts with the phone number.
+    :rtype: list
+    """
+    suffix = match == "suffix"
+    if suffix and len(normalize_phone(phone)) < settings.contact_lookup_min_suffix:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"At least {settings.contact_lookup_min_suffix} digits are required")
+    if not suffix and phone_e164(phone) is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid phone number")
+    return await repository_contacts.lookup_contacts(phone, current_user, limit, db, suffix=suffix)
+
+
+@router.get("/duplicates", response_model=List[DuplicateGroup])
+async def read_duplicates(db: Session = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /duplicates route - pages to view a user's contacts that share an email or a phone number.
+
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns groups of duplicated contacts.
+    :rtype: list
+    """
+    return await repository_contacts.get_duplicates(current_user, db)
+
+
+@router.get("/batch", response_model=ContactBatchResponse)
+async def read_batch(ids: List[int] = Query(...), db: Session = Depends(get_read_db),\
+                     current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /batch route - pages to view several contacts at once.
+
+    Up to MAX_BATCH_QUERY_IDS IDs fit into the query string, use the POST route for longer lists.
+
+    :param ids: IDs of the contacts, the ids parameter is repeated for every ID.
+    :type ids: List[int]
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the found contacts in the requested order and the IDs that were not found.
+    :rtype: dict
+    """
+    if len(ids) > MAX_BATCH_QUERY_IDS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"At most {MAX_BATCH_QUERY_IDS} ids are allowed, use POST /batch")
+    return await repository_contacts.get_contacts_by_ids(ids, current_user, db)
+
+
+@router.post("/batch", response_model=ContactBatchResponse)
+async def read_batch_post(body: ContactBatchModel, db: Session = Depends(get_read_db),\
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /batch route - pages to view a long list of contacts at once.
+
+    :param body: IDs of the contacts.
+    :type body: ContactBatchModel
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the found contacts in the requested order and the IDs that were not found.
+    :rtype: dict
+    """
+    return await repository_contacts.get_contacts_by_ids(body.ids, current_user, db)
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_changes(db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /stream route - server-sent events with the changes of a user's contacts.
+
+    Every change is sent as a contact event with the action and the IDs of the changed contacts. After a reset
+    event, or when the stream ends, the client reconnects and reloads the contacts it shows.
+
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the stream of changes.
+    :rtype: StreamingResponse
+    """
+    # The session that has loaded the user would otherwise keep its connection for as long as the stream runs.
+    db.close()
+    return StreamingResponse(events.event_stream(current_user.id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @router.get("/{contact_id}", response_model=ContactResponse)
-async def read_contact(contact_id: int, db: Session = Depends(get_db),\
+async def read_contact(contact_id: int, db: Session = Depends(get_read_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Processing the /{contact_id} route - pages to view a specific contact.
@@ -143,14 +318,44 @@ async def read_contact(contact_id: int, db: Session = Depends(get_db),\
     return contact
 
 
-@router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def create_contact(body: ContactModel, db: Session = Depends(get_db),\
-                        current_user: User = Depends(auth_service.get_current_user)):
+@router.get("/{contact_id}/history", response_model=List[ContactAuditResponse])
+async def read_history(contact_id: int, skip: int = 0, limit: int = Query(50, ge=1, le=500),\
+                       db: Session = Depends(get_read_db),\
+                       current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /{contact_id}/history route - pages to view the changes of a contact, newest first.
+
+    The history of a removed contact is still available.
+
+    :param contact_id: Unique contact ID.
+    :type contact_id: int
+    :param skip: The number of changes to skip.
+    :type skip: int
+    :param limit: The maximum number of changes to return.
+    :type limit: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the changes of the contact.
+    :rtype: list
+    """
+    return await repository_contacts.get_history(contact_id, skip, current_user, limit, db)
+
+
+@router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(Throttle(times=2, seconds=5, pin_primary=True))])
+async def create_contact(body: ContactModel, idempotency_key: Optional[str] = Header(None, max_length=255),\
+                         db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Processing the / route - pages to create a contact.
 
+    A retry with the same Idempotency-Key header gets the first response back instead of creating a duplicate.
+
     :param body: Form (with fields) for creating a contact.
     :type body: ContactModel
+    :param idempotency_key: Unique key of the request chosen by the client.
+    :type idempotency_key: str | None
     :param current_user: User data.
     :type current_user: User
     :param db: The database session.
@@ -158,10 +363,65 @@ async def create_contact(body: ContactModel, db: Session = Depends(get_db),\
     :return: Returns created contact.
     :rtype: Contact
     """
-    return await repository_contacts.create_contact(body, current_user, db)
+    async def create():
+        contact = await repository_contacts.create_contact(body, current_user, db)
+        return ContactResponse.from_orm(contact)
+
+    return await idempotency.run(f"contacts:{current_user.id}", idempotency_key, body, create, status.HTTP_201_CREATED)
+
+
+@router.post("/import", response_model=ContactImportResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(pin_primary)])
+async def import_contacts(file: UploadFile = File(...), db: Session = Depends(get_db),\
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /import route - pages to create many contacts from a CSV file.
+
+    The file has the columns name, surname, phone_number, email and birthday. If any row is invalid,
+    no contact is created.
+
+    :param file: CSV file with the contacts.
+    :type file: UploadFile
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the number of imported contacts.
+    :rtype: dict
+    """
+    contacts = read_contacts_csv(file.file, settings.contact_import_max_rows)
+    try:
+        imported = await repository_contacts.import_contacts(contacts, current_user, db,
+                                                             settings.contact_import_chunk_size)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(error))
+    return {"imported": imported}
+
+
+@router.post("/{contact_id}/merge", response_model=ContactResponse, dependencies=[Depends(pin_primary)])
+async def merge_contacts(body: ContactMergeModel, contact_id: int, db: Session = Depends(get_db),\
+                         current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /{contact_id}/merge route - pages to merge duplicates into a contact.
+
+    :param body: IDs of the duplicates to remove.
+    :type body: ContactMergeModel
+    :param contact_id: Unique ID of the contact to keep.
+    :type contact_id: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the kept contact.
+    :rtype: Contact
+    """
+    contact = await repository_contacts.merge_contacts(contact_id, body.duplicate_ids, current_user, db)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    return contact
 
 
-@router.put("/{contact_id}", response_model=ContactResponse)
+@router.put("/{contact_id}", response_model=ContactResponse, dependencies=[Depends(pin_primary)])
 async def update_contact(body: ContactModel, contact_id: int, db: Session = Depends(get_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -184,7 +444,7 @@ async def update_contact(body: ContactModel, contact_id: int, db: Session = Depe
     return contact
 
 
-@router.delete("/{contact_id}", response_model=ContactResponse)
+@router.delete("/{contact_id}", response_model=ContactResponse, dependencies=[Depends(pin_primary)])
 async def remove_contact(contact_id: int, db: Session = Depends(get_db),\
                         current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -0,0 +1,166 @@
+from typing import List
+from fastapi import APIRouter, HTTPException, Depends, status
+from sqlalchemy.orm import Session
+
+from src.services.auth import auth_service
+from src.database.models import User
+from src.database.db import get_db, get_read_db, pin_primary
+from src.schemas import TagModel, TagResponse, ContactResponse
+from src.repository import tags as repository_tags
+
+router = APIRouter(prefix='/tags', tags=["tags"])
+
+
+@router.get("/", response_model=List[TagResponse])
+async def read_tags(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db),\
+                    current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the / route - pages to view all user tags.
+
+    :param skip: The number of tags to skip.
+    :type skip: int
+    :param limit: The maximum number of tags to return.
+    :type limit: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the user's tag list.
+    :rtype: list
+    """
+    return await repository_tags.get_tags(skip, current_user, limit, db)
+
+
+@router.get("/{tag_id}", response_model=TagResponse)
+async def read_tag(tag_id: int, db: Session = Depends(get_read_db),\
+                   current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /{tag_id} route - pages to view a specific tag.
+
+    :param tag_id: Unique tag ID.
+    :type tag_id: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the specific tag.
+    :rtype: Tag
+    """
+    tag = await repository_tags.get_tag(tag_id, current_user, db)
+    if tag is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+    return tag
+
+
+@router.post("/", response_model=TagResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(pin_primary)])
+async def create_tag(body: TagModel, db: Session = Depends(get_db),\
+                     current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the / route - pages to create a tag.
+
+    :param body: Form (with fields) for creating a tag.
+    :type body: TagModel
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns created tag.
+    :rtype: Tag
+    """
+    tag = await repository_tags.create_tag(body, current_user, db)
+    if tag is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Tag already exists")
+    return tag
+
+
+@router.put("/{tag_id}", response_model=TagResponse, dependencies=[Depends(pin_primary)])
+async def update_tag(body: TagModel, tag_id: int, db: Session = Depends(get_db),\
+                     current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /{tag_id} route - pages to rename a tag.
+
+    :param body: Form (with fields) for updating a tag.
+    :type body: TagModel
+    :param tag_id: Unique tag ID.
+    :type tag_id: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns updated tag.
+    :rtype: Tag
+    """
+    existing = await repository_tags.get_tag_by_name(body.name, current_user, db)
+    if existing and existing.id != tag_id:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Tag already exists")
+    tag = await repository_tags.update_tag(tag_id, body, current_user, db)
+    if tag is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+    return tag
+
+
+@router.delete("/{tag_id}", response_model=TagResponse, dependencies=[Depends(pin_primary)])
+async def remove_tag(tag_id: int, db: Session = Depends(get_db),\
+                     current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /{tag_id} route - pages to remove a tag.
+
+    :param tag_id: Unique tag ID.
+    :type tag_id: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns removed tag.
+    :rtype: Tag
+    """
+    tag = await repository_tags.remove_tag(tag_id, current_user, db)
+    if tag is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+    return tag
+
+
+@router.put("/{tag_id}/contacts/{contact_id}", response_model=ContactResponse, dependencies=[Depends(pin_primary)])
+async def tag_contact(tag_id: int, contact_id: int, db: Session = Depends(get_db),\
+                      current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /{tag_id}/contacts/{contact_id} route - pages to add a tag to a contact.
+
+    :param tag_id: Unique tag ID.
+    :type tag_id: int
+    :param contact_id: Unique contact ID.
+    :type contact_id: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the tagged contact.
+    :rtype: Contact
+    """
+    contact = await repository_tags.tag_contact(contact_id, tag_id, current_user, db)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact or tag not found")
+    return contact
+
+
+@router.delete("/{tag_id}/contacts/{contact_id}", response_model=ContactResponse, dependencies=[Depends(pin_primary)])
+async def untag_contact(tag_id: int, contact_id: int, db: Session = Depends(get_db),\
+                        current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /{tag_id}/contacts/{contact_id} route - pages to remove a tag from a contact.
+
+    :param tag_id: Unique tag ID.
+    :type tag_id: int
+    :param contact_id: Unique contact ID.
+    :type contact_id: int
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the untagged contact.
+    :rtype: Contact
+    """
+    contact = await repository_tags.untag_contact(contact_id, tag_id, current_user, db)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    return contact
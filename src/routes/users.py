@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Path, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.db import get_db
+from src.database.models import User
+from src.repository import users as repository_users
+from src.schemas import UserDb
+from src.services import avatars
+from src.services.auth import auth_service
+from src.services.storage import storage
+
+router = APIRouter(prefix='/users', tags=["users"])
+
+
+@router.patch("/avatar", response_model=UserDb)
+async def update_avatar(file: UploadFile = File(...), db: Session = Depends(get_db),
+                        current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Processing the /avatar route - pages to upload the avatar of the user.
+
+    The image is cropped to a square and rendered in every size of avatar_sizes as WebP and JPEG.
+    The user gets the URL of the WebP of avatar_default_size, the other variants differ in the file name only.
+
+    :param file: The image.
+    :type file: UploadFile
+    :param current_user: User data.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Returns the user with the new avatar.
+    :rtype: User
+    """
+    data = await file.read(settings.avatar_max_bytes + 1)
+    if len(data) > settings.avatar_max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"The avatar must be at most {settings.avatar_max_bytes} bytes")
+    previous = avatars.avatar_version(current_user.id, current_user.avatar)
+    try:
+        version = await avatars.save_avatar(current_user.id, data)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(error))
+    user = await repository_users.update_avatar(
+        current_user, avatars.avatar_url(current_user.id, version, settings.avatar_default_size), db)
+    await avatars.remove_old_avatar(current_user.id, previous, version)
+    return user
+
+
+@router.get("/{user_id}/avatar/{version}/{name}", response_class=Response, include_in_schema=False)
+async def read_avatar(request: Request, user_id: int, version: str = Path(regex="^[0-9a-f]{16}$"),
+                      name: str = Path(regex=r"^\d+\.(webp|jpg)$")):
+    """
+    Processing the /{user_id}/avatar/{version}/{name} route - the avatar images.
+
+    Avatars are public like Gravatar images. A URL always shows the same image, so the response is cached
+    for a year and validated by its ETag.
+
+    :param request: Variable for http requests.
+    :type request: Request
+    :param user_id: The user.
+    :type user_id: int
+    :param version: Version of the avatar.
+    :type version: str
+    :param name: Size and format of the variant, like 128.webp.
+    :type name: str
+    :return: Returns the image.
+    :rtype: Response
+    """
+    return await storage.response(f"{user_id}/{version}/{name}", request,
+                                  {"Cache-Control": avatars.CACHE_CONTROL})
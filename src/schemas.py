@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class ContactBase(BaseModel):
@@ -29,6 +29,29 @@ class ContactModel(ContactBase):
     email: str = Field(max_length=50)
     birthday: date = Field()
 
+class TagModel(BaseModel):
+    """
+    This is the class that describes the tag fields.
+
+    :param name: Tag name.
+    :type name: str
+    """
+    name: str = Field(min_length=1, max_length=25)
+
+
+class TagResponse(TagModel):
+    """
+    Tag model when returning a result.
+
+    :param id: Tag id.
+    :type id: int
+    """
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
 class ContactResponse(ContactBase):
     """
     Contact model when returning a result.
@@ -39,14 +62,169 @@ class ContactResponse(ContactBase):
     :type email: str
     :param birthday: Contact birthday date.
     :type birthday: date
+    :param phone_e164: Contact phone number in the E.164 format.
+    :type phone_e164: str | None
+    :param tags: Contact tags.
+    :type tags: List[TagResponse]
     """
     id: int
     email: str
     birthday: date
+    phone_e164: Optional[str] = None
+    tags: List[TagResponse] = []
 
     class Config:
             orm_mode = True
 
+class ContactFilter(BaseModel):
+    """
+    Criteria of the contact list, all given criteria must match.
+
+    :param name: Contact name.
+    :type name: str | None
+    :param surname: Contact surname.
+    :type surname: str | None
+    :param email: Contact email, compared after normalization.
+    :type email: str | None
+    :param email_domain: Domain of the contact email.
+    :type email_domain: str | None
+    :param birthday_month: Month of the contact birthday, from 1 to 12.
+    :type birthday_month: int | None
+    :param tag: The name of the tag the contacts must have.
+    :type tag: str | None
+    """
+    name: Optional[str] = Field(None, max_length=50)
+    surname: Optional[str] = Field(None, max_length=50)
+    email: Optional[str] = Field(None, max_length=100)
+    email_domain: Optional[str] = Field(None, max_length=100)
+    birthday_month: Optional[int] = Field(None, ge=1, le=12)
+    tag: Optional[str] = Field(None, max_length=25)
+
+class DuplicateGroup(BaseModel):
+    """
+    Group of contacts that share a normalized email or phone number.
+
+    :param field: The field the contacts share, email or phone_number.
+    :type field: str
+    :param key: The normalized value of the field.
+    :type key: str
+    :param contacts: Contacts of the group.
+    :type contacts: List[ContactResponse]
+    """
+    field: str
+    key: str
+    contacts: List[ContactResponse]
+
+
+class ContactMergeModel(BaseModel):
+    """
+    Contacts merged into another contact.
+
+    :param duplicate_ids: IDs of the contacts that are removed by the merge.
+    :type duplicate_ids: List[int]
+    """
+    duplicate_ids: List[int] = Field(min_items=1, max_items=100)
+
+
+class ContactBatchModel(BaseModel):
+    """
+    IDs of the contacts fetched at once.
+
+    :param ids: IDs of the contacts.
+    :type ids: List[int]
+    """
+    ids: List[int] = Field(min_items=1, max_items=1000)
+
+
+class ContactBatchResponse(BaseModel):
+    """
+    Contacts fetched at once.
+
+    :param contacts: The found contacts in the requested order.
+    :type contacts: List[ContactResponse]
+    :param missing: IDs of the contacts that were not found.
+    :type missing: List[int]
+    """
+    contacts: List[ContactResponse]
+    missing: List[int]
+
+
+class ContactImportResponse(BaseModel):
+    """
+    Result of an import of contacts.
+
+    :param imported: Number of imported contacts.
+    :type imported: int
+    """
+    imported: int
+
+
+class ContactAuditResponse(BaseModel):
+    """
+    A change of a contact.
+
+    :param id: Change id, increasing with the order of the changes.
+    :type id: int
+    :param contact_id: Contact id.
+    :type contact_id: int
+    :param action: What has happened: created, updated, removed or merged.
+    :type action: str
+    :param changed_at: Time of the change.
+    :type changed_at: datetime
+    """
+    id: int
+    contact_id: int
+    action: str
+    changed_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class WeekCount(BaseModel):
+    """
+    Number of contacts added in a week.
+
+    :param week: The Monday the week starts with.
+    :type week: date
+    :param count: Number of contacts.
+    :type count: int
+    """
+    week: date
+    count: int
+
+
+class DomainCount(BaseModel):
+    """
+    Number of contacts with an email domain.
+
+    :param domain: Email domain.
+    :type domain: str
+    :param count: Number of contacts.
+    :type count: int
+    """
+    domain: str
+    count: int
+
+
+class ContactStats(BaseModel):
+    """
+    Statistics of the user's contacts.
+
+    :param total: Number of contacts.
+    :type total: int
+    :param birthdays_per_month: Number of birthdays in every month, from 1 to 12.
+    :type birthdays_per_month: Dict[int, int]
+    :param added_per_week: Number of contacts added in each of the recent weeks, oldest first.
+    :type added_per_week: List[WeekCount]
+    :param top_email_domains: The most frequent email domains, most frequent first.
+    :type top_email_domains: List[DomainCount]
+    """
+    total: int
+    birthdays_per_month: Dict[int, int]
+    added_per_week: List[WeekCount]
+    top_email_domains: List[DomainCount]
+
 class UserModel(BaseModel):
     """
     User display model in API.
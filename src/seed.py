@@ -0,0 +1,154 @@
+"""
+Seeds the database with synthetic users and contacts for load testing::
+
+    python -m src.seed --users 100000 --contacts 100 --seed 1 --jobs 8
+
+The data is the same for the same seed and counts, however many jobs write it. Every user gets
+the password given by ``--password``. On Postgres the rows are written with COPY by parallel jobs,
+on SQLite with chunked bulk inserts by a single job.
+"""
+import argparse
+import multiprocessing
+import time
+from datetime import date, datetime
+from typing import Tuple
+
+from sqlalchemy import create_engine, func, select, text
+
+from src.conf.config import settings
+from src.database.bulk import insert_rows
+from src.database.models import Contact, User
+from src.services.synthetic import CONTACT_COLUMNS, USER_COLUMNS, generate_contacts, generate_user
+
+
+def seed_contacts(url: str, first_user: int, last_user: int, mean: float, limit: int, today: date,
+                  now: datetime, seed: int, chunk_size: int) -> int:
+    """
+    Writes the contacts of a range of users in one transaction, runs in a job process.
+
+    :param url: Database URL.
+    :type url: str
+    :param first_user: ID of the first user of the range.
+    :type first_user: int
+    :param last_user: ID after the last user of the range.
+    :type last_user: int
+    :param mean: Average number of contacts per user.
+    :type mean: float
+    :param limit: Most contacts a user can have.
+    :type limit: int
+    :param today: The day the ages are counted from.
+    :type today: date
+    :param now: The time the data set is generated at.
+    :type now: datetime
+    :param seed: Seed of the data set.
+    :type seed: int
+    :param chunk_size: Number of rows written at once.
+    :type chunk_size: int
+    :return: Number of written contacts.
+    :rtype: int
+    """
+    engine = create_engine(url)
+    rows = (row for user_id in range(first_user, last_user)
+            for row in generate_contacts(user_id, mean, limit, today, now, seed))
+    try:
+        with engine.begin() as connection:
+            return insert_rows(connection, Contact.__table__, CONTACT_COLUMNS, rows, chunk_size)
+    finally:
+        engine.dispose()
+
+
+def split(first: int, last: int, parts: int) -> list:
+    """
+    Splits a range of IDs into at most parts ranges of nearly equal length.
+
+    :param first: The first ID.
+    :type first: int
+    :param last: The ID after the last one.
+    :type last: int
+    :param parts: Number of ranges.
+    :type parts: int
+    :return: Pairs of the first ID and the ID after the last one.
+    :rtype: list
+    """
+    size = -(-(last - first) // max(parts, 1))
+    return [(start, min(start + size, last)) for start in range(first, last, max(size, 1))]
+
+
+def seed(url: str, users: int, contacts: float, seed_value: int, jobs: int, chunk_size: int,
+         password: str) -> Tuple[int, int]:
+    """
+    Adds users after the existing ones and their contacts.
+
+    :param url: Database URL.
+    :type url: str
+    :param users: Number of users.
+    :type users: int
+    :param contacts: Average number of contacts per user.
+    :type contacts: float
+    :param seed_value: Seed of the data set.
+    :type seed_value: int
+    :param jobs: Number of processes writing the contacts, 1 on SQLite.
+    :type jobs: int
+    :param chunk_size: Number of rows written at once.
+    :type chunk_size: int
+    :param password: Password of every user.
+    :type password: str
+    :return: Numbers of written users and contacts.
+    :rtype: Tuple[int, int]
+    """
+    from src.services.auth import auth_service
+
+    engine = create_engine(url)
+    today, now = date.today(), datetime.now().replace(microsecond=0)
+    limit = max(int(contacts * 50), 1)
+    with engine.begin() as connection:
+        first = (connection.execute(select(func.max(User.id))).scalar() or 0) + 1
+        password_hash = auth_service.get_password_hash(password)
+        insert_rows(connection, User.__table__, USER_COLUMNS,
+                    (generate_user(user_id, password_hash, now, seed_value) for user_id in range(first, first + users)),
+                    chunk_size)
+        if engine.dialect.name == "postgresql":
+            # Users were written with explicit IDs, the sequence has to continue after them.
+            connection.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), "
+                                    "(SELECT max(id) FROM users))"))
+    if engine.dialect.name != "postgresql":
+        jobs = 1
+    ranges = [(url, start, stop, contacts, limit, today, now, seed_value, chunk_size)
+              for start, stop in split(first, first + users, jobs)]
+    if jobs == 1:
+        written = sum(seed_contacts(*arguments) for arguments in ranges)
+    else:
+        engine.dispose()
+        with multiprocessing.get_context("spawn").Pool(jobs) as pool:
+            written = sum(pool.starmap(seed_contacts, ranges))
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("ANALYZE users, contacts"))
+    engine.dispose()
+    return users, written
+
+
+def main() -> None:
+    """
+    Parses the command line and seeds the database.
+
+    :return: None.
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.sqlalchemy_database_url)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--contacts", type=float, default=100, help="Average number of contacts per user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    users, contacts = seed(args.url, args.users, args.contacts, args.seed, args.jobs, args.chunk_size, args.password)
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {users} users and {contacts} contacts in {elapsed:.1f} s ({contacts / elapsed:.0f} contacts/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import uvicorn
+
+from src.conf.config import settings
+
+
+def main() -> None:
+    """
+    Runs the production server with ``settings.web_concurrency`` worker processes.
+
+    Each worker imports the application on its own and builds its database engine and Redis pool
+    in the application lifespan, so workers share nothing but Postgres and Redis.
+
+    :return: None.
+    :rtype: None
+    """
+    uvicorn.run(
+        "src.main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=settings.web_concurrency,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
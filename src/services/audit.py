@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+from src.database.bulk import insert_rows
+from src.database.models import ContactAudit
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("user_id", "contact_id", "action", "changed_at")
+
+metrics.describe("contact_audit_pending", "Audit entries of contact changes waiting to be written.")
+metrics.describe("contact_audit_written_total", "Audit entries of contact changes written to the database.")
+metrics.describe("contact_audit_dropped_total", "Audit entries dropped because the buffer stayed full.")
+metrics.describe("contact_audit_flush_failures_total", "Batches of audit entries that failed to be written.")
+metrics.describe("contact_audit_discarded_total", "Audit entries discarded because their batch could not be written.")
+
+
+class AuditLog:
+    """
+    A class that writes the history of contact changes behind the requests that make them.
+
+    A change only appends its entries to a buffer of the worker. A background task writes the buffer to
+    the contact_audit table in batches of batch_size entries, as soon as a batch is full and at least every
+    flush_interval seconds. A batch that fails with an OperationalError, e.g. while the database is unavailable,
+    is retried with the next flush up to max_attempts times. A batch that fails otherwise, e.g. because the
+    database rejects one of its entries, or that has run out of attempts is logged and discarded, so that it
+    never holds up the entries after it. The buffer holds
+    at most max_pending entries, counting those being written: when the writes fall behind, a change waits up
+    to max_wait seconds for room, and if there is still none its entries are dropped and counted, so the
+    requests never wait longer. The idle event is set whenever no entry is buffered or being written.
+
+    Until the log is started, e.g. in scripts that do not run the application lifespan, changes are ignored.
+
+    :param batch_size: How many entries are written at once.
+    :type batch_size: int
+    :param flush_interval: The longest time an entry waits to be written, in seconds.
+    :type flush_interval: float
+    :param max_pending: How many entries the buffer holds.
+    :type max_pending: int
+    :param max_wait: How long a change waits for room in the buffer, in seconds.
+    :type max_wait: float
+    :param max_attempts: How many times a batch is written before it is discarded.
+    :type max_attempts: int
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int, max_wait: float,
+                 max_attempts: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.failures = 0
+        self.pending: List[tuple] = []
+        self.in_flight = 0
+        self.engine: Optional[Engine] = None
+        self.flusher: Optional[asyncio.Task] = None
+        self.wakeup = asyncio.Event()
+        self.room = asyncio.Event()
+        self.room.set()
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def start(self, engine: Engine) -> None:
+        """
+        Starts writing the entries in the running event loop.
+
+        :param engine: The database the entries are written to.
+        :type engine: Engine
+        :return: None.
+        :rtype: None
+        """
+        self.engine = engine
+        self.flusher = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stops the background task and writes the remaining entries, used on shutdown.
+
+        :return: None.
+        :rtype: None
+        """
+        if self.flusher is None:
+            return
+        self.flusher.cancel()
+        try:
+            await self.flusher
+        except asyncio.CancelledError:
+            pass
+        self.flusher = None
+        await self.flush()
+
+    async def record(self, user_id: int, action: str, contact_ids: List[int]) -> None:
+        """
+        Adds the entries of a committed change to the buffer.
+
+        :param user_id: The user who changed the contacts.
+        :type user_id: int
+        :param action: What has happened.
+        :type action: str
+        :param contact_ids: IDs of the changed contacts, empty for an import.
+        :type contact_ids: List[int]
+        :return: None.
+        :rtype: None
+        """
+        if self.flusher is None:
+            return
+        changed_at = datetime.utcnow()
+        entries = [(user_id, contact_id, action, changed_at) for contact_id in contact_ids or [None]]
+        if not self.room.is_set():
+            try:
+                await asyncio.wait_for(self.room.wait(), self.max_wait)
+            except asyncio.TimeoutError:
+                metrics.inc("contact_audit_dropped_total", len(entries))
+                logger.warning("The audit log is behind, %d entries of user %d are dropped", len(entries), user_id)
+                return
+        self.pending.extend(entries)
+        self.update()
+
+    def update(self) -> None:
+        """
+        Signals the background task and the waiting changes after the buffer has changed.
+
+        :return: None.
+        :rtype: None
+        """
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+        buffered = len(self.pending) + self.in_flight
+        if buffered >= self.max_pending:
+            self.room.clear()
+        else:
+            self.room.set()
+        if buffered:
+            self.idle.clear()
+        else:
+            self.idle.set()
+        metrics.set("contact_audit_pending", buffered)
+
+    async def run(self) -> None:
+        """
+        Writes the buffer whenever a batch is full or the flush interval has passed, until it is cancelled.
+
+        :return: None.
+        :rtype: None
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Writes the buffered entries batch by batch, stopping at the first batch that is to be retried.
+
+        :return: None.
+        :rtype: None
+        """
+        while self.pending:
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            self.in_flight += len(batch)
+            self.update()
+            try:
+                await run_in_threadpool(self.write, batch)
+            except Exception as error:
+                metrics.inc("contact_audit_flush_failures_total")
+                self.failures += 1
+                if isinstance(error, OperationalError) and self.failures < self.max_attempts:
+                    logger.warning("Writing %d audit entries failed (attempt %d of %d), they are retried",
+                                   len(batch), self.failures, self.max_attempts, exc_info=True)
+                    self.pending[:0] = batch
+                    return
+                logger.exception("Writing %d audit entries failed, they are discarded: %r", len(batch), batch)
+                metrics.inc("contact_audit_discarded_total", len(batch))
+                self.failures = 0
+            else:
+                metrics.inc("contact_audit_written_total", len(batch))
+                self.failures = 0
+            finally:
+                self.in_flight -= len(batch)
+                self.update()
+
+    def write(self, batch: List[tuple]) -> None:
+        """
+        Appends a batch of entries to the contact_audit table in a single transaction.
+
+        :param batch: Values of COLUMNS.
+        :type batch: List[tuple]
+        :return: None.
+        :rtype: None
+        """
+        with self.engine.begin() as connection:
+            insert_rows(connection, ContactAudit.__table__, COLUMNS, batch, self.batch_size)
+
+
+audit_log = AuditLog(settings.contact_audit_batch_size, settings.contact_audit_flush_interval,
+                     settings.contact_audit_max_pending, settings.contact_audit_max_wait,
+                     settings.contact_audit_max_attempts)
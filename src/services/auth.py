@@ -1,13 +1,10 @@
+from functools import cached_property
 from typing import Optional
 
-from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-import sys, os
-sys.path.append(os.path.abspath('..'))
 
 from src.database.db import get_db
 from src.repository import users as repository_users
@@ -26,11 +23,24 @@ class Auth:
     :param oauth2_scheme: Encrypted user data.
     :type oauth2_scheme: OAuth2PasswordBearer
     """
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+    @cached_property
+    def pwd_context(self):
+        """
+        Creates the password hashing helper on first use, so passlib is not imported at startup.
+
+        :param self: Auth class instance.
+        :type self: Auth
+        :return: Helper for hashing passwords.
+        :rtype: CryptContext
+        """
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
     def verify_password(self, plain_password, hashed_password):
         """
         Checks for the hashed and plain password match.
@@ -70,6 +80,8 @@ class Auth:
         :return: Returns a new token.
         :rtype: str
         """
+        from jose import jwt
+
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=7)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire})
@@ -90,6 +102,8 @@ class Auth:
         :return: Returns a new access token.
         :rtype: str
         """
+        from jose import jwt
+
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
@@ -113,6 +127,8 @@ class Auth:
         :return: Returns a new refresh token.
         :rtype: str
         """
+        from jose import jwt
+
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
@@ -133,6 +149,8 @@ class Auth:
         :return: Returns email.
         :rtype: str
         """
+        from jose import JWTError, jwt
+
         try:
             payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
             if payload['scope'] == 'refresh_token':
@@ -155,6 +173,8 @@ class Auth:
         :return: Returns current user.
         :rtype: User
         """
+        from jose import JWTError, jwt
+
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+from src.conf.config import settings
+from src.services.storage import storage
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def render_variants(data: bytes, sizes: List[int], max_pixels: int) -> Dict[str, bytes]:
+    """
+    Crops an uploaded image to a centered square and renders it in every size as WebP and JPEG.
+
+    Runs in a process of the pool, so decoding and resizing never block the event loop.
+
+    :param data: The uploaded file.
+    :type data: bytes
+    :param sizes: Side lengths of the variants, in pixels.
+    :type sizes: List[int]
+    :param max_pixels: The largest image that is decoded, in pixels.
+    :type max_pixels: int
+    :return: Content of every variant by its file name, like 128.webp.
+    :rtype: Dict[str, bytes]
+    :raises ValueError: If the file is not an image or the image is too large.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Only the header has been read, the size is checked before the pixels are decoded.
+        if image.width * image.height > max_pixels:
+            raise ValueError(f"The image must have at most {max_pixels} pixels")
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValueError("The file is not a supported image")
+    variants = {}
+    for size in sizes:
+        variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            variant.save(buffer, image_format, **options)
+            variants[f"{size}.{extension}"] = buffer.getvalue()
+    return variants
+
+
+class AvatarProcessor:
+    """
+    A class that renders avatars in a pool of processes, started on the first upload.
+
+    :param processes: Number of processes.
+    :type processes: int
+    :param sizes: Side lengths of the variants, in pixels.
+    :type sizes: List[int]
+    :param max_pixels: The largest image that is decoded, in pixels.
+    :type max_pixels: int
+    """
+
+    def __init__(self, processes: int, sizes: List[int], max_pixels: int):
+        self.processes = processes
+        self.sizes = sizes
+        self.max_pixels = max_pixels
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    async def render(self, data: bytes) -> Dict[str, bytes]:
+        """
+        Renders the variants of an uploaded image in the pool.
+
+        :param data: The uploaded file.
+        :type data: bytes
+        :return: Content of every variant by its file name.
+        :rtype: Dict[str, bytes]
+        :raises ValueError: If the file is not an image or the image is too large.
+        """
+        if self.pool is None:
+            # Forking a worker with running threads is unsafe, the processes start from a fresh interpreter.
+            self.pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return await asyncio.get_running_loop().run_in_executor(
+            self.pool, partial(render_variants, data, self.sizes, self.max_pixels))
+
+    def stop(self) -> None:
+        """
+        Stops the pool, used on shutdown.
+
+        :return: None.
+        :rtype: None
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+processor = AvatarProcessor(settings.avatar_processes, settings.avatar_sizes, settings.avatar_max_pixels)
+
+
+def avatar_url(user_id: int, version: str, size: int, extension: str = "webp") -> str:
+    """
+    Builds the URL of an avatar variant.
+
+    :param user_id: The user.
+    :type user_id: int
+    :param version: Version of the avatar.
+    :type version: str
+    :param size: Side length of the variant.
+    :type size: int
+    :param extension: webp or jpg.
+    :type extension: str
+    :return: URL path.
+    :rtype: str
+    """
+    return f"/api/users/{user_id}/avatar/{version}/{size}.{extension}"
+
+
+async def save_avatar(user_id: int, data: bytes) -> str:
+    """
+    Renders and stores all variants of an uploaded avatar.
+
+    The version is a hash of the upload, so every avatar has its own URLs that are cached forever
+    and uploading the same image again changes nothing.
+
+    :param user_id: The user.
+    :type user_id: int
+    :param data: The uploaded file.
+    :type data: bytes
+    :return: Version of the avatar.
+    :rtype: str
+    :raises ValueError: If the file is not an image or the image is too large.
+    """
+    version = hashlib.sha256(data).hexdigest()[:16]
+    variants = await processor.render(data)
+    for name, content in variants.items():
+        await storage.save(f"{user_id}/{version}/{name}", content)
+    return version
+
+
+def avatar_version(user_id: int, url: Optional[str]) -> Optional[str]:
+    """
+    Finds the version of an uploaded avatar by its URL.
+
+    :param user_id: The user.
+    :type user_id: int
+    :param url: The avatar of the user, an uploaded one or another image like a Gravatar.
+    :type url: str | None
+    :return: Version of the avatar, or None if it was not uploaded.
+    :rtype: str | None
+    """
+    match = re.match(rf"/api/users/{user_id}/avatar/([0-9a-f]{{16}})/", url or "")
+    return match.group(1) if match else None
+
+
+async def remove_old_avatar(user_id: int, previous: Optional[str], version: str) -> None:
+    """
+    Removes the variants of the avatar a user had before an upload.
+
+    Only the version the user had before is removed, never all other versions: a concurrent upload may have
+    stored a version that the user already has by now.
+
+    :param user_id: The user.
+    :type user_id: int
+    :param previous: Version of the avatar before the upload, None if it was not uploaded.
+    :type previous: str | None
+    :param version: Version of the uploaded avatar.
+    :type version: str
+    :return: None.
+    :rtype: None
+    """
+    if previous is not None and previous != version:
+        await storage.delete(f"{user_id}/{previous}")
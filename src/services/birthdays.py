@@ -0,0 +1,124 @@
+import asyncio
+import calendar
+import json
+from datetime import date
+from itertools import groupby
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+from src.database.db import SessionLocal
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactResponse
+from src.services.email import send_birthday_digest
+from src.services.digests import DIGEST_TTL, digest_key
+from src.services.redis import get_redis
+
+def days_until(birthday: date, today: date) -> int:
+    """
+    Counts the days until the next birthday.
+
+    :param birthday: Date of birth.
+    :type birthday: date
+    :param today: The current day.
+    :type today: date
+    :return: Number of days, 0 if the birthday is today.
+    :rtype: int
+    """
+    for year in (today.year, today.year + 1):
+        if (birthday.month, birthday.day) == (2, 29) and not calendar.isleap(year):
+            next_birthday = date(year, 2, 28)
+        else:
+            next_birthday = birthday.replace(year=year)
+        if next_birthday >= today:
+            return (next_birthday - today).days
+    return 0
+
+
+def render_digests(digests: dict) -> dict:
+    """
+    Serializes the digests the way the /days_to_birthday route returns them.
+
+    :param digests: Contacts with upcoming birthdays by user ID.
+    :type digests: dict
+    :return: Digests as JSON by user ID.
+    :rtype: dict
+    """
+    return {user_id: json.dumps(jsonable_encoder([ContactResponse.from_orm(contact) for contact in user_contacts]))
+            for user_id, user_contacts in digests.items()}
+
+
+async def build_digests(day: date, db: Session) -> dict:
+    """
+    Computes the upcoming birthdays of all users and stores a digest per user in Redis.
+
+    The contacts are fetched with a single query and serialized in a worker thread, so the event loop keeps
+    serving requests. A digest lists the contacts by ID, in the order of the query the route falls back to.
+    Users without upcoming birthdays get no key;
+    the marker of the day tells readers that their digest is empty.
+
+    :param day: The day of the digest.
+    :type day: date
+    :param db: The database session.
+    :type db: Session
+    :return: Contacts with upcoming birthdays by user ID.
+    :rtype: dict
+    """
+    contacts = await repository_contacts.get_upcoming_birthdays(day, settings.birthday_digest_days, db)
+    digests = {}
+    for user_id, user_contacts in groupby(contacts, key=lambda contact: contact.user_id):
+        if user_id is None:
+            continue
+        digests[user_id] = list(user_contacts)
+    contents = await run_in_threadpool(render_digests, digests)
+
+    redis = get_redis()
+    async with redis.pipeline(transaction=False) as pipe:
+        for user_id, content in contents.items():
+            pipe.set(digest_key(day, user_id), content, nx=True, ex=DIGEST_TTL)
+        pipe.set(digest_key(day), len(digests), ex=DIGEST_TTL)
+        await pipe.execute()
+    return digests
+
+
+async def email_digests(day: date, digests: dict, db: Session) -> None:
+    """
+    Emails the digests to their confirmed users in batches, the nearest birthdays first.
+
+    :param day: The day of the digest.
+    :type day: date
+    :param digests: Contacts with upcoming birthdays by user ID.
+    :type digests: dict
+    :param db: The database session.
+    :type db: Session
+    :return: None.
+    :rtype: None
+    """
+    user_ids = list(digests)
+    batch_size = settings.birthday_digest_email_batch
+    for start in range(0, len(user_ids), batch_size):
+        users = db.query(User).filter(User.id.in_(user_ids[start:start + batch_size]), User.confirmed.is_(True)).all()
+        await asyncio.gather(*(send_birthday_digest(
+            user.email, user.username, sorted(digests[user.id], key=lambda contact: days_until(contact.birthday, day)))
+            for user in users))
+
+
+async def birthday_digest_job(day: date) -> None:
+    """
+    Daily job that precomputes the birthday digests and optionally emails them.
+
+    :param day: The day of the run.
+    :type day: date
+    :return: None.
+    :rtype: None
+    """
+    db = SessionLocal()
+    try:
+        digests = await build_digests(day, db)
+        if settings.birthday_digest_email:
+            await email_digests(day, digests, db)
+    finally:
+        db.close()
@@ -0,0 +1,39 @@
+import codecs
+import csv
+from typing import BinaryIO, Iterator
+
+from pydantic import ValidationError
+
+from src.schemas import ContactModel
+
+IMPORT_FIELDS = ("name", "surname", "phone_number", "email", "birthday")
+
+
+def read_contacts_csv(file: BinaryIO, max_rows: int) -> Iterator[ContactModel]:
+    """
+    Reads the contacts of a CSV file one by one, validated like the body of a created contact.
+
+    The first line names the columns: name, surname, phone_number, email and birthday (YYYY-MM-DD),
+    other columns are ignored. The file is read lazily, so a large import is never held in memory.
+
+    :param file: CSV file in UTF-8, with or without BOM.
+    :type file: BinaryIO
+    :param max_rows: How many contacts the file may contain.
+    :type max_rows: int
+    :return: Contacts in the order of the file.
+    :rtype: Iterator[ContactModel]
+    :raises ValueError: If a column is missing, a row is invalid or the file has too many rows.
+    """
+    reader = csv.DictReader(codecs.iterdecode(file, "utf-8-sig"))
+    missing = [field for field in IMPORT_FIELDS if field not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    for number, row in enumerate(reader, start=1):
+        if number > max_rows:
+            raise ValueError(f"At most {max_rows} contacts can be imported at once")
+        try:
+            yield ContactModel(**{field: row[field] for field in IMPORT_FIELDS})
+        except ValidationError as error:
+            problems = "; ".join(f"{'.'.join(map(str, problem['loc']))}: {problem['msg']}"
+                                 for problem in error.errors())
+            raise ValueError(f"Line {reader.line_num}: {problems}") from error
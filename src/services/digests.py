@@ -0,0 +1,69 @@
+import json
+from datetime import date, datetime
+from typing import List, Optional
+
+from src.database.models import User
+from src.services.redis import RedisBatch, get_redis
+
+DIGEST_TTL = 2 * 24 * 60 * 60
+STALE = "stale"
+
+
+def utc_today() -> date:
+    """
+    Returns the current day in UTC, the day of the digests and of the daily jobs.
+
+    :return: The current day.
+    :rtype: date
+    """
+    return datetime.utcnow().date()
+
+
+def digest_key(day: date, user_id: Optional[int] = None) -> str:
+    """
+    Builds the Redis key of a user's digest, or of the marker that the digests of the day are ready.
+
+    :param day: The day of the digest.
+    :type day: date
+    :param user_id: The user of the digest.
+    :type user_id: int | None
+    :return: Redis key.
+    :rtype: str
+    """
+    key = f"birthday_digest:{day.isoformat()}"
+    return key if user_id is None else f"{key}:{user_id}"
+
+
+def invalidate_digest(user_id: int, batch: RedisBatch) -> None:
+    """
+    Makes the digest of the current day of a user stale after their contacts have changed.
+
+    The digest is replaced by a mark rather than deleted, because a missing digest stands for one without
+    birthdays. The mark also keeps a daily job that is still running from storing a digest computed before the change.
+
+    :param user_id: The user whose contacts have changed.
+    :type user_id: int
+    :param batch: The batch the command is queued in.
+    :type batch: RedisBatch
+    :return: None.
+    :rtype: None
+    """
+    batch.queue("birthday_digest", "set", digest_key(utc_today(), user_id), STALE, ex=DIGEST_TTL)
+
+
+async def get_digest(user: User, day: date) -> Optional[List[dict]]:
+    """
+    Retrieves the precomputed birthday digest of a user.
+
+    :param user: The user to retrieve the digest for.
+    :type user: User
+    :param day: The day of the digest.
+    :type day: date
+    :return: Contacts with upcoming birthdays, or None if the digests of the day are not computed yet
+        or the user has changed their contacts since.
+    :rtype: List[dict] | None
+    """
+    ready, digest = await get_redis().mget(digest_key(day), digest_key(day, user.id))
+    if ready is None or digest == STALE:
+        return None
+    return json.loads(digest) if digest is not None else []
@@ -1,28 +1,38 @@
+from functools import lru_cache
 from pathlib import Path
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
-import sys
-
-sys.path.append("..")
 
 from src.services.auth import auth_service
 from src.conf.config import settings
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=EmailStr(settings.mail_from),
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Desired Name",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
+
+@lru_cache
+def get_mail_config():
+    """
+    Creates the mail connection config on first use.
+
+    fastapi_mail is imported here rather than at module level, because it is the slowest
+    import of the application and most processes never send an email.
+
+    :return: Mail connection config.
+    :rtype: ConnectionConfig
+    """
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=EmailStr(settings.mail_from),
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME="Desired Name",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+    )
 
 
 async def send_email(email: EmailStr, username: str, host: str):
@@ -38,6 +48,9 @@ async def send_email(email: EmailStr, username: str, host: str):
     :return: None.
     :rtype: None
     """
+    from fastapi_mail import FastMail, MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         token_verification = auth_service.create_email_token({"sub": email})
         message = MessageSchema(
@@ -47,7 +60,38 @@ async def send_email(email: EmailStr, username: str, host: str):
             subtype=MessageType.html
         )
 
-        fm = FastMail(conf)
+        fm = FastMail(get_mail_config())
         await fm.send_message(message, template_name="email_template.html")
     except ConnectionErrors as err:
         print(err)
+
+
+async def send_birthday_digest(email: EmailStr, username: str, contacts: list):
+    """
+    Sends the digest of upcoming birthdays to the user's email.
+
+    :param email: Validated field from the user's email.
+    :type email: EmailStr
+    :param username: Username.
+    :type username: str
+    :param contacts: Contacts whose birthday is coming.
+    :type contacts: list
+    :return: None.
+    :rtype: None
+    """
+    from fastapi_mail import FastMail, MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
+    try:
+        message = MessageSchema(
+            subject="Upcoming birthdays",
+            recipients=[email],
+            template_body={"username": username, "contacts": [
+                {"name": c.name, "surname": c.surname, "birthday": c.birthday.isoformat()} for c in contacts]},
+            subtype=MessageType.html
+        )
+
+        fm = FastMail(get_mail_config())
+        await fm.send_message(message, template_name="birthday_digest.html")
+    except ConnectionErrors as err:
+        print(err)
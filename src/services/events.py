@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from redis.asyncio.client import PubSub
+
+from src.conf.config import settings
+from src.services import digests, redis
+from src.services.audit import audit_log
+from src.services.stats import invalidate_stats
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "contact_events:"
+RESET = "reset"
+
+
+async def contact_changed(user_id: int, action: str, contact_ids: List[int]) -> None:
+    """
+    Reacts to a committed change of the contacts of a user.
+
+    Called by the write functions of the repositories. The change is added to the audit log, the cached
+    statistics and the birthday digest of the user are made stale and the change is published to the streams
+    of the user in all workers, all in a single round trip to Redis.
+    Without Redis, e.g. in scripts that do not run the application lifespan, there is nothing to react with
+    and the change is ignored.
+
+    :param user_id: The user who owns the contacts.
+    :type user_id: int
+    :param action: What has happened: created, updated, removed, merged or imported.
+    :type action: str
+    :param contact_ids: IDs of the changed contacts.
+    :type contact_ids: List[int]
+    :return: None.
+    :rtype: None
+    """
+    await audit_log.record(user_id, action, contact_ids)
+    if redis.redis_client is None:
+        return
+    batch = redis.RedisBatch()
+    invalidate_stats(user_id, batch)
+    digests.invalidate_digest(user_id, batch)
+    batch.queue("published", "publish", f"{CHANNEL_PREFIX}{user_id}",
+                json.dumps({"action": action, "contact_ids": contact_ids}))
+    await batch.send()
+
+
+class EventHub:
+    """
+    A class that fans the published contact changes out to the streams of the current worker.
+
+    The worker listens over a single Redis connection to the channels of the users who have a stream open
+    in it: the channel of a user is subscribed when their first stream opens and unsubscribed when the last one
+    closes, so a worker never receives the changes of other users. Every change goes into the queues of the streams
+    of its user. A stream that does not keep up gets a reset instead of the changes it has missed, a failure of
+    the Redis connection closes all streams; in both cases the client reconnects and reloads the contacts.
+
+    :param queue_size: How many changes may wait for a stream.
+    :type queue_size: int
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self.pubsub: Optional[PubSub] = None
+        self.listener: Optional[asyncio.Task] = None
+        # Subscribing and unsubscribing share the connection of the pub/sub, one at a time.
+        self.lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """
+        Registers a stream of a user for the time of the context.
+
+        :param user_id: The user whose changes are streamed.
+        :type user_id: int
+        :return: Queue that receives the changes as JSON, RESET or None when the stream has to end.
+        :rtype: AsyncIterator[asyncio.Queue]
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        first = not self.subscribers[user_id]
+        self.subscribers[user_id].add(queue)
+        try:
+            if first:
+                await self.follow(user_id)
+            yield queue
+        finally:
+            self.subscribers[user_id].discard(queue)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+                await self.unfollow(user_id)
+
+    async def follow(self, user_id: int) -> None:
+        """
+        Subscribes to the channel of a user, and starts listening if the worker does not listen yet.
+
+        If Redis fails, the streams of the user end.
+
+        :param user_id: The user whose first stream has opened.
+        :type user_id: int
+        :return: None.
+        :rtype: None
+        """
+        async with self.lock:
+            try:
+                if self.listener is None or self.listener.done():
+                    self.pubsub = redis.open_pubsub()
+                    await self.pubsub.subscribe(f"{CHANNEL_PREFIX}{user_id}")
+                    self.listener = asyncio.create_task(self.listen(self.pubsub))
+                else:
+                    await self.pubsub.subscribe(f"{CHANNEL_PREFIX}{user_id}")
+            except Exception:
+                logger.exception("Subscribing to the contact changes of user %d failed", user_id)
+                self.dispatch(user_id, None)
+
+    async def unfollow(self, user_id: int) -> None:
+        """
+        Unsubscribes from the channel of a user.
+
+        :param user_id: The user whose last stream has closed.
+        :type user_id: int
+        :return: None.
+        :rtype: None
+        """
+        async with self.lock:
+            if self.listener is None or self.listener.done():
+                return
+            try:
+                await self.pubsub.unsubscribe(f"{CHANNEL_PREFIX}{user_id}")
+            except Exception:
+                logger.exception("Unsubscribing from the contact changes of user %d failed", user_id)
+
+    async def listen(self, pubsub: PubSub) -> None:
+        """
+        Receives the changes of the subscribed users until it is cancelled or Redis fails.
+
+        Quiet channels are not a failure: the wait for a message ends every redis_health_check_interval seconds
+        without one, and the next wait checks that the connection is still alive.
+
+        :param pubsub: The pub/sub the channels are subscribed on.
+        :type pubsub: PubSub
+        :return: None.
+        :rtype: None
+        """
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=settings.redis_health_check_interval or None)
+                if message is not None and message["type"] == "message":
+                    self.dispatch(int(message["channel"][len(CHANNEL_PREFIX):]), message["data"])
+        except Exception:
+            logger.exception("Listening to contact changes failed, the streams are closed")
+        finally:
+            self.close_all()
+            await pubsub.close()
+
+    def dispatch(self, user_id: int, data: Optional[str]) -> None:
+        """
+        Puts a change into the queues of the streams of a user.
+
+        :param user_id: The user who owns the changed contacts.
+        :type user_id: int
+        :param data: The change as JSON, RESET, or None to end the streams.
+        :type data: str | None
+        :return: None.
+        :rtype: None
+        """
+        for queue in list(self.subscribers.get(user_id, ())):
+            if not queue.full():
+                queue.put_nowait(data)
+                continue
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None if data is None else RESET)
+
+    def close_all(self) -> None:
+        """
+        Ends all streams of the worker.
+
+        :return: None.
+        :rtype: None
+        """
+        for user_id in list(self.subscribers):
+            self.dispatch(user_id, None)
+
+    async def stop(self) -> None:
+        """
+        Stops listening, used on shutdown.
+
+        :return: None.
+        :rtype: None
+        """
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+            self.pubsub = None
+
+
+hub = EventHub(settings.contact_events_queue_size)
+
+
+async def event_stream(user_id: int) -> AsyncIterator[str]:
+    """
+    Streams the contact changes of a user as server-sent events.
+
+    The response cancels the stream when the client disconnects. A comment is sent every
+    contact_events_heartbeat seconds, it keeps proxies from closing the idle connection.
+
+    :param user_id: The user whose changes are streamed.
+    :type user_id: int
+    :return: Server-sent events.
+    :rtype: AsyncIterator[str]
+    """
+    async with hub.subscribe(user_id) as queue:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), settings.contact_events_heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if data is None:
+                return
+            if data == RESET:
+                yield "event: reset\ndata: {}\n\n"
+                return
+            yield f"event: contact\ndata: {data}\n\n"
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from src.conf.config import settings
+from src.services.redis import get_redis
+
+
+class Idempotency:
+    """
+    A class that makes write requests safe to retry with the Idempotency-Key header.
+
+    The first request with a key runs the handler and stores its response in Redis,
+    retries with the same key get the stored response back. While the first request is running,
+    the key is locked and concurrent duplicates wait for its response instead of running the handler.
+
+    :param ttl: How long a stored response is kept, in seconds.
+    :type ttl: int
+    :param lock_timeout: How long a request may hold the key, in seconds.
+    :type lock_timeout: int
+    :param poll_interval: How often a waiting duplicate checks for the response, in seconds.
+    :type poll_interval: float
+    """
+    prefix = "idempotency"
+
+    def __init__(self, ttl: int, lock_timeout: int, poll_interval: float = 0.05):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def fingerprint(body: BaseModel, exclude: Optional[set] = None) -> str:
+        """
+        Hashes the request body, so a key reused for a different request can be detected.
+
+        :param body: Request body.
+        :type body: BaseModel
+        :param exclude: Fields left out of the hash, e.g. secrets.
+        :type exclude: set | None
+        :return: Hex digest of the body.
+        :rtype: str
+        """
+        return hashlib.sha256(body.json(exclude=exclude, sort_keys=True).encode()).hexdigest()
+
+    def replay(self, stored: str, fingerprint: str) -> JSONResponse:
+        """
+        Builds the response of a retried request from the stored one.
+
+        :param stored: Stored response.
+        :type stored: str
+        :param fingerprint: Fingerprint of the retried request body.
+        :type fingerprint: str
+        :return: The stored response.
+        :rtype: JSONResponse
+        """
+        data = json.loads(stored)
+        if data["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="Idempotency-Key was already used for a different request")
+        return JSONResponse(content=data["content"], status_code=data["status_code"],
+                            headers={"Idempotent-Replayed": "true"})
+
+    async def run(self, scope: str, key: Optional[str], body: BaseModel, handler: Callable[[], Awaitable[BaseModel]],
+                  status_code: int = status.HTTP_200_OK, exclude: Optional[set] = None) -> BaseModel | JSONResponse:
+        """
+        Runs the handler once per idempotency key and replays its response for retries.
+
+        :param scope: Namespace of the key, e.g. the route and the user.
+        :type scope: str
+        :param key: Value of the Idempotency-Key header.
+        :type key: str | None
+        :param body: Request body.
+        :type body: BaseModel
+        :param handler: Coroutine function that performs the request.
+        :type handler: Callable[[], Awaitable[BaseModel]]
+        :param status_code: Status code of a successful response.
+        :type status_code: int
+        :param exclude: Fields of the body that are not compared between retries.
+        :type exclude: set | None
+        :return: The handler result, or the stored response for a retry.
+        :rtype: BaseModel | JSONResponse
+        """
+        if key is None:
+            return await handler()
+
+        redis = get_redis()
+        result_key = f"{self.prefix}:{scope}:{key}"
+        lock_key = f"{result_key}:lock"
+        fingerprint = self.fingerprint(body, exclude)
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            stored = await redis.get(result_key)
+            if stored is not None:
+                return self.replay(stored, fingerprint)
+            if await redis.set(lock_key, fingerprint, nx=True, ex=self.lock_timeout):
+                break
+            if time.monotonic() > deadline:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                    detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            result = await handler()
+            stored = {"fingerprint": fingerprint, "status_code": status_code, "content": jsonable_encoder(result)}
+            await redis.set(result_key, json.dumps(stored), ex=self.ttl)
+            return result
+        finally:
+            await redis.delete(lock_key)
+
+
+idempotency = Idempotency(ttl=settings.idempotency_ttl, lock_timeout=settings.idempotency_lock_timeout)
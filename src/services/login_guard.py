@@ -0,0 +1,207 @@
+import hashlib
+import time
+from functools import cached_property
+
+from src.conf.config import settings
+from src.services.auth import auth_service
+from src.services.metrics import metrics
+from src.services.redis import RedisBatch, get_redis
+
+metrics.describe("login_throttled_total", "Logins refused before the password was checked, by scope.")
+metrics.describe("login_dummy_verifies_total", "Logins of unknown emails, by whether a dummy hash was verified.")
+
+
+class LoginGuard:
+    """
+    A class that slows down guessing passwords, so an attack does not burn the CPU on bcrypt.
+
+    Failed logins are counted in Redis per account and per client IP. Past the free failures every further
+    failure blocks the scope for twice as long as the previous one, and past the lockout failures the scope is
+    locked for lockout_seconds. Blocks are checked before the user is loaded or any password is hashed.
+    The counters expire window seconds after the first failure.
+
+    A login with an unknown email verifies the password against a dummy hash, so it takes as long as
+    a login with a wrong password. These dummy checks cost the same CPU, so every worker runs at most
+    dummy_rate of them per second and answers the rest at once.
+
+    :param window: How long failures are counted, in seconds.
+    :type window: int
+    :param account_free_failures: Failures of an account that are not slowed down.
+    :type account_free_failures: int
+    :param account_lockout_failures: Failures after which an account is locked.
+    :type account_lockout_failures: int
+    :param ip_free_failures: Failures from an IP that are not slowed down.
+    :type ip_free_failures: int
+    :param ip_lockout_failures: Failures after which an IP is locked.
+    :type ip_lockout_failures: int
+    :param backoff_base: The first block, in seconds.
+    :type backoff_base: float
+    :param backoff_max: The longest block before the lockout, in seconds.
+    :type backoff_max: float
+    :param lockout_seconds: How long a locked scope stays locked.
+    :type lockout_seconds: int
+    :param dummy_rate: How many dummy checks a worker runs per second.
+    :type dummy_rate: float
+    """
+    prefix = "login_guard"
+
+    def __init__(self, window: int, account_free_failures: int, account_lockout_failures: int,
+                 ip_free_failures: int, ip_lockout_failures: int, backoff_base: float, backoff_max: float,
+                 lockout_seconds: int, dummy_rate: float):
+        self.window = window
+        self.thresholds = {"account": (account_free_failures, account_lockout_failures),
+                           "ip": (ip_free_failures, ip_lockout_failures)}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lockout_seconds = lockout_seconds
+        self.dummy_rate = dummy_rate
+        self.dummy_burst = max(dummy_rate, 1)
+        self.dummy_tokens = self.dummy_burst
+        self.dummy_updated = time.monotonic()
+
+    def scopes(self, email: str, ip: str) -> dict:
+        """
+        Names the counted scopes of a login.
+
+        :param email: Email of the login.
+        :type email: str
+        :param ip: IP of the client.
+        :type ip: str
+        :return: Scope name and its identifier.
+        :rtype: dict
+        """
+        return {"account": self.account(email), "ip": ip}
+
+    @staticmethod
+    def account(email: str) -> str:
+        """
+        Identifies the account of a login without storing its email in Redis.
+
+        :param email: Email of the login.
+        :type email: str
+        :return: Hash of the normalized email.
+        :rtype: str
+        """
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+    def delay(self, scope: str, failures: int) -> float:
+        """
+        Computes how long a scope is blocked after a failure.
+
+        :param scope: account or ip.
+        :type scope: str
+        :param failures: Failures counted so far, including this one.
+        :type failures: int
+        :return: The block in seconds, 0 if the failure is free.
+        :rtype: float
+        """
+        free, lockout = self.thresholds[scope]
+        if failures >= lockout:
+            return self.lockout_seconds
+        if failures <= free:
+            return 0
+        return min(self.backoff_base * 2 ** (failures - free - 1), self.backoff_max)
+
+    async def check(self, email: str, ip: str) -> int:
+        """
+        Checks whether a login may be attempted, with a single Redis round trip.
+
+        :param email: Email of the login.
+        :type email: str
+        :param ip: IP of the client.
+        :type ip: str
+        :return: Seconds until the login may be attempted, 0 if it may be attempted now.
+        :rtype: int
+        """
+        scopes = self.scopes(email, ip)
+        blocked_until = await get_redis().mget([f"{self.prefix}:block:{scope}:{key}" for scope, key in scopes.items()])
+        now = time.time()
+        waits = {scope: float(until) - now for scope, until in zip(scopes, blocked_until) if until is not None}
+        waits = {scope: wait for scope, wait in waits.items() if wait > 0}
+        if not waits:
+            return 0
+        for scope in waits:
+            metrics.inc("login_throttled_total", scope=scope)
+        return max(1, round(max(waits.values())))
+
+    async def failed(self, email: str, ip: str) -> None:
+        """
+        Counts a failed login and blocks its scopes as needed, in at most two round trips to Redis.
+
+        :param email: Email of the login.
+        :type email: str
+        :param ip: IP of the client.
+        :type ip: str
+        :return: None.
+        :rtype: None
+        """
+        scopes = self.scopes(email, ip)
+        counters = RedisBatch()
+        for scope, key in scopes.items():
+            counters.queue(scope, "incr", f"{self.prefix}:failures:{scope}:{key}")
+        failures = await counters.send()
+        blocks = RedisBatch()
+        for scope, key in scopes.items():
+            if failures[scope] == 1:
+                blocks.queue(f"{scope}:expire", "expire", f"{self.prefix}:failures:{scope}:{key}", self.window)
+            delay = self.delay(scope, failures[scope])
+            if delay:
+                blocks.queue(f"{scope}:block", "set", f"{self.prefix}:block:{scope}:{key}", time.time() + delay,
+                             ex=max(1, round(delay)))
+        await blocks.send()
+
+    async def succeeded(self, email: str) -> None:
+        """
+        Forgets the failures of an account after a successful login.
+
+        The failures of the IP are kept, so a login to an own account does not hide guessing at others.
+
+        :param email: Email of the login.
+        :type email: str
+        :return: None.
+        :rtype: None
+        """
+        await get_redis().delete(f"{self.prefix}:failures:account:{self.account(email)}")
+
+    @cached_property
+    def dummy_hash(self) -> str:
+        """
+        Hashes a random password once, with the same cost as the passwords of the users.
+
+        :return: bcrypt hash.
+        :rtype: str
+        """
+        return auth_service.get_password_hash(hashlib.sha256(str(time.time_ns()).encode()).hexdigest())
+
+    def dummy_verify(self, password: str) -> bool:
+        """
+        Spends the time of a password check on a login with an unknown email, within the budget of the worker.
+
+        :param password: The entered password.
+        :type password: str
+        :return: Whether the dummy hash was verified, False when the budget is used up.
+        :rtype: bool
+        """
+        now = time.monotonic()
+        self.dummy_tokens = min(self.dummy_burst, self.dummy_tokens + (now - self.dummy_updated) * self.dummy_rate)
+        self.dummy_updated = now
+        if self.dummy_tokens < 1:
+            metrics.inc("login_dummy_verifies_total", result="skipped")
+            return False
+        self.dummy_tokens -= 1
+        auth_service.verify_password(password, self.dummy_hash)
+        metrics.inc("login_dummy_verifies_total", result="verified")
+        return True
+
+
+login_guard = LoginGuard(
+    window=settings.login_failure_window,
+    account_free_failures=settings.login_account_free_failures,
+    account_lockout_failures=settings.login_account_lockout_failures,
+    ip_free_failures=settings.login_ip_free_failures,
+    ip_lockout_failures=settings.login_ip_lockout_failures,
+    backoff_base=settings.login_backoff_base,
+    backoff_max=settings.login_backoff_max,
+    lockout_seconds=settings.login_lockout_seconds,
+    dummy_rate=settings.login_dummy_verify_rate,
+)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.db import SessionLocal
+from src.repository import users as repository_users
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("maintenance_rows_reclaimed_total", "Rows removed or cleared by the maintenance job, by kind.")
+metrics.describe("maintenance_duration_seconds", "Duration of the last run of the maintenance job.")
+
+Batch = Callable[[datetime, int, Session], Awaitable[int]]
+
+
+async def reclaim(kind: str, batch: Batch, before: datetime, db: Session, batch_size: int, pause: float) -> int:
+    """
+    Runs a batch function until it finds nothing left, one short transaction per batch.
+
+    Between the batches the job pauses, so other transactions get the rows and the connection in between
+    and replicas keep up with the changes.
+
+    :param kind: Name of the reclaimed rows in the metrics.
+    :type kind: str
+    :param batch: Repository function that changes up to a limit of rows and returns how many it has changed.
+    :type batch: Callable[[datetime, int, Session], Awaitable[int]]
+    :param before: The time passed to the batch function.
+    :type before: datetime
+    :param db: The database session.
+    :type db: Session
+    :param batch_size: The most rows changed at once.
+    :type batch_size: int
+    :param pause: Pause between the batches, in seconds.
+    :type pause: float
+    :return: Number of changed rows.
+    :rtype: int
+    """
+    total = 0
+    while True:
+        changed = await batch(before, batch_size, db)
+        total += changed
+        metrics.inc("maintenance_rows_reclaimed_total", changed, kind=kind)
+        if changed < batch_size:
+            return total
+        await asyncio.sleep(pause)
+
+
+async def maintenance_job(day: date) -> None:
+    """
+    Daily job that removes the users who have not confirmed their email in time and clears expired refresh tokens.
+
+    :param day: The day of the run.
+    :type day: date
+    :return: None.
+    :rtype: None
+    """
+    started = time.monotonic()
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        users = await reclaim("unconfirmed_users", repository_users.remove_unconfirmed_users,
+                              now - timedelta(days=settings.unconfirmed_user_max_age_days), db,
+                              settings.maintenance_batch_size, settings.maintenance_batch_pause)
+        tokens = await reclaim("expired_refresh_tokens", repository_users.clear_expired_tokens, now, db,
+                               settings.maintenance_batch_size, settings.maintenance_batch_pause)
+    finally:
+        db.close()
+    metrics.set("maintenance_duration_seconds", time.monotonic() - started)
+    logger.info("Maintenance of %s removed %d unconfirmed users and cleared %d expired refresh tokens",
+                day, users, tokens)
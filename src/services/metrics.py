@@ -0,0 +1,97 @@
+from collections import defaultdict
+from typing import Dict, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    """
+    A class that keeps the counters and gauges of the current worker and renders them for Prometheus.
+
+    Every worker process has its own values, Prometheus scrapes and sums them per process.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self.gauges: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self.help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str) -> None:
+        """
+        Sets the help text of a metric.
+
+        :param name: Metric name.
+        :type name: str
+        :param text: Help text.
+        :type text: str
+        :return: None.
+        :rtype: None
+        """
+        self.help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Increases a counter.
+
+        :param name: Counter name.
+        :type name: str
+        :param value: The increment.
+        :type value: float
+        :param labels: Labels of the counter.
+        :type labels: str
+        :return: None.
+        :rtype: None
+        """
+        self.counters[name][tuple(sorted(labels.items()))] += value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """
+        Sets a gauge.
+
+        :param name: Gauge name.
+        :type name: str
+        :param value: The current value.
+        :type value: float
+        :param labels: Labels of the gauge.
+        :type labels: str
+        :return: None.
+        :rtype: None
+        """
+        self.gauges[name][tuple(sorted(labels.items()))] = value
+
+    def value(self, name: str, **labels: str) -> float:
+        """
+        Reads a counter or a gauge.
+
+        :param name: Metric name.
+        :type name: str
+        :param labels: Labels of the metric.
+        :type labels: str
+        :return: The value, 0 if it was never set.
+        :rtype: float
+        """
+        key = tuple(sorted(labels.items()))
+        if name in self.gauges:
+            return self.gauges[name].get(key, 0)
+        return self.counters[name].get(key, 0) if name in self.counters else 0
+
+    def render(self) -> str:
+        """
+        Renders all metrics in the Prometheus text format.
+
+        :return: The metrics.
+        :rtype: str
+        """
+        lines = []
+        for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+            for name, values in sorted(metrics.items()):
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(values.items()):
+                    text = ",".join(f'{key}="{label}"' for key, label in labels)
+                    lines.append(f"{name}{{{text}}} {value:g}" if text else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,90 @@
+import re
+
+from src.conf.config import settings
+
+NON_DIGITS = re.compile(r"\D")
+E164_MAX_DIGITS = 15
+
+
+def normalize_email(email: str) -> str:
+    """
+    Builds the key by which contacts with the same email are found.
+
+    :param email: Email as entered by the user.
+    :type email: str
+    :return: Email without surrounding spaces in lower case.
+    :rtype: str
+    """
+    return email.strip().lower()
+
+
+def normalize_phone(phone_number: str) -> str:
+    """
+    Builds the key by which contacts with the same phone number are found.
+
+    :param phone_number: Phone number as entered by the user.
+    :type phone_number: str
+    :return: Digits of the phone number.
+    :rtype: str
+    """
+    return NON_DIGITS.sub("", phone_number)
+
+
+def email_domain(email: str) -> str | None:
+    """
+    Extracts the domain by which contacts are grouped in the statistics.
+
+    :param email: Email as entered by the user.
+    :type email: str
+    :return: Domain of the normalized email, or None if the email has no domain.
+    :rtype: str | None
+    """
+    _, at, domain = normalize_email(email).rpartition("@")
+    return domain if at and domain else None
+
+
+def phone_e164(phone_number: str) -> str | None:
+    """
+    Brings a phone number to the E.164 format, by which contacts are looked up.
+
+    A number that starts with + or the international prefix 00 keeps its country code. A national number
+    that starts with the trunk prefix, or has as many digits as a national number, gets the default country
+    code of the service. Other numbers are taken as international numbers typed without +.
+
+    :param phone_number: Phone number as entered by the user.
+    :type phone_number: str
+    :return: The number like +380971234567, or None if it has no digits or too many.
+    :rtype: str | None
+    """
+    number = phone_number.strip()
+    digits = normalize_phone(number)
+    if number.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith(settings.phone_country_code):
+        pass
+    elif digits.startswith(settings.phone_trunk_prefix) and \
+            len(digits) == len(settings.phone_trunk_prefix) + settings.phone_national_length:
+        digits = settings.phone_country_code + digits[len(settings.phone_trunk_prefix):]
+    elif len(digits) == settings.phone_national_length:
+        digits = settings.phone_country_code + digits
+    if not digits or len(digits) > E164_MAX_DIGITS:
+        return None
+    return f"+{digits}"
+
+
+def phone_reversed(phone_number: str) -> str | None:
+    """
+    Builds the lookup key of a phone number: the digits of its E.164 form in reverse order.
+
+    A number that ends with some digits has a key that starts with them reversed, so an index over the key
+    finds the numbers by their ending with a range scan, and by the whole number with an equality.
+
+    :param phone_number: Phone number as entered by the user.
+    :type phone_number: str
+    :return: The reversed digits, or None if the number has no E.164 form.
+    :rtype: str | None
+    """
+    number = phone_e164(phone_number)
+    return number[:0:-1] if number else None
@@ -0,0 +1,160 @@
+from contextvars import ContextVar
+from typing import List, Optional
+
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline, PubSub
+
+from src.conf.config import settings
+
+redis_client: Optional[redis.Redis] = None
+
+# Round trips and commands of the current request, set by RedisCallsMiddleware.
+request_calls: ContextVar[Optional[List[int]]] = ContextVar("request_calls", default=None)
+
+
+def count_call(commands: int) -> None:
+    """
+    Counts a round trip to Redis for the current request, if it is counted.
+
+    :param commands: Number of commands sent in the round trip.
+    :type commands: int
+    :return: None.
+    :rtype: None
+    """
+    calls = request_calls.get()
+    if calls is not None:
+        calls[0] += 1
+        calls[1] += commands
+
+
+class CountingPipeline(Pipeline):
+    """
+    A pipeline that counts its execution as a single round trip.
+    """
+
+    async def execute(self, raise_on_error: bool = True):
+        count_call(len(self.command_stack))
+        return await super().execute(raise_on_error)
+
+
+class CountingRedis(redis.Redis):
+    """
+    A Redis client that counts the round trips of the current request.
+    """
+
+    async def execute_command(self, *args, **options):
+        count_call(1)
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> CountingPipeline:
+        return CountingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+async def init_redis() -> redis.Redis:
+    """
+    Creates the Redis connection pool of the current worker.
+
+    Every worker process owns its own pool, while the data itself (rate limits, caches)
+    lives in Redis and is therefore shared between all workers. The pool holds at most
+    redis_max_connections connections; when all are busy, a command waits up to redis_pool_timeout
+    seconds for one instead of opening more connections than Redis is sized for.
+
+    :return: Redis client bound to the worker pool.
+    :rtype: redis.Redis
+    """
+    global redis_client
+    if redis_client is None:
+        pool = redis.BlockingConnectionPool(host=settings.redis_host, port=settings.redis_port, db=settings.redis_db,
+                                            max_connections=settings.redis_max_connections,
+                                            timeout=settings.redis_pool_timeout,
+                                            socket_timeout=settings.redis_socket_timeout,
+                                            socket_connect_timeout=settings.redis_socket_timeout,
+                                            health_check_interval=settings.redis_health_check_interval,
+                                            encoding="utf-8", decode_responses=True)
+        redis_client = CountingRedis(connection_pool=pool)
+    return redis_client
+
+
+def open_pubsub() -> PubSub:
+    """
+    Opens a pub/sub on a connection of its own, outside of the pool of the worker.
+
+    A subscriber waits for messages as long as its channels are quiet, so the connection has no socket timeout,
+    which would end the wait after redis_socket_timeout seconds. A lost connection is found by the health checks
+    of the pub/sub instead.
+
+    :return: Pub/sub that is not subscribed yet, closed by its owner.
+    :rtype: PubSub
+    """
+    client = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=settings.redis_db,
+                         socket_timeout=None, socket_connect_timeout=settings.redis_socket_timeout,
+                         health_check_interval=settings.redis_health_check_interval,
+                         encoding="utf-8", decode_responses=True)
+    return client.pubsub()
+
+
+async def close_redis() -> None:
+    """
+    Closes the Redis connection pool of the current worker.
+
+    :return: None.
+    :rtype: None
+    """
+    global redis_client
+    if redis_client is not None:
+        await redis_client.close()
+        await redis_client.connection_pool.disconnect()
+        redis_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Returns the Redis client of the current worker.
+
+    :return: Redis client.
+    :rtype: redis.Redis
+    """
+    if redis_client is None:
+        raise RuntimeError("Redis is not initialized, start the application with its lifespan")
+    return redis_client
+
+
+class RedisBatch:
+    """
+    A class that sends Redis commands that do not depend on each other in a single round trip.
+
+    Commands are queued under a name and sent together as a pipeline without a transaction;
+    the result of every command is then read by its name.
+    """
+
+    def __init__(self):
+        self.pipeline = get_redis().pipeline(transaction=False)
+        self.names: List[str] = []
+
+    def queue(self, name: str, command: str, *args, **kwargs) -> None:
+        """
+        Queues a command.
+
+        :param name: Name under which the result is read.
+        :type name: str
+        :param command: Method of the Redis client, like get or incr.
+        :type command: str
+        :param args: Arguments of the command.
+        :param kwargs: Keyword arguments of the command.
+        :return: None.
+        :rtype: None
+        """
+        getattr(self.pipeline, command)(*args, **kwargs)
+        self.names.append(name)
+
+    async def send(self) -> dict:
+        """
+        Sends the queued commands, unless there are none.
+
+        :return: Result of every command by its name.
+        :rtype: dict
+        """
+        if not self.names:
+            return {}
+        results = await self.pipeline.execute()
+        return dict(zip(self.names, results))
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import secrets
+from datetime import date, datetime, time, timedelta
+from typing import Awaitable, Callable, List
+
+from src.services.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[date], Awaitable[None]]
+
+# Deletes a lock only if it still holds the token of its owner, in one step.
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class Scheduler:
+    """
+    A class that runs background jobs once per day.
+
+    Every worker runs the scheduler, and a lock in Redis makes sure that each job runs
+    only once per day across all workers. The lock holds a token of the worker that took it, and a failed run
+    only releases the lock while it still holds that token, never a lock another worker has taken since. A job whose time has already passed when the worker
+    starts runs immediately, unless another worker has already run it that day.
+
+    :param jobs: Registered jobs as (name, time of day in UTC, job) tuples.
+    :type jobs: List[tuple]
+    :param tasks: Running tasks of the jobs.
+    :type tasks: List[asyncio.Task]
+    """
+    prefix = "scheduler"
+
+    def __init__(self):
+        self.jobs: List[tuple] = []
+        self.tasks: List[asyncio.Task] = []
+
+    def daily(self, name: str, at: time, job: Job) -> None:
+        """
+        Registers a job that runs once per day.
+
+        :param name: Unique name of the job.
+        :type name: str
+        :param at: Time of day in UTC when the job runs.
+        :type at: time
+        :param job: Coroutine function called with the day of the run.
+        :type job: Callable[[date], Awaitable[None]]
+        :return: None.
+        :rtype: None
+        """
+        self.jobs.append((name, at, job))
+
+    def start(self) -> None:
+        """
+        Starts the registered jobs in the running event loop.
+
+        :return: None.
+        :rtype: None
+        """
+        self.tasks = [asyncio.create_task(self.run(name, at, job)) for name, at, job in self.jobs]
+
+    async def stop(self) -> None:
+        """
+        Cancels the running jobs.
+
+        :return: None.
+        :rtype: None
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def run(self, name: str, at: time, job: Job) -> None:
+        """
+        Runs a job every day at the given time.
+
+        :param name: Unique name of the job.
+        :type name: str
+        :param at: Time of day in UTC when the job runs.
+        :type at: time
+        :param job: Coroutine function called with the day of the run.
+        :type job: Callable[[date], Awaitable[None]]
+        :return: None.
+        :rtype: None
+        """
+        while True:
+            now = datetime.utcnow()
+            run_at = datetime.combine(now.date(), at)
+            if now >= run_at:
+                await self.run_once(name, now.date(), job)
+                run_at += timedelta(days=1)
+            await asyncio.sleep((run_at - datetime.utcnow()).total_seconds())
+
+    async def run_once(self, name: str, day: date, job: Job) -> bool:
+        """
+        Runs a job for the day unless another worker has already taken it.
+
+        :param name: Unique name of the job.
+        :type name: str
+        :param day: The day of the run.
+        :type day: date
+        :param job: Coroutine function called with the day of the run.
+        :type job: Callable[[date], Awaitable[None]]
+        :return: Whether the job ran in this worker.
+        :rtype: bool
+        """
+        redis = get_redis()
+        lock_key = f"{self.prefix}:{name}:{day.isoformat()}"
+        token = secrets.token_hex(16)
+        if not await redis.set(lock_key, token, nx=True, ex=2 * 24 * 60 * 60):
+            return False
+        try:
+            await job(day)
+        except Exception:
+            logger.exception("Scheduled job %s failed", name)
+            await redis.eval(RELEASE_LOCK, 1, lock_key, token)
+        return True
+
+
+scheduler = Scheduler()
@@ -0,0 +1,74 @@
+import json
+from typing import Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from src.conf.config import settings
+from src.services.redis import RedisBatch, get_redis
+
+
+def stats_key(user_id: int, version: Optional[str] = None) -> str:
+    """
+    Builds the Redis key of the cached statistics of a user, or of their version counter.
+
+    :param user_id: The user of the statistics.
+    :type user_id: int
+    :param version: Version of the statistics.
+    :type version: str | None
+    :return: Redis key.
+    :rtype: str
+    """
+    key = f"contact_stats:{user_id}"
+    return f"{key}:version" if version is None else f"{key}:{version}"
+
+
+async def get_cached_stats(user_id: int) -> Tuple[str, Optional[dict]]:
+    """
+    Looks up the cached statistics of the current version.
+
+    The version is returned as well, so statistics computed after a miss are stored under the version
+    they were computed for, and a change of the contacts in the meantime makes them unreachable.
+
+    :param user_id: The user of the statistics.
+    :type user_id: int
+    :return: The current version and the cached statistics, or None if there are none.
+    :rtype: Tuple[str, dict | None]
+    """
+    redis = get_redis()
+    version = await redis.get(stats_key(user_id)) or "0"
+    stats = await redis.get(stats_key(user_id, version))
+    return version, None if stats is None else json.loads(stats)
+
+
+async def cache_stats(user_id: int, version: str, stats: dict) -> None:
+    """
+    Caches the statistics of a user for contact_stats_ttl seconds.
+
+    :param user_id: The user of the statistics.
+    :type user_id: int
+    :param version: The version the statistics were computed for.
+    :type version: str
+    :param stats: The statistics.
+    :type stats: dict
+    :return: None.
+    :rtype: None
+    """
+    await get_redis().set(stats_key(user_id, version), json.dumps(jsonable_encoder(stats)),
+                          ex=settings.contact_stats_ttl)
+
+
+def invalidate_stats(user_id: int, batch: RedisBatch) -> None:
+    """
+    Makes the cached statistics of a user stale by moving on to the next version.
+
+    The version counter never expires, otherwise it could start over and reach statistics cached earlier.
+    The command is queued, so it is sent together with the other reactions to the change.
+
+    :param user_id: The user whose contacts have changed.
+    :type user_id: int
+    :param batch: The batch the command is queued in.
+    :type batch: RedisBatch
+    :return: None.
+    :rtype: None
+    """
+    batch.queue("stats_version", "incr", stats_key(user_id))
@@ -0,0 +1,193 @@
+import os
+import re
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+
+RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class Storage(ABC):
+    """
+    An interface of the place where uploaded files are kept.
+
+    Files are addressed by keys like ``1/0123456789abcdef/128.webp``. A key is never overwritten with
+    other content, so the files can be cached by clients and proxies forever.
+    """
+
+    @abstractmethod
+    async def save(self, key: str, data: bytes) -> None:
+        """
+        Stores a file.
+
+        :param key: Key of the file.
+        :type key: str
+        :param data: Content of the file.
+        :type data: bytes
+        :return: None.
+        :rtype: None
+        """
+
+    @abstractmethod
+    async def delete(self, prefix: str) -> None:
+        """
+        Removes the files whose keys start with a prefix.
+
+        :param prefix: Prefix of the keys, a directory like ``1/0123456789abcdef``.
+        :type prefix: str
+        :return: None.
+        :rtype: None
+        """
+
+    @abstractmethod
+    async def response(self, key: str, request: Request, headers: dict) -> Response:
+        """
+        Serves a file.
+
+        :param key: Key of the file.
+        :type key: str
+        :param request: The current request, with its conditional and range headers.
+        :type request: Request
+        :param headers: Headers added to the response, like Cache-Control.
+        :type headers: dict
+        :return: The file, 304 if the client has it already, or a redirect to where it is served.
+        :rtype: Response
+        :raises HTTPException: If there is no such file.
+        """
+
+
+class LocalStorage(Storage):
+    """
+    A storage that keeps files in a directory of the local disk.
+
+    Behind nginx, set accel_redirect to an internal location that serves the directory: the application
+    then only answers with an X-Accel-Redirect header and nginx sends the file with sendfile, including
+    ranges. Without it the application sends the file itself.
+
+    :param root: The directory.
+    :type root: str
+    :param accel_redirect: The internal nginx location of the directory, e.g. /protected/avatars.
+    :type accel_redirect: str | None
+    """
+
+    def __init__(self, root: str, accel_redirect: Optional[str] = None):
+        self.root = Path(root).resolve()
+        self.accel_redirect = accel_redirect.rstrip("/") if accel_redirect else None
+
+    def path(self, key: str) -> Path:
+        """
+        Finds the path of a key.
+
+        :param key: Key of the file.
+        :type key: str
+        :return: Absolute path inside the root directory.
+        :rtype: Path
+        :raises ValueError: If the key points outside the root directory.
+        """
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid storage key {key}")
+        return path
+
+    async def save(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+
+        def write() -> None:
+            # Readers never see a half-written file: it is written aside and renamed into place.
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+                file.write(data)
+                # The file is created readable by its owner only, nginx serving it runs as another user.
+                os.fchmod(file.fileno(), 0o644)
+            os.replace(file.name, path)
+
+        await run_in_threadpool(write)
+
+    async def delete(self, prefix: str) -> None:
+        path = self.path(prefix)
+
+        def remove() -> None:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+        await run_in_threadpool(remove)
+
+    async def response(self, key: str, request: Request, headers: dict) -> Response:
+        path = self.path(key)
+        try:
+            stat_result = await run_in_threadpool(os.stat, path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        # The content of a key never changes, so the key itself is a strong ETag.
+        headers = {**headers, "ETag": f'"{key.replace("/", "-")}"', "Accept-Ranges": "bytes"}
+        if request.headers.get("if-none-match") in (headers["ETag"], "*"):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        media_type = guess_type(path.name)[0] or "application/octet-stream"
+        if self.accel_redirect:
+            return Response(media_type=media_type, headers={**headers, "X-Accel-Redirect": f"{self.accel_redirect}/{key}"})
+        byte_range = self.byte_range(request.headers.get("range"), stat_result.st_size)
+        if byte_range is None:
+            return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result,
+                                method=request.method)
+        start, end = byte_range
+        if start >= stat_result.st_size:
+            return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                            headers={**headers, "Content-Range": f"bytes */{stat_result.st_size}"})
+        content = await run_in_threadpool(self.read, path, start, end - start + 1)
+        return Response(content=b"" if request.method == "HEAD" else content,
+                        status_code=status.HTTP_206_PARTIAL_CONTENT, media_type=media_type,
+                        headers={**headers, "Content-Range": f"bytes {start}-{end}/{stat_result.st_size}",
+                                 "Content-Length": str(len(content))})
+
+    @staticmethod
+    def byte_range(header: Optional[str], size: int) -> Optional[tuple]:
+        """
+        Parses a Range header with a single range, other ranges are ignored and the whole file is sent.
+
+        :param header: Value of the Range header.
+        :type header: str | None
+        :param size: Size of the file.
+        :type size: int
+        :return: The first and the last byte, or None for the whole file.
+        :rtype: tuple | None
+        """
+        match = RANGE.fullmatch(header.strip()) if header else None
+        if match is None or match.groups() == ("", ""):
+            return None
+        first, last = match.groups()
+        if not first:
+            return max(size - int(last), 0), size - 1
+        if last and int(last) < int(first):
+            return None
+        return int(first), min(int(last), size - 1) if last else size - 1
+
+    @staticmethod
+    def read(path: Path, offset: int, length: int) -> bytes:
+        """
+        Reads a part of a file.
+
+        :param path: The file.
+        :type path: Path
+        :param offset: The first byte.
+        :type offset: int
+        :param length: Number of bytes.
+        :type length: int
+        :return: The bytes.
+        :rtype: bytes
+        """
+        with open(path, "rb") as file:
+            return os.pread(file.fileno(), length, offset)
+
+
+storage = LocalStorage(settings.avatar_storage_dir, settings.avatar_accel_redirect)
@@ -0,0 +1,157 @@
+import math
+import random
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Iterator, List, Tuple
+
+from src.services.normalize import normalize_email, normalize_phone, email_domain, phone_e164, phone_reversed
+
+NAMES = ["Olena", "Ivan", "Nikita", "Olha", "Andrii", "Maria", "Taras", "Iryna", "Dmytro", "Kateryna",
+         "Serhii", "Natalia", "Oleksandr", "Yulia", "Mykola", "Anna", "Bohdan", "Sofia", "Yurii", "Oksana"]
+SURNAMES = ["Melnyk", "Shevchenko", "Boyko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Oliinyk",
+            "Shevchuk", "Koval", "Polishchuk", "Bondar", "Tkachuk", "Moroz", "Marchenko", "Lysenko", "Rudenko",
+            "Savchenko", "Petrenko", "Ivanov"]
+DOMAINS = ["gmail.com", "ukr.net", "i.ua", "outlook.com", "yahoo.com", "meta.ua", "icloud.com", "proton.me"]
+OPERATOR_CODES = ["50", "63", "66", "67", "68", "73", "93", "95", "96", "97", "98", "99"]
+
+USER_COLUMNS = ("id", "username", "email", "password", "crated_at", "confirmed")
+CONTACT_COLUMNS = ("name", "surname", "phone_number", "email", "birthday", "email_key", "phone_key",
+                   "email_domain", "phone_e164", "phone_reversed", "created_at", "user_id")
+
+# Popularity falls with the rank like word frequencies, a few names and domains cover most contacts.
+NAME_WEIGHTS = list(accumulate(1 / rank for rank in range(1, len(NAMES) + 1)))
+SURNAME_WEIGHTS = list(accumulate(1 / rank for rank in range(1, len(SURNAMES) + 1)))
+DOMAIN_WEIGHTS = list(accumulate(1 / rank ** 1.5 for rank in range(1, len(DOMAINS) + 1)))
+
+COUNT_SIGMA = 1.2
+DUPLICATE_SHARE = 0.02
+HISTORY_DAYS = 3 * 365
+
+
+def user_random(seed: int, user_id: int) -> random.Random:
+    """
+    Creates the random generator of a user, so a user gets the same data however the work is split.
+
+    :param seed: Seed of the whole data set.
+    :type seed: int
+    :param user_id: ID of the user.
+    :type user_id: int
+    :return: Random generator.
+    :rtype: random.Random
+    """
+    return random.Random(f"{seed}:{user_id}")
+
+
+def contact_count(rng: random.Random, mean: float, limit: int) -> int:
+    """
+    Draws the number of contacts of a user from a log-normal distribution.
+
+    Most users have a few contacts and a few users have very many, as in a real address book service.
+
+    :param rng: Random generator of the user.
+    :type rng: random.Random
+    :param mean: Average number of contacts per user.
+    :type mean: float
+    :param limit: Most contacts a user can have.
+    :type limit: int
+    :return: Number of contacts.
+    :rtype: int
+    """
+    if mean <= 0:
+        return 0
+    mu = math.log(mean) - COUNT_SIGMA ** 2 / 2
+    return min(int(round(rng.lognormvariate(mu, COUNT_SIGMA))), limit)
+
+
+def phone_number(rng: random.Random) -> str:
+    """
+    Draws a Ukrainian mobile number, in the national or the international format.
+
+    :param rng: Random generator of the user.
+    :type rng: random.Random
+    :return: Phone number of at most 12 characters.
+    :rtype: str
+    """
+    number = f"{rng.choice(OPERATOR_CODES)}{rng.randrange(10 ** 7):07d}"
+    return f"0{number}" if rng.random() < 0.6 else f"380{number}"
+
+
+def email(rng: random.Random, name: str, surname: str) -> str:
+    """
+    Draws an email made of the name of a contact, sometimes typed with capital letters.
+
+    :param rng: Random generator of the user.
+    :type rng: random.Random
+    :param name: Contact name.
+    :type name: str
+    :param surname: Contact surname.
+    :type surname: str
+    :return: Email.
+    :rtype: str
+    """
+    local = rng.choice([f"{name}.{surname}", f"{name[0]}{surname}", f"{name}{rng.randrange(1, 100)}",
+                        f"{surname}.{name}{rng.randrange(1960, 2010)}"])
+    domain = rng.choices(DOMAINS, cum_weights=DOMAIN_WEIGHTS)[0]
+    address = f"{local}@{domain}"
+    return address if rng.random() < 0.1 else address.lower()
+
+
+def generate_user(user_id: int, password: str, now: datetime, seed: int) -> Tuple:
+    """
+    Builds the row of a confirmed user.
+
+    :param user_id: ID of the user.
+    :type user_id: int
+    :param password: Password hash shared by all generated users.
+    :type password: str
+    :param now: The time the data set is generated at.
+    :type now: datetime
+    :param seed: Seed of the whole data set.
+    :type seed: int
+    :return: Values of USER_COLUMNS.
+    :rtype: Tuple
+    """
+    rng = user_random(seed, -user_id)
+    created_at = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 60 * 60))
+    return user_id, f"seed{user_id}", f"seed{user_id}@example.com", password, created_at, True
+
+
+def generate_contacts(user_id: int, mean: float, limit: int, today: date, now: datetime,
+                      seed: int) -> Iterator[Tuple]:
+    """
+    Builds the contact rows of a user.
+
+    Names, surnames and email domains are skewed towards the popular ones, ages peak around 30,
+    and a small share of contacts repeats the email or the phone number of an earlier one
+    in another spelling, as duplicates do.
+
+    :param user_id: ID of the user.
+    :type user_id: int
+    :param mean: Average number of contacts per user.
+    :type mean: float
+    :param limit: Most contacts a user can have.
+    :type limit: int
+    :param today: The day the ages are counted from.
+    :type today: date
+    :param now: The time the data set is generated at.
+    :type now: datetime
+    :param seed: Seed of the whole data set.
+    :type seed: int
+    :return: Values of CONTACT_COLUMNS.
+    :rtype: Iterator[Tuple]
+    """
+    rng = user_random(seed, user_id)
+    earlier: List[Tuple[str, str]] = []
+    for _ in range(contact_count(rng, mean, limit)):
+        name = rng.choices(NAMES, cum_weights=NAME_WEIGHTS)[0]
+        surname = rng.choices(SURNAMES, cum_weights=SURNAME_WEIGHTS)[0]
+        if earlier and rng.random() < DUPLICATE_SHARE:
+            address, phone = rng.choice(earlier)
+            address = address.upper() if rng.random() < 0.5 else f" {address} "
+        else:
+            address, phone = email(rng, name, surname), phone_number(rng)
+            earlier.append((address, phone))
+        birthday = today - timedelta(days=int(rng.triangular(18, 85, 30) * 365.25))
+        created_at = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 60 * 60))
+        yield (name, surname, phone, address, birthday, normalize_email(address), normalize_phone(phone),
+               email_domain(address), phone_e164(phone), phone_reversed(phone), created_at, user_id)
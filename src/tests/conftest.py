@@ -1,55 +1,225 @@
+import asyncio
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import sys
-import os
-
-sys.path.append(os.path.abspath('..'))
+from fastapi_limiter import FastAPILimiter
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 
 from src.main import app
-from src.database.models import Base
-from src.database.db import get_db
+from src.database.models import Base, User
+from src.database.db import get_db, get_read_db
+from src.database.plans import QueryLog
+from src.services import redis
+from src.services.auth import auth_service
+from src.services.scheduler import RELEASE_LOCK
 
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Every pytest-xdist worker is a process of its own, so every worker gets its own in-memory database.
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-@pytest.fixture(scope="module")
-def session():
-    # Create the database
+@event.listens_for(engine, "connect")
+def disable_pysqlite_transactions(dbapi_connection, connection_record):
+    # pysqlite begins and ends transactions on its own, which breaks SAVEPOINT; SQLAlchemy emits BEGIN instead.
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def begin_transaction(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+class FakePipeline:
+    """
+    Queues the commands of a pipeline and runs them on the fake Redis when it is executed.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.commands = []
+
+    def __getattr__(self, command):
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        commands, self.commands = self.commands, []
+        return [await getattr(self.redis, command)(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class FakeRedis:
+    """
+    Keeps the Redis data of a test in memory, with the commands the application uses.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys, *args):
+        keys = [keys, *args] if isinstance(keys, str) else [*keys, *args]
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    async def script_load(self, script):
+        return "rate_limit"
+
+    async def evalsha(self, sha, numkeys, key, times, milliseconds):
+        # The rate limit script of fastapi_limiter: the milliseconds to wait once the limit is reached, else 0.
+        count = await self.incr(key)
+        return int(milliseconds) if count > int(times) else 0
+
+    async def eval(self, script, numkeys, key, token):
+        # The only script run with eval: the compare-and-delete of the scheduler lock.
+        assert script == RELEASE_LOCK
+        return await self.delete(key) if self.data.get(key) == token else 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_password_hashing():
+    # The lowest bcrypt cost keeps the hashes valid while making them about a thousand times cheaper.
+    from passlib.context import CryptContext
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(auth_service, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4),
+                            raising=False)
+        yield
+
+
+@pytest.fixture(scope="session")
+def connection():
+    # Create the database once per worker
 
-    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        yield connection
+
+
+@pytest.fixture()
+def session(connection):
+    # Every test runs in a transaction that is rolled back, commits of the application release SAVEPOINTs
 
-    db = TestingSessionLocal()
+    transaction = connection.begin()
+    db = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
     try:
         yield db
     finally:
         db.close()
+        transaction.rollback()
 
 
-@pytest.fixture(scope="module")
-def client(session):
+@pytest.fixture()
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis, "redis_client", fake)
+    asyncio.run(FastAPILimiter.init(fake))
+    yield fake
+    FastAPILimiter.redis = None
+
+
+@pytest.fixture()
+def client(session, fake_redis):
     # Dependency override
 
     def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+        yield session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     yield TestClient(app)
 
+    app.dependency_overrides.clear()
+
 
 @pytest.fixture(scope="module")
 def user():
-    return {"username": "testing", "email": "testing@example.com", "password": "testing"}
\ No newline at end of file
+    return {"username": "testing", "email": "testing@example.com", "password": "testing"}
+
+
+@pytest.fixture()
+def registered_user(session, user):
+    current_user = User(username=user["username"], email=user["email"],
+                        password=auth_service.get_password_hash(user["password"]))
+    session.add(current_user)
+    session.commit()
+    return current_user
+
+
+@pytest.fixture()
+def confirmed_user(session, registered_user):
+    registered_user.confirmed = True
+    session.commit()
+    return registered_user
+
+
+@pytest.fixture()
+def auth_headers(client, user, confirmed_user):
+    # Logs the confirmed user in and returns the headers with their access token
+
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture()
+def max_queries():
+    # Fails the test when the code in the block sends more queries than expected, and lists them
+
+    @contextmanager
+    def check(limit):
+        with QueryLog(engine) as log:
+            yield log
+        statements = "\n".join(statement for statement, _ in log.statements)
+        assert len(log) <= limit, f"{len(log)} queries instead of at most {limit}:\n{statements}"
+
+    return check
@@ -1,7 +1,4 @@
 from unittest.mock import MagicMock
-import sys, os
-
-sys.path.append(os.path.abspath('..'))
 
 from src.database.models import User
 
@@ -19,7 +16,7 @@ def test_create_user(client, user, monkeypatch):
     assert "id" in data["user"]
 
 
-def test_repeat_create_user(client, user):
+def test_repeat_create_user(client, user, registered_user):
     response = client.post(
         "/api/auth/signup",
         json=user,
@@ -29,7 +26,7 @@ def test_repeat_create_user(client, user):
     assert data["detail"] == "Account already exists"
 
 
-def test_login_user_not_confirmed(client, user):
+def test_login_user_not_confirmed(client, user, registered_user):
     response = client.post(
         "/api/auth/login",
         data={"username": user.get('email'), "password": user.get('password')},
@@ -39,7 +36,7 @@ def test_login_user_not_confirmed(client, user):
     assert data["detail"] == "Email not confirmed"
 
 
-def test_login_user(client, session, user):
+def test_login_user(client, session, user, registered_user):
     current_user: User = session.query(User).filter(User.email == user.get('email')).first()
     current_user.confirmed = True
     session.commit()
@@ -52,7 +49,7 @@ def test_login_user(client, session, user):
     assert data["token_type"] == "bearer"
 
 
-def test_login_wrong_password(client, user):
+def test_login_wrong_password(client, user, confirmed_user):
     response = client.post(
         "/api/auth/login",
         data={"username": user.get('email'), "password": 'password'},
@@ -69,4 +66,38 @@ def test_login_wrong_email(client, user):
     )
     assert response.status_code == 401, response.text
     data = response.json()
-    assert data["detail"] == "Invalid email"
\ No newline at end of file
+    assert data["detail"] == "Invalid email"
+
+
+def test_login_blocked_before_hashing(client, user, confirmed_user, monkeypatch):
+    for _ in range(4):
+        response = client.post(
+            "/api/auth/login",
+            data={"username": user.get('email'), "password": 'password'},
+        )
+        assert response.status_code == 401, response.text
+    mock_verify_password = MagicMock()
+    monkeypatch.setattr("src.routes.auth.auth_service.verify_password", mock_verify_password)
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    assert response.status_code == 429, response.text
+    assert response.headers["Retry-After"] == "1"
+    mock_verify_password.assert_not_called()
+
+
+def test_signup_throttled(client, user, monkeypatch):
+    monkeypatch.setattr("src.routes.auth.send_email", MagicMock())
+    for number in range(2):
+        response = client.post(
+            "/api/auth/signup",
+            json={**user, "email": f"throttled{number}@gmail.com"},
+        )
+        assert response.status_code == 201, response.text
+    response = client.post(
+        "/api/auth/signup",
+        json={**user, "email": "throttled2@gmail.com"},
+    )
+    assert response.status_code == 429, response.text
+    assert response.headers["Retry-After"] == "5"
@@ -0,0 +1,103 @@
+from datetime import date
+
+from src.database.db import get_read_db
+from src.database.models import Contact
+from src.main import app
+from src.services.digests import STALE, digest_key, utc_today
+from src.services.normalize import phone_e164, phone_reversed
+
+
+def test_import_contacts(client, session, confirmed_user, auth_headers):
+    body = "name,surname,phone_number,email,birthday\n" + "".join(
+        f"Name{number},Surname,067{number:07d},contact{number}@ukr.net,1990-05-17\n" for number in range(30))
+    response = client.post(
+        "/api/contacts/import",
+        files={"file": ("contacts.csv", body.encode(), "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    assert response.json() == {"imported": 30}
+    assert session.query(Contact).filter(Contact.user_id == confirmed_user.id).count() == 30
+
+
+def test_import_invalid_contacts(client, session, auth_headers):
+    body = "name,surname,phone_number,email,birthday\nName,Surname,0671234567,contact@ukr.net,1990-05-17\nName\n"
+    response = client.post(
+        "/api/contacts/import",
+        files={"file": ("contacts.csv", body.encode(), "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"].startswith("Line 3: surname: none is not an allowed value")
+    assert session.query(Contact).count() == 0
+
+
+def test_birthday_digest_is_stale_after_change(client, session, fake_redis, auth_headers):
+    today = utc_today()
+    fake_redis.data[digest_key(today)] = "1"
+    response = client.get("/api/contacts/days_to_birthday", headers=auth_headers)
+    assert response.json() == []
+    response = client.post("/api/contacts/", json={"name": "Name", "surname": "Surname", "phone_number": "0671234567",
+                                                   "email": "contact@ukr.net", "birthday": str(today.replace(year=2000))},
+                           headers=auth_headers)
+    assert response.status_code == 201, response.text
+    response = client.get("/api/contacts/days_to_birthday", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert [contact["email"] for contact in response.json()] == ["contact@ukr.net"]
+
+
+def test_stale_birthday_digest_falls_back_to_query(client, session, fake_redis, confirmed_user, auth_headers):
+    today = utc_today()
+    session.add(Contact(name="Name", surname="Surname", phone_number="0671234567", email="contact@ukr.net",
+                        birthday=today.replace(year=2000), user_id=confirmed_user.id))
+    session.commit()
+    fake_redis.data[digest_key(today)] = "1"
+    fake_redis.data[digest_key(today, confirmed_user.id)] = STALE
+    response = client.get("/api/contacts/days_to_birthday", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert [contact["email"] for contact in response.json()] == ["contact@ukr.net"]
+
+
+def test_stats_are_computed_on_primary(client, session, fake_redis, confirmed_user, auth_headers):
+    def replica():
+        raise AssertionError("The statistics are read from a replica")
+        yield
+
+    app.dependency_overrides[get_read_db] = replica
+    response = client.get("/api/contacts/stats", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["total"] == 0
+    assert any(key.startswith(f"contact_stats:{confirmed_user.id}:") for key in fake_redis.data)
+
+
+def test_lookup_contacts(client, session, confirmed_user, auth_headers):
+    session.add_all([Contact(name="Name", surname="Surname", phone_number=phone_number, email="contact@ukr.net",
+                             birthday=date(1990, 5, 17), user_id=confirmed_user.id, phone_e164=phone_e164(phone_number),
+                             phone_reversed=phone_reversed(phone_number))
+                     for phone_number in ("0671234567", "380501234567", "0631112233")])
+    session.commit()
+    response = client.get("/api/contacts/lookup", params={"phone": "+38 (067) 123 45 67"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert [contact["phone_e164"] for contact in response.json()] == ["+380671234567"]
+    response = client.get("/api/contacts/lookup", params={"phone": "1234567", "match": "suffix"}, headers=auth_headers)
+    assert sorted(contact["phone_number"] for contact in response.json()) == ["0671234567", "380501234567"]
+    response = client.get("/api/contacts/lookup", params={"phone": "567", "match": "suffix"}, headers=auth_headers)
+    assert response.status_code == 422, response.text
+
+
+def test_read_contacts_queries(client, session, confirmed_user, max_queries, auth_headers):
+    session.add_all([Contact(name=f"Name{number}", surname="Surname", phone_number="0671234567",
+                             email=f"contact{number}@ukr.net", birthday=date(1990, 5, 17), user_id=confirmed_user.id)
+                     for number in range(20)])
+    session.commit()
+    # The user, the contacts and the tags of all contacts at once.
+    with max_queries(3):
+        response = client.get("/api/contacts/", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 20
+
+
+def test_lookup_contacts_queries(client, max_queries, auth_headers):
+    with max_queries(2):
+        response = client.get("/api/contacts/lookup", params={"phone": "0671234567"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
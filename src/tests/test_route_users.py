@@ -0,0 +1,60 @@
+import io
+
+from PIL import Image
+
+from src.services import avatars
+from src.services.storage import storage
+
+
+async def render(data):
+    return avatars.render_variants(data, [32, 128], 10 ** 6)
+
+
+def test_upload_avatar(client, confirmed_user, monkeypatch, tmp_path, auth_headers):
+    monkeypatch.setattr(storage, "root", tmp_path)
+    monkeypatch.setattr(avatars.processor, "render", render)
+    image = io.BytesIO()
+    Image.new("RGB", (200, 100), (0, 120, 200)).save(image, "PNG")
+    response = client.patch(
+        "/api/users/avatar",
+        files={"file": ("avatar.png", image.getvalue(), "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    url = response.json()["avatar"]
+    assert url.startswith(f"/api/users/{confirmed_user.id}/avatar/") and url.endswith("/128.webp")
+
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert Image.open(io.BytesIO(response.content)).size == (128, 128)
+    response = client.get(url.replace("128.webp", "32.jpg"), headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 200
+    response = client.get(url, headers={"If-None-Match": response.headers["etag"].replace("32.jpg", "128.webp")})
+    assert response.status_code == 304
+
+
+def test_upload_replaces_previous_avatar(client, confirmed_user, monkeypatch, tmp_path, auth_headers):
+    monkeypatch.setattr(storage, "root", tmp_path)
+    monkeypatch.setattr(avatars.processor, "render", render)
+    versions = []
+    for color in ((0, 120, 200), (200, 120, 0)):
+        image = io.BytesIO()
+        Image.new("RGB", (100, 100), color).save(image, "PNG")
+        response = client.patch("/api/users/avatar", files={"file": ("avatar.png", image.getvalue(), "image/png")},
+                                headers=auth_headers)
+        assert response.status_code == 200, response.text
+        versions.append(avatars.avatar_version(confirmed_user.id, response.json()["avatar"]))
+    assert [(tmp_path / str(confirmed_user.id) / version).exists() for version in versions] == [False, True]
+
+
+def test_upload_invalid_avatar(client, monkeypatch, tmp_path, auth_headers):
+    monkeypatch.setattr(storage, "root", tmp_path)
+    monkeypatch.setattr(avatars.processor, "render", render)
+    response = client.patch(
+        "/api/users/avatar",
+        files={"file": ("avatar.png", b"not an image", "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 422, response.text
@@ -0,0 +1,43 @@
+"""
+Tests for the bulk writes. They run on SQLite; set PLAN_TEST_DATABASE_URL to an empty Postgres database to run
+the round trips through COPY as well.
+"""
+import os
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+
+from src.database.bulk import copy_text, insert_rows
+
+DATABASES = ["sqlite"] + (["postgresql"] if os.environ.get("PLAN_TEST_DATABASE_URL") else [])
+
+metadata = MetaData()
+notes = Table("bulk_notes", metadata,
+              Column("id", Integer, primary_key=True),
+              Column("title", String(50), nullable=False),
+              Column("body", String(50), nullable=True))
+
+
+@pytest.fixture(params=DATABASES)
+def connection(request):
+    url = os.environ["PLAN_TEST_DATABASE_URL"] if request.param == "postgresql" else "sqlite://"
+    engine = create_engine(url)
+    metadata.create_all(engine)
+    try:
+        with engine.connect() as connection:
+            yield connection
+    finally:
+        metadata.drop_all(engine)
+        engine.dispose()
+
+
+def test_copy_text_keeps_empty_strings_apart_from_null():
+    assert copy_text([(1, "", None), (2, "a\tb\\c\nd", "e\r")]) == "1\t\t\\N\n2\ta\\tb\\\\c\\nd\te\\r\n"
+
+
+def test_insert_rows_round_trips_empty_strings(connection):
+    rows = [(1, "", None), (2, "", ""), (3, "tab\tand\\slash\nline", "\\N")]
+
+    assert insert_rows(connection, notes, ["id", "title", "body"], rows, chunk_size=2) == 3
+
+    assert connection.execute(select(notes).order_by(notes.c.id)).all() == rows
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.database.db import ReplicaRouter, reset_progress_handler, is_statement_timeout, statement_timeout
+
+ENDLESS = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+LONG = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000) SELECT count(*) FROM c"
+
+
+class TestReplicaRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.primary = self.create_database("primary")
+        self.first = self.create_database("first")
+        self.second = self.create_database("second")
+        self.broken = create_engine(f"sqlite:///{os.path.join(self.directory.name, 'missing', 'broken.db')}")
+
+    def tearDown(self):
+        for engine in (self.primary, self.first, self.second, self.broken):
+            engine.dispose()
+        self.directory.cleanup()
+
+    def create_database(self, name):
+        engine = create_engine(f"sqlite:///{os.path.join(self.directory.name, name + '.db')}")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE node (name TEXT)"))
+            connection.execute(text("INSERT INTO node VALUES (:name)"), {"name": name})
+        return engine
+
+    def read_node(self, router):
+        with router.choose().connect() as connection:
+            return connection.execute(text("SELECT name FROM node")).scalar()
+
+    def test_round_robin(self):
+        router = ReplicaRouter(self.primary, [self.first, self.second], ejection_seconds=30)
+        result = [self.read_node(router) for _ in range(4)]
+        self.assertEqual(result, ["first", "second", "first", "second"])
+
+    def test_without_replicas(self):
+        router = ReplicaRouter(self.primary, [], ejection_seconds=30)
+        self.assertEqual(self.read_node(router), "primary")
+
+    def test_choose_does_not_connect(self):
+        router = ReplicaRouter(self.primary, [self.broken], ejection_seconds=30)
+        self.assertIs(router.choose(), self.broken)
+        self.assertNotIn(self.broken, router.ejected_until)
+
+    def test_failed_replica_is_ejected(self):
+        router = ReplicaRouter(self.primary, [self.broken, self.first], ejection_seconds=30)
+        with self.assertRaises(OperationalError):
+            self.read_node(router)
+        self.assertIn(self.broken, router.ejected_until)
+        result = [self.read_node(router) for _ in range(3)]
+        self.assertEqual(result, ["first", "first", "first"])
+
+    def test_statement_error_does_not_eject(self):
+        router = ReplicaRouter(self.primary, [self.first], ejection_seconds=30)
+        with self.assertRaises(OperationalError), router.choose().connect() as connection:
+            connection.execute(text("SELECT name FROM missing"))
+        self.assertEqual(router.ejected_until, {})
+
+    def test_ejected_replica_returns(self):
+        router = ReplicaRouter(self.primary, [self.first, self.second], ejection_seconds=0)
+        router.eject(self.first)
+        result = [self.read_node(router) for _ in range(2)]
+        self.assertEqual(result, ["first", "second"])
+
+    def test_fallback_to_primary(self):
+        router = ReplicaRouter(self.primary, [self.broken], ejection_seconds=30)
+        with self.assertRaises(OperationalError):
+            self.read_node(router)
+        self.assertEqual(self.read_node(router), "primary")
+        self.assertEqual(self.read_node(router), "primary")
+
+
+class TestStatementTimeout(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directory.name, 'timeout.db')}")
+        event.listen(self.engine, "checkin", reset_progress_handler)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_statement_is_interrupted(self):
+        with Session(bind=self.engine, info={"statement_timeout": 0.05}) as db:
+            with self.assertRaises(OperationalError) as error:
+                db.execute(text(ENDLESS))
+            self.assertTrue(is_statement_timeout(error.exception))
+
+    def test_timeout_ends_with_session(self):
+        with Session(bind=self.engine, info={"statement_timeout": 0.01}) as db:
+            db.execute(text("SELECT 1"))
+        with Session(bind=self.engine) as db:
+            self.assertEqual(db.execute(text(LONG)).scalar(), 100000)
+
+    def test_without_timeout(self):
+        with Session(bind=self.engine) as db:
+            self.assertEqual(db.execute(text(LONG)).scalar(), 100000)
+
+    def test_timeout_of_route(self):
+        def read_stats():
+            pass
+
+        def read_contacts():
+            pass
+
+        with patch("src.database.db.settings") as settings:
+            settings.statement_timeout = 5
+            settings.statement_timeouts = {"read_stats": 15}
+            self.assertEqual(statement_timeout(MagicMock(scope={"endpoint": read_stats})), 15)
+            self.assertEqual(statement_timeout(MagicMock(scope={"endpoint": read_contacts})), 5)
+            self.assertEqual(statement_timeout(MagicMock(scope={})), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
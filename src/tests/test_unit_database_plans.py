@@ -0,0 +1,166 @@
+"""
+Query plan regression tests: every repository query must keep using its index.
+
+The queries run against a seeded database while QueryLog records them, then every recorded statement is
+explained. A case fails when its first statement no longer uses the expected index, when any statement reads
+a whole table that is not allowed to, or, on Postgres, when a scan is estimated to return more rows than
+the budget of the case. The seeded data is small but skewed like production data, and the tables are
+ANALYZEd, so the planner weighs the indexes as it would there.
+
+The cases run on SQLite. Set PLAN_TEST_DATABASE_URL to an empty Postgres database to run them on Postgres
+as well, with the row estimates of EXPLAIN (FORMAT JSON).
+"""
+import asyncio
+import os
+import re
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.database.bulk import insert_rows
+from src.database.models import Base, Contact, ContactAudit, Tag, User, contact_tags
+from src.database.plans import QueryLog, explain
+from src.repository import contacts as repository_contacts
+from src.repository import tags as repository_tags
+from src.repository import users as repository_users
+from src.schemas import ContactFilter
+from src.services.synthetic import CONTACT_COLUMNS, generate_contacts
+
+USERS = 40
+MEAN_CONTACTS = 100
+MAX_CONTACTS = 2000
+TAGS = ["family", "work", "friends", "gym", "school"]
+# Every per-user query reads at most the contacts of one user.
+USER_ROWS = MAX_CONTACTS
+
+DATABASES = ["sqlite"] + (["postgresql"] if os.environ.get("PLAN_TEST_DATABASE_URL") else [])
+
+# Name, the call, the index the first statement must use as a regular expression, tables that may be
+# read completely and the row budget.
+CASES = [
+    ("get_contacts", lambda user, db: repository_contacts.get_contacts(0, user, 20, db),
+     r"ix_contacts_user_id_\w+", set(), USER_ROWS),
+    ("get_contacts_by_tag", lambda user, db: repository_contacts.get_contacts(0, user, 20, db, tag="work"),
+     r"uq_tags_user_id_name|sqlite_autoindex_tags_1|ix_contact_tags_tag_id", set(), USER_ROWS),
+    ("search_by_email_domain", lambda user, db: repository_contacts.search_contacts(
+        0, user, 20, db, ContactFilter(email_domain="gmail.com")), "ix_contacts_user_id_email_domain", set(), USER_ROWS),
+    ("search_by_name", lambda user, db: repository_contacts.search_contacts(
+        0, user, 20, db, ContactFilter(name="Olena")), "ix_contacts_user_id_name", set(), USER_ROWS),
+    ("search_by_email", lambda user, db: repository_contacts.search_contacts(
+        0, user, 20, db, ContactFilter(email="olena.melnyk@gmail.com")), "ix_contacts_user_id_email_key", set(),
+     USER_ROWS),
+    ("count_contacts", lambda user, db: repository_contacts.count_contacts(user, db),
+     r"ix_contacts_user_id_\w+", set(), USER_ROWS),
+    ("get_days_to_birthday", lambda user, db: repository_contacts.get_days_to_birthday(0, user, 20, db),
+     r"ix_contacts_user_id_\w+", set(), USER_ROWS),
+    # The daily digest of all users reads every contact once.
+    ("get_upcoming_birthdays", lambda user, db: repository_contacts.get_upcoming_birthdays(date.today(), 7, db),
+     None, {"contacts"}, None),
+    ("get_by_name", lambda user, db: repository_contacts.get_by_name(0, user, 20, "Olena", db),
+     "ix_contacts_user_id_name", set(), USER_ROWS),
+    ("get_by_surname", lambda user, db: repository_contacts.get_by_surname(0, user, 20, "Melnyk", db),
+     "ix_contacts_user_id_surname", set(), USER_ROWS),
+    ("get_by_email", lambda user, db: repository_contacts.get_by_email(0, user, 20, "olena.melnyk@gmail.com", db),
+     r"ix_contacts_user_id_\w+", set(), USER_ROWS),
+    ("get_contact", lambda user, db: repository_contacts.get_contact(5, user, db),
+     "contacts_pkey", set(), 1),
+    ("get_contacts_by_ids", lambda user, db: repository_contacts.get_contacts_by_ids([1, 2, 3], user, db),
+     "contacts_pkey", set(), 3),
+    ("get_duplicates", lambda user, db: repository_contacts.get_duplicates(user, db),
+     r"ix_contacts_user_id_\w+", set(), USER_ROWS),
+    ("get_stats", lambda user, db: repository_contacts.get_stats(user, db, date.today()),
+     r"ix_contacts_user_id_\w+", set(), USER_ROWS),
+    ("lookup_contacts", lambda user, db: repository_contacts.lookup_contacts("380671234567", user, 10, db),
+     "ix_contacts_user_id_phone_reversed", set(), USER_ROWS),
+    ("lookup_contacts_by_suffix", lambda user, db: repository_contacts.lookup_contacts("4567", user, 10, db,
+                                                                                       suffix=True),
+     "ix_contacts_user_id_phone_reversed", set(), USER_ROWS),
+    ("get_history", lambda user, db: repository_contacts.get_history(1, 0, user, 10, db),
+     "ix_contact_audit_user_id_contact_id_id", set(), USER_ROWS),
+    ("get_user_by_email", lambda user, db: repository_users.get_user_by_email("user1@example.com", db),
+     "users_email_key|sqlite_autoindex_users_1", set(), 1),
+    ("remove_unconfirmed_users", lambda user, db: repository_users.remove_unconfirmed_users(datetime(2000, 1, 1), 100,
+                                                                                            db),
+     "ix_users_confirmed_crated_at", set(), 100),
+    ("clear_expired_tokens", lambda user, db: repository_users.clear_expired_tokens(datetime(2000, 1, 1), 100, db),
+     "ix_users_refresh_token_expires_at", set(), 100),
+    ("get_tags", lambda user, db: repository_tags.get_tags(0, user, 20, db),
+     "uq_tags_user_id_name|sqlite_autoindex_tags_1", set(), len(TAGS)),
+    ("get_tag_by_name", lambda user, db: repository_tags.get_tag_by_name("work", user, db),
+     "uq_tags_user_id_name|sqlite_autoindex_tags_1", set(), 1),
+    ("get_tagged_contact_ids", lambda user, db: repository_tags.get_tagged_contact_ids(1, db),
+     "ix_contact_tags_tag_id", set(), USER_ROWS),
+]
+
+
+def seed(engine) -> None:
+    """
+    Fills the database with synthetic users, contacts, tags and audit entries, then lets the planner analyze it.
+    """
+    Base.metadata.create_all(engine)
+    today, now = date.today(), datetime.now()
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [
+            {"id": user_id, "email": f"user{user_id}@example.com", "password": "-", "confirmed": True}
+            for user_id in range(1, USERS + 1)])
+        insert_rows(connection, Contact.__table__, CONTACT_COLUMNS,
+                    (row for user_id in range(1, USERS + 1)
+                     for row in generate_contacts(user_id, MEAN_CONTACTS, MAX_CONTACTS, today, now, 1)))
+        connection.execute(Tag.__table__.insert(), [
+            {"id": user_id * len(TAGS) + number, "name": name, "user_id": user_id}
+            for user_id in range(1, USERS + 1) for number, name in enumerate(TAGS)])
+        contacts = connection.execute(Contact.__table__.select().with_only_columns(Contact.id, Contact.user_id)).all()
+        connection.execute(contact_tags.insert(), [
+            {"contact_id": contact_id, "tag_id": user_id * len(TAGS) + contact_id % len(TAGS)}
+            for contact_id, user_id in contacts if contact_id % 3 == 0])
+        connection.execute(ContactAudit.__table__.insert(), [
+            {"user_id": user_id, "contact_id": contact_id, "action": "created", "changed_at": now}
+            for contact_id, user_id in contacts])
+        connection.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module", params=DATABASES)
+def seeded_engine(request):
+    if request.param == "sqlite":
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(os.environ["PLAN_TEST_DATABASE_URL"])
+    seed(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name, call, index, full_scans, rows", CASES, ids=[case[0] for case in CASES])
+def test_query_plan(seeded_engine, name, call, index, full_scans, rows):
+    with Session(seeded_engine) as db:
+        user = db.get(User, 1)
+        with QueryLog(seeded_engine) as log:
+            asyncio.run(call(user, db))
+        assert log.statements, f"{name} sent no query"
+        with seeded_engine.connect() as connection:
+            plans = [explain(connection, statement, parameters) for statement, parameters in log.statements]
+    if index is not None:
+        assert any(re.fullmatch(index, used) for used in plans[0].indexes), \
+            f"{name} does not use {index}:\n{plans[0].text}"
+    tables = {table.name for table in Base.metadata.sorted_tables}
+    for (statement, _), plan in zip(log.statements, plans):
+        scanned = plan.full_scans & tables
+        assert scanned <= full_scans, f"{name} reads all of {', '.join(sorted(scanned))}:\n{statement}\n{plan.text}"
+        if rows is not None and plan.rows is not None:
+            assert plan.rows <= rows, f"{name} is estimated to read {plan.rows:g} rows:\n{statement}\n{plan.text}"
+
+
+def test_explain_reports_full_scans():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        plan = explain(connection, "SELECT id FROM contacts WHERE birthday = ?", ("2000-01-01",))
+        indexed = explain(connection, "SELECT id FROM contacts WHERE user_id = ? AND name = ?", (1, "Olena"))
+    assert plan.full_scans == {"contacts"}
+    assert plan.rows is None
+    assert indexed.indexes == {"ix_contacts_user_id_name"}
+    assert indexed.full_scans == set()
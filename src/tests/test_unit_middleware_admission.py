@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+
+from src.middleware.admission import AdmissionController, AdmissionMiddleware, CRITICAL, READ, WRITE, BULK
+from src.services.metrics import Metrics
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.controller = AdmissionController(limit=1, queue_size=2, max_wait=1)
+
+    async def wait(self, priority):
+        task = asyncio.create_task(self.controller.acquire(priority))
+        await asyncio.sleep(0)
+        return task
+
+    async def test_admitted_under_limit(self):
+        self.assertIsNone(await self.controller.acquire(READ))
+        self.assertEqual(self.controller.in_flight, 1)
+        self.controller.release()
+        self.assertEqual(self.controller.in_flight, 0)
+
+    async def test_admitted_by_priority(self):
+        await self.controller.acquire(READ)
+        bulk = await self.wait(BULK)
+        critical = await self.wait(CRITICAL)
+        self.assertEqual(self.controller.queued, 2)
+        self.controller.release()
+        self.assertIsNone(await critical)
+        self.assertFalse(bulk.done())
+        self.controller.release()
+        self.assertIsNone(await bulk)
+        self.assertEqual(self.controller.in_flight, 1)
+
+    async def test_queue_full(self):
+        await self.controller.acquire(READ)
+        waiting = [await self.wait(READ), await self.wait(READ)]
+        self.assertEqual(await self.controller.acquire(READ), "queue_full")
+        self.assertEqual(self.controller.queued, 2)
+        for task in waiting:
+            task.cancel()
+
+    async def test_displaced_by_more_important(self):
+        await self.controller.acquire(READ)
+        write = await self.wait(WRITE)
+        bulk = await self.wait(BULK)
+        critical = await self.wait(CRITICAL)
+        self.assertEqual(await bulk, "displaced")
+        self.controller.release()
+        self.assertIsNone(await critical)
+        self.controller.release()
+        self.assertIsNone(await write)
+
+    async def test_timeout(self):
+        self.controller.max_wait = 0.01
+        await self.controller.acquire(READ)
+        self.assertEqual(await self.controller.acquire(READ), "timeout")
+        self.assertEqual(self.controller.queued, 0)
+        self.controller.release()
+        self.assertEqual(self.controller.in_flight, 0)
+
+    async def test_cancelled_waiter_is_skipped(self):
+        await self.controller.acquire(READ)
+        cancelled = await self.wait(READ)
+        waiting = await self.wait(READ)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        self.controller.release()
+        self.assertIsNone(await waiting)
+        self.assertEqual(self.controller.in_flight, 1)
+
+
+class TestAdmissionMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await self.release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        self.middleware = AdmissionMiddleware(app, limit=1, queue_size=0, max_wait=1, retry_after=3,
+                                              critical_paths=["/api/auth/refresh_token"],
+                                              bulk_paths=["/api/contacts/batch"], exclude_paths=["/stream"])
+
+    async def request(self, path, method="GET"):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await self.middleware({"type": "http", "path": path, "method": method}, None, send)
+        return messages
+
+    async def test_shed_with_retry_after(self):
+        first = asyncio.create_task(self.request("/api/contacts/"))
+        await asyncio.sleep(0)
+        shed = await self.request("/api/contacts/")
+        self.assertEqual(shed[0]["status"], 503)
+        self.assertIn((b"retry-after", b"3"), shed[0]["headers"])
+        self.release.set()
+        self.assertEqual((await first)[0]["status"], 200)
+
+    async def test_excluded_path_is_not_limited(self):
+        first = asyncio.create_task(self.request("/api/contacts/"))
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual((await self.request("/stream"))[0]["status"], 200)
+        await first
+
+    def test_priority(self):
+        self.assertEqual(self.middleware.priority({"path": "/api/auth/refresh_token", "method": "GET"}), CRITICAL)
+        self.assertEqual(self.middleware.priority({"path": "/api/contacts/", "method": "GET"}), READ)
+        self.assertEqual(self.middleware.priority({"path": "/api/contacts/", "method": "POST"}), WRITE)
+        self.assertEqual(self.middleware.priority({"path": "/api/contacts/batch", "method": "GET"}), BULK)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_render(self):
+        metrics = Metrics()
+        metrics.describe("requests_total", "Requests.")
+        metrics.inc("requests_total", priority="read")
+        metrics.inc("requests_total", 2, priority="read")
+        metrics.set("in_flight", 3)
+        self.assertEqual(metrics.value("requests_total", priority="read"), 3)
+        self.assertEqual(metrics.render(), '# HELP requests_total Requests.\n# TYPE requests_total counter\n'
+                                           'requests_total{priority="read"} 3\n# TYPE in_flight gauge\nin_flight 3\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.middleware import compression
+from src.middleware.compression import CompressionMiddleware, accepted_encodings
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100, content_types=["application/json"],
+                   exclude_paths=["/auth"])
+LARGE = [{"name": "test name", "email": "test@gmail.com"}] * 50
+
+
+@app.get("/large")
+def large():
+    return LARGE
+
+
+@app.get("/small")
+def small():
+    return {"name": "test"}
+
+
+@app.get("/auth/large")
+def auth_large():
+    return LARGE
+
+
+@app.get("/text")
+def text():
+    return PlainTextResponse("test " * 100)
+
+
+@app.get("/stream")
+def stream():
+    return StreamingResponse((b'{"chunk": 1}' for _ in range(50)), media_type="application/json")
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def get(self, path, encoding="gzip"):
+        return self.client.get(path, headers={"Accept-Encoding": encoding})
+
+    def test_large_response_is_compressed(self):
+        response = self.get("/large")
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertLess(int(response.headers["content-length"]), len(response.content))
+        self.assertEqual(response.json(), LARGE)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.get("/small")
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.json(), {"name": "test"})
+
+    def test_excluded_path_is_not_compressed(self):
+        response = self.get("/auth/large")
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_other_content_type_is_not_compressed(self):
+        response = self.get("/text")
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_not_accepted_encoding(self):
+        response = self.get("/large", encoding="gzip;q=0, identity")
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_stream_is_compressed(self):
+        response = self.client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.content, b'{"chunk": 1}' * 50)
+
+    @unittest.skipIf(compression.brotli is None, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self.get("/large", encoding="gzip, br")
+        self.assertEqual(response.headers["content-encoding"], "br")
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings("gzip;q=0.5, br;q=0, deflate"), {"gzip", "deflate"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+from src.middleware.disconnect import CancelOnDisconnectMiddleware
+
+
+class TestCancelOnDisconnect(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.finished = False
+        self.cancelled = False
+
+        async def app(scope, receive, send):
+            await receive()
+            try:
+                await asyncio.sleep(0.2)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+            self.finished = True
+
+        self.middleware = CancelOnDisconnectMiddleware(app)
+        self.disconnect = asyncio.Event()
+
+    async def receive(self):
+        if not hasattr(self, "body_sent"):
+            self.body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        pass
+
+    async def test_read_is_cancelled(self):
+        request = asyncio.create_task(self.middleware({"type": "http", "method": "GET"}, self.receive, self.send))
+        await asyncio.sleep(0.01)
+        self.disconnect.set()
+        await request
+        self.assertTrue(self.cancelled)
+        self.assertFalse(self.finished)
+
+    async def test_write_is_finished(self):
+        request = asyncio.create_task(self.middleware({"type": "http", "method": "POST"}, self.receive, self.send))
+        await asyncio.sleep(0.01)
+        self.disconnect.set()
+        await request
+        self.assertTrue(self.finished)
+
+    async def test_connected_read_is_finished(self):
+        await self.middleware({"type": "http", "method": "GET"}, self.receive, self.send)
+        self.assertTrue(self.finished)
+        self.assertFalse(self.cancelled)
+
+    async def test_server_cancellation(self):
+        request = asyncio.create_task(self.middleware({"type": "http", "method": "GET"}, self.receive, self.send))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await request
+        self.assertTrue(self.cancelled)
+
+
+if __name__ == '__main__':
+    unittest.main()
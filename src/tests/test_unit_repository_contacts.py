@@ -1,15 +1,13 @@
 import unittest
-from unittest.mock import MagicMock
-import sys
-import os
-from datetime import date
-
-sys.path.append(os.path.abspath('../..'))
+from unittest.mock import MagicMock, patch
+from datetime import date, datetime
 
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
-from src.database.models import Contact, User
-from src.schemas import ContactModel
+from src.database.models import Base, Contact, Tag, User
+from src.schemas import ContactModel, ContactFilter
 from src.repository.contacts import (
     get_contacts,
     get_contact,
@@ -19,6 +17,17 @@ from src.repository.contacts import (
     get_by_name,
     get_by_surname,
     get_by_email,
+    get_duplicates,
+    merge_contacts,
+    get_upcoming_birthdays,
+    get_stats,
+    get_contacts_by_ids,
+    search_contacts,
+    parse_sort,
+    is_indexed,
+    import_contacts,
+    lookup_contacts,
+    suffix_upper_bound,
     )
 
 
@@ -52,6 +61,9 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.name, body.name)
         self.assertEqual(result.surname, body.surname)
         self.assertEqual(result.phone_number, body.phone_number)
+        self.assertEqual(result.email_key, "test@gmail.com")
+        self.assertEqual(result.phone_key, "38097789815")
+        self.assertEqual(result.email_domain, "gmail.com")
         self.assertTrue(hasattr(result, "id"))
 
     async def test_remove_contact_found(self):
@@ -102,6 +114,215 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result, contacts)
 
 
+    async def test_merge_contacts_found(self):
+        family, work = Tag(id=1, name="family"), Tag(id=2, name="work")
+        contact = Contact(id=1, tags=[family])
+        duplicate = Contact(id=2, tags=[family, work])
+        self.session.query().filter().first.return_value = contact
+        self.session.query().filter().all.return_value = [duplicate]
+        result = await merge_contacts(contact_id=1, duplicate_ids=[1, 2], user=self.user, db=self.session)
+        self.assertEqual(result, contact)
+        self.assertEqual(contact.tags, [family, work])
+        self.session.delete.assert_called_once_with(duplicate)
+        self.session.commit.assert_called_once()
+
+    async def test_merge_contacts_not_found(self):
+        self.session.query().filter().first.return_value = None
+        result = await merge_contacts(contact_id=1, duplicate_ids=[2], user=self.user, db=self.session)
+        self.assertIsNone(result)
+        self.session.delete.assert_not_called()
+
+
+class TestContactQueries(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        # Some queries run in a worker thread, which has to see the same in-memory database.
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.session = Session(bind=engine)
+        self.user = User(id=1, email="owner@gmail.com", password="secret")
+        self.session.add(self.user)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    async def add_contact(self, email, phone_number, user=None, birthday=date(2003, 12, 29)):
+        body = ContactModel(name="test name", surname="test surname", phone_number=phone_number, email=email,
+                            birthday=birthday)
+        return await create_contact(body=body, user=user or self.user, db=self.session)
+
+    async def test_get_duplicates(self):
+        first = await self.add_contact("Test@gmail.com", "067 1234567")
+        second = await self.add_contact(" test@gmail.com", "0501112233")
+        third = await self.add_contact("other@gmail.com", "380671234567")
+        await self.add_contact("single@gmail.com", "+1555")
+        result = await get_duplicates(user=self.user, db=self.session)
+        self.assertEqual(result, [
+            {"field": "email", "key": "test@gmail.com", "contacts": [first, second]},
+            {"field": "phone_number", "key": "+380671234567", "contacts": [first, third]},
+        ])
+
+    async def test_get_duplicates_of_other_user(self):
+        other = User(id=2, email="other@gmail.com", password="secret")
+        self.session.add(other)
+        await self.add_contact("test@gmail.com", "+38097789815")
+        await self.add_contact("test@gmail.com", "+38097789815", user=other)
+        result = await get_duplicates(user=self.user, db=self.session)
+        self.assertEqual(result, [])
+
+    async def test_get_upcoming_birthdays(self):
+        other = User(id=2, email="other@gmail.com", password="secret")
+        self.session.add(other)
+        new_year = await self.add_contact("a@gmail.com", "1", birthday=date(1990, 1, 2))
+        leap_day = await self.add_contact("b@gmail.com", "2", birthday=date(2000, 2, 29), user=other)
+        await self.add_contact("c@gmail.com", "3", birthday=date(1990, 1, 10))
+        await self.add_contact("d@gmail.com", "4", birthday=date(1990, 12, 27))
+        result = await get_upcoming_birthdays(today=date(2022, 12, 28), days=7, db=self.session)
+        self.assertEqual(result, [new_year])
+        result = await get_upcoming_birthdays(today=date(2023, 2, 27), days=1, db=self.session)
+        self.assertEqual(result, [leap_day])
+        result = await get_upcoming_birthdays(today=date(2024, 2, 27), days=1, db=self.session)
+        self.assertEqual(result, [])
+
+    async def test_get_contacts_by_ids(self):
+        other = User(id=2, email="other@gmail.com", password="secret")
+        self.session.add(other)
+        first = await self.add_contact("a@gmail.com", "1")
+        second = await self.add_contact("b@gmail.com", "2")
+        foreign = await self.add_contact("c@gmail.com", "3", user=other)
+        result = await get_contacts_by_ids([second.id, 999, first.id, second.id, foreign.id], user=self.user,
+                                           db=self.session)
+        self.assertEqual(result, {"contacts": [second, first], "missing": [999, foreign.id]})
+
+    def test_parse_sort(self):
+        self.assertEqual(parse_sort(None), [])
+        self.assertEqual(parse_sort("surname, -created_at,surname"), [("surname", False), ("created_at", True)])
+        with self.assertRaises(ValueError):
+            parse_sort("password")
+
+    def test_is_indexed(self):
+        self.assertTrue(is_indexed(parse_sort(None)))
+        self.assertTrue(is_indexed(parse_sort("-created_at")))
+        self.assertFalse(is_indexed(parse_sort("-birthday")))
+        # Every key has an index of its own, but no index serves them together.
+        self.assertFalse(is_indexed(parse_sort("surname,name")))
+        self.assertFalse(is_indexed(parse_sort("surname,-created_at")))
+
+    async def test_search_contacts(self):
+        other = User(id=2, email="other@gmail.com", password="secret")
+        self.session.add(other)
+        first = await self.add_contact("A@Gmail.com", "1", birthday=date(1990, 5, 2))
+        second = await self.add_contact("b@gmail.com", "2", birthday=date(1991, 5, 20))
+        third = await self.add_contact("c@ukr.net", "3", birthday=date(1992, 5, 1))
+        await self.add_contact("d@gmail.com", "4", birthday=date(1993, 6, 1))
+        await self.add_contact("e@gmail.com", "5", birthday=date(1990, 5, 2), user=other)
+        result = await search_contacts(0, self.user, 10, self.session,
+                                       ContactFilter(email_domain="GMAIL.com", birthday_month=5))
+        self.assertEqual(result, [first, second])
+        result = await search_contacts(0, self.user, 10, self.session, ContactFilter(email=" a@gmail.COM "))
+        self.assertEqual(result, [first])
+        result = await search_contacts(0, self.user, 10, self.session,
+                                       ContactFilter(surname="test surname", birthday_month=5), parse_sort("-birthday"))
+        self.assertEqual(result, [third, second, first])
+        result = await search_contacts(1, self.user, 1, self.session, ContactFilter(birthday_month=5), parse_sort("email"))
+        self.assertEqual(result, [second])
+
+    async def test_get_stats(self):
+        other = User(id=2, email="other@gmail.com", password="secret")
+        self.session.add(other)
+        created = [datetime(2023, 5, 1, 9), datetime(2023, 5, 7, 23), datetime(2023, 5, 15), datetime(2023, 1, 1)]
+        for number, (email, birthday) in enumerate([("a@gmail.com", date(1990, 1, 2)), ("b@Ukr.net", date(1991, 1, 20)),
+                                                    ("c@gmail.com", date(1992, 6, 1)), ("d@mail", date(1993, 12, 3))]):
+            contact = await self.add_contact(email, str(number), birthday=birthday)
+            contact.created_at = created[number]
+        await self.add_contact("e@other.com", "5", user=other)
+        self.session.commit()
+        result = await get_stats(user=self.user, db=self.session, today=date(2023, 5, 17), weeks=3, domains=2)
+        self.assertEqual(result["total"], 4)
+        self.assertEqual(result["birthdays_per_month"], {1: 2, 2: 0, 3: 0, 4: 0, 5: 0, 6: 1, 7: 0, 8: 0, 9: 0, 10: 0,
+                                                         11: 0, 12: 1})
+        self.assertEqual(result["added_per_week"], [{"week": date(2023, 5, 1), "count": 2},
+                                                    {"week": date(2023, 5, 8), "count": 0},
+                                                    {"week": date(2023, 5, 15), "count": 1}])
+        self.assertEqual(result["top_email_domains"], [{"domain": "gmail.com", "count": 2},
+                                                       {"domain": "mail", "count": 1}])
+
+    async def test_lookup_contacts(self):
+        other = User(id=2, email="other@gmail.com", password="secret")
+        self.session.add(other)
+        first = await self.add_contact("a@gmail.com", "380971234567")
+        second = await self.add_contact("b@gmail.com", "097 1234567")
+        third = await self.add_contact("c@gmail.com", "0501114567")
+        await self.add_contact("d@gmail.com", "0971234567", user=other)
+        result = await lookup_contacts("(097) 123-45-67", self.user, 10, self.session)
+        self.assertEqual(sorted(contact.id for contact in result), [first.id, second.id])
+        self.assertEqual(first.phone_e164, "+380971234567")
+        result = await lookup_contacts("4567", self.user, 10, self.session, suffix=True)
+        self.assertEqual(sorted(contact.id for contact in result), [first.id, second.id, third.id])
+        result = await lookup_contacts("14567", self.user, 10, self.session, suffix=True)
+        self.assertEqual(result, [third])
+        result = await lookup_contacts("4567", self.user, 1, self.session, suffix=True)
+        self.assertEqual(len(result), 1)
+        result = await lookup_contacts("---", self.user, 10, self.session)
+        self.assertEqual(result, [])
+
+    async def test_lookup_uses_index(self):
+        query = self.session.query(Contact).filter(Contact.user_id == 1, Contact.phone_reversed >= "7654",
+                                                   Contact.phone_reversed < "7655").order_by(Contact.phone_reversed)
+        statement = query.statement.compile(compile_kwargs={"literal_binds": True})
+        plan = " ".join(row[-1] for row in self.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+        self.assertIn("ix_contacts_user_id_phone_reversed", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_suffix_upper_bound(self):
+        self.assertEqual(suffix_upper_bound("7654"), "7655")
+        self.assertEqual(suffix_upper_bound("7699"), "77")
+        self.assertIsNone(suffix_upper_bound("999"))
+
+
+
+class TestContactImport(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        # The import runs in a worker thread, which has to see the same in-memory database.
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        self.session = Session(bind=engine)
+        self.user = User(id=1, email="owner@gmail.com", password="secret")
+        self.session.add(self.user)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def body(self, number):
+        return ContactModel(name=f"name {number}", surname="surname", phone_number=f"+380-{number}",
+                            email=f" Contact{number}@Gmail.com", birthday=date(2000, 1, 1))
+
+    async def test_import_contacts(self):
+        with patch("src.repository.contacts.contact_changed") as contact_changed:
+            imported = await import_contacts((self.body(number) for number in range(25)), self.user, self.session,
+                                             chunk_size=10)
+        self.assertEqual(imported, 25)
+        contacts = self.session.query(Contact).order_by(Contact.id).all()
+        self.assertEqual([contact.name for contact in contacts], [f"name {number}" for number in range(25)])
+        self.assertEqual((contacts[3].email_key, contacts[3].phone_key, contacts[3].email_domain),
+                         ("contact3@gmail.com", "3803", "gmail.com"))
+        self.assertIsNotNone(contacts[0].created_at)
+        contact_changed.assert_awaited_once_with(1, "imported", [])
+
+    async def test_import_is_all_or_nothing(self):
+        def bodies():
+            yield from (self.body(number) for number in range(15))
+            raise ValueError("Line 17: email: field required")
+
+        with patch("src.repository.contacts.contact_changed") as contact_changed:
+            with self.assertRaises(ValueError):
+                await import_contacts(bodies(), self.user, self.session, chunk_size=10)
+        self.assertEqual(self.session.query(Contact).count(), 0)
+        contact_changed.assert_not_awaited()
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,181 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import date
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.database.models import Base, Contact, Tag, User
+from src.schemas import ContactResponse, TagModel
+from src.repository.contacts import get_contacts, get_by_surname
+from src.repository.tags import (
+    get_tags,
+    get_tag,
+    get_tag_by_name,
+    get_tagged_contact_ids,
+    create_tag,
+    update_tag,
+    remove_tag,
+    tag_contact,
+    untag_contact,
+    )
+
+
+class TestTags(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.session = MagicMock(spec=Session)
+        self.user = User(id=1)
+        patcher = patch("src.repository.tags.contact_changed", new_callable=AsyncMock)
+        self.contact_changed = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_get_tags(self):
+        tags = [Tag(name="family"), Tag(name="work")]
+        self.session.query().filter().order_by().offset().limit().all.return_value = tags
+        result = await get_tags(skip=0, limit=10, user=self.user, db=self.session)
+        self.assertEqual(result, tags)
+
+    async def test_get_tag_found(self):
+        tag = Tag()
+        self.session.query().filter().first.return_value = tag
+        result = await get_tag(tag_id=1, user=self.user, db=self.session)
+        self.assertEqual(result, tag)
+
+    async def test_create_tag(self):
+        body = TagModel(name="family")
+        result = await create_tag(body=body, user=self.user, db=self.session)
+        self.assertEqual(result.name, body.name)
+        self.assertEqual(result.user_id, self.user.id)
+
+    async def test_create_tag_exists(self):
+        self.session.commit.side_effect = IntegrityError("INSERT INTO tags", {}, Exception())
+        result = await create_tag(body=TagModel(name="family"), user=self.user, db=self.session)
+        self.assertIsNone(result)
+        self.session.rollback.assert_called_once()
+
+    async def test_update_tag_found(self):
+        tag = Tag(name="family")
+        self.session.query().filter().first.return_value = tag
+        result = await update_tag(tag_id=1, body=TagModel(name="friends"), user=self.user, db=self.session)
+        self.assertEqual(result.name, "friends")
+
+    async def test_update_tag_not_found(self):
+        self.session.query().filter().first.return_value = None
+        result = await update_tag(tag_id=1, body=TagModel(name="friends"), user=self.user, db=self.session)
+        self.assertIsNone(result)
+
+    async def test_remove_tag_found(self):
+        tag = Tag(name="family")
+        self.session.query().filter().first.return_value = tag
+        result = await remove_tag(tag_id=1, user=self.user, db=self.session)
+        self.assertEqual(result, tag)
+        self.session.delete.assert_called_once_with(tag)
+
+    async def test_tag_contact(self):
+        tag = Tag(id=1, name="family")
+        contact = Contact(id=1, tags=[])
+        self.session.query().filter().first.side_effect = [contact, tag]
+        result = await tag_contact(contact_id=1, tag_id=1, user=self.user, db=self.session)
+        self.assertEqual(result.tags, [tag])
+
+    async def test_tag_contact_not_found(self):
+        self.session.query().filter().first.side_effect = [None, Tag(id=1)]
+        result = await tag_contact(contact_id=1, tag_id=1, user=self.user, db=self.session)
+        self.assertIsNone(result)
+
+    async def test_untag_contact(self):
+        family, work = Tag(id=1, name="family"), Tag(id=2, name="work")
+        contact = Contact(id=1, tags=[family, work])
+        self.session.query().filter().first.return_value = contact
+        result = await untag_contact(contact_id=1, tag_id=1, user=self.user, db=self.session)
+        self.assertEqual(result.tags, [work])
+        self.contact_changed.assert_awaited_once_with(1, "updated", [1])
+
+    async def test_untag_contact_not_tagged(self):
+        work = Tag(id=2, name="work")
+        contact = Contact(id=1, tags=[work])
+        self.session.query().filter().first.return_value = contact
+        result = await untag_contact(contact_id=1, tag_id=1, user=self.user, db=self.session)
+        self.assertEqual(result.tags, [work])
+        self.session.commit.assert_not_called()
+        self.contact_changed.assert_not_awaited()
+
+
+class TestTagQueries(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        self.session = Session(bind=self.engine)
+        family, work = Tag(name="family", user_id=1), Tag(name="work", user_id=1)
+        self.session.add_all([User(id=1, email="owner@gmail.com", password="secret"), family, work])
+        for number in range(20):
+            tags = [family, work] if number % 2 else [work]
+            self.session.add(Contact(name=f"name {number}", surname="Ivanov" if number < 10 else "Petrov",
+                                     phone_number=str(number), email=f"{number}@gmail.com",
+                                     birthday=date(2000, 1, 1), user_id=1, tags=tags))
+        self.session.commit()
+        self.session.expunge_all()
+        self.user = User(id=1)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.count)
+        patcher = patch("src.repository.tags.contact_changed", new_callable=AsyncMock)
+        self.contact_changed = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self.count)
+        self.session.close()
+
+    def count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    async def test_tags_are_loaded_without_n_plus_one(self):
+        contacts = await get_contacts(skip=0, limit=100, user=self.user, db=self.session)
+        response = [ContactResponse.from_orm(contact) for contact in contacts]
+        self.assertEqual(len(response), 20)
+        self.assertEqual([tag.name for tag in response[1].tags], ["family", "work"])
+        self.assertEqual(len(self.statements), 2)
+
+    async def test_filter_by_tag(self):
+        contacts = await get_contacts(skip=0, limit=100, user=self.user, db=self.session, tag="family")
+        self.assertEqual(len(contacts), 10)
+        self.assertTrue(all("family" in [tag.name for tag in contact.tags] for contact in contacts))
+        self.assertEqual(len(self.statements), 2)
+
+    async def test_filter_by_tag_and_surname(self):
+        contacts = await get_by_surname(skip=0, limit=100, user=self.user, surname="Ivanov", db=self.session,
+                                        tag="family")
+        self.assertEqual([contact.name for contact in contacts], ["name 1", "name 3", "name 5", "name 7", "name 9"])
+
+    async def test_filter_by_tag_of_other_user(self):
+        other = User(id=2)
+        contacts = await get_contacts(skip=0, limit=100, user=other, db=self.session, tag="family")
+        self.assertEqual(contacts, [])
+
+    async def test_create_tag_twice(self):
+        self.assertIsNone(await create_tag(body=TagModel(name="work"), user=self.user, db=self.session))
+        tag = await create_tag(body=TagModel(name="gym"), user=self.user, db=self.session)
+        self.assertEqual(tag.name, "gym")
+
+    async def test_rename_tag_reports_tagged_contacts(self):
+        family = await get_tag_by_name("family", self.user, self.session)
+        await update_tag(tag_id=family.id, body=TagModel(name="relatives"), user=self.user, db=self.session)
+        action, contact_ids = self.contact_changed.await_args.args[1:]
+        self.assertEqual((action, len(contact_ids)), ("updated", 10))
+        self.contact_changed.reset_mock()
+        await update_tag(tag_id=family.id, body=TagModel(name="relatives"), user=self.user, db=self.session)
+        self.contact_changed.assert_not_awaited()
+
+    async def test_remove_tag_reports_tagged_contacts(self):
+        family = await get_tag_by_name("family", self.user, self.session)
+        contact_ids = await get_tagged_contact_ids(family.id, self.session)
+        await remove_tag(tag_id=family.id, user=self.user, db=self.session)
+        self.contact_changed.assert_awaited_once_with(1, "updated", contact_ids)
+        self.assertEqual(len(contact_ids), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,5 @@
 import unittest
 from unittest.mock import MagicMock
-import sys
-import os
-
-sys.path.append(os.path.abspath('../..'))
 
 from sqlalchemy.orm import Session
 
@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, ContactAudit, User
+from src.repository.contacts import get_history
+from src.services.audit import AuditLog
+from src.services.metrics import metrics
+
+
+class TestAuditLog(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        # The entries are written in a worker thread, which has to see the same in-memory database.
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.session = Session(bind=self.engine)
+
+    def tearDown(self):
+        self.session.close()
+
+    def entries(self):
+        self.session.expire_all()
+        return [(entry.user_id, entry.contact_id, entry.action)
+                for entry in self.session.query(ContactAudit).order_by(ContactAudit.id)]
+
+    async def test_ignored_until_started(self):
+        log = AuditLog(batch_size=10, flush_interval=60, max_pending=100, max_wait=0.1, max_attempts=3)
+        await log.record(1, "created", [2])
+        self.assertEqual(log.pending, [])
+
+    async def test_full_batch_is_written(self):
+        log = AuditLog(batch_size=3, flush_interval=60, max_pending=100, max_wait=0.1, max_attempts=3)
+        log.start(self.engine)
+        await log.record(1, "created", [2])
+        await log.record(1, "merged", [2, 3])
+        await log.record(1, "imported", [])
+        await asyncio.wait_for(log.idle.wait(), 5)
+        self.assertEqual(self.entries(), [(1, 2, "created"), (1, 2, "merged"), (1, 3, "merged"), (1, None, "imported")])
+        await log.stop()
+
+    async def test_rest_is_written_on_stop(self):
+        log = AuditLog(batch_size=10, flush_interval=60, max_pending=100, max_wait=0.1, max_attempts=3)
+        log.start(self.engine)
+        await log.record(1, "removed", [2])
+        await asyncio.sleep(0)
+        self.assertEqual(self.entries(), [])
+        await log.stop()
+        self.assertEqual(self.entries(), [(1, 2, "removed")])
+
+    async def test_full_buffer_drops_entries(self):
+        log = AuditLog(batch_size=10, flush_interval=60, max_pending=2, max_wait=0.01, max_attempts=3)
+        with patch.object(log, "run"):
+            log.start(self.engine)
+            dropped = metrics.value("contact_audit_dropped_total")
+            await log.record(1, "merged", [2, 3])
+            await log.record(1, "updated", [2])
+            self.assertEqual(len(log.pending), 2)
+            self.assertEqual(metrics.value("contact_audit_dropped_total"), dropped + 1)
+            await log.stop()
+        self.assertEqual(len(self.entries()), 2)
+
+    async def test_entries_being_written_take_room(self):
+        log = AuditLog(batch_size=2, flush_interval=60, max_pending=2, max_wait=0.01, max_attempts=3)
+        log.engine = self.engine
+        log.pending = [(1, 2, "created", None), (1, 3, "created", None)]
+        seen = []
+
+        def write(batch):
+            seen.append((log.pending, log.in_flight, log.room.is_set(), log.idle.is_set()))
+
+        with patch.object(log, "write", write):
+            await log.flush()
+        self.assertEqual(seen, [([], 2, False, False)])
+        self.assertEqual(log.in_flight, 0)
+        self.assertTrue(log.room.is_set())
+        self.assertTrue(log.idle.is_set())
+
+    async def test_unavailable_database_is_retried(self):
+        log = AuditLog(batch_size=1, flush_interval=60, max_pending=100, max_wait=0.1, max_attempts=3)
+        log.engine = self.engine
+        log.pending = [(1, 2, "created", None), (1, 3, "created", None)]
+        discarded = metrics.value("contact_audit_discarded_total")
+        error = OperationalError("INSERT", {}, Exception("connection refused"))
+        with patch.object(log, "write", side_effect=error):
+            await log.flush()
+            await log.flush()
+            self.assertEqual(len(log.pending), 2)
+            await log.flush()
+        self.assertEqual(log.pending, [(1, 3, "created", None)])
+        self.assertEqual(log.failures, 1)
+        self.assertEqual(metrics.value("contact_audit_discarded_total"), discarded + 1)
+
+    async def test_rejected_batch_is_discarded(self):
+        log = AuditLog(batch_size=1, flush_interval=60, max_pending=100, max_wait=0.1, max_attempts=3)
+        log.engine = self.engine
+        changed_at = datetime.utcnow()
+        log.pending = [(1, 2, "created", None), (1, 3, "created", changed_at)]
+        discarded = metrics.value("contact_audit_discarded_total")
+        await log.flush()
+        self.assertEqual(log.pending, [])
+        self.assertEqual(log.failures, 0)
+        self.assertEqual(metrics.value("contact_audit_discarded_total"), discarded + 1)
+        self.assertEqual(self.entries(), [(1, 3, "created")])
+
+    async def test_get_history(self):
+        user = User(id=1, email="owner@gmail.com", password="secret")
+        self.session.add(user)
+        self.session.commit()
+        log = AuditLog(batch_size=10, flush_interval=60, max_pending=100, max_wait=0.1, max_attempts=3)
+        log.start(self.engine)
+        await log.record(1, "created", [2])
+        await log.record(2, "created", [2])
+        await log.record(1, "updated", [2])
+        await log.record(1, "created", [3])
+        await log.stop()
+        result = await get_history(2, 0, user, 10, self.session)
+        self.assertEqual([entry.action for entry in result], ["updated", "created"])
+        result = await get_history(2, 1, user, 10, self.session)
+        self.assertEqual([entry.action for entry in result], ["created"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import io
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi import HTTPException
+from PIL import Image
+
+from src.services import avatars
+from src.services.avatars import AvatarProcessor, render_variants
+from src.services.storage import LocalStorage
+
+
+def image_bytes(width=300, height=200, image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def request(headers=None, method="GET"):
+    return MagicMock(headers=headers or {}, method=method)
+
+
+class TestRenderVariants(unittest.TestCase):
+
+    def test_variants(self):
+        variants = render_variants(image_bytes(), [32, 64], 10 ** 6)
+        self.assertEqual(sorted(variants), ["32.jpg", "32.webp", "64.jpg", "64.webp"])
+        for name, content in variants.items():
+            image = Image.open(io.BytesIO(content))
+            self.assertEqual(image.size, (int(name.split(".")[0]),) * 2)
+            self.assertEqual(image.format, "WEBP" if name.endswith("webp") else "JPEG")
+
+    def test_not_an_image(self):
+        with self.assertRaisesRegex(ValueError, "not a supported image"):
+            render_variants(b"<html></html>", [32], 10 ** 6)
+
+    def test_too_many_pixels(self):
+        with self.assertRaisesRegex(ValueError, "at most 100 pixels"):
+            render_variants(image_bytes(20, 20), [32], 100)
+
+
+class TestAvatarProcessor(unittest.IsolatedAsyncioTestCase):
+
+    async def test_render_in_pool(self):
+        processor = AvatarProcessor(processes=1, sizes=[16], max_pixels=10 ** 6)
+        try:
+            variants = await processor.render(image_bytes())
+            self.assertEqual(sorted(variants), ["16.jpg", "16.webp"])
+            with self.assertRaises(ValueError):
+                await processor.render(b"not an image")
+        finally:
+            processor.stop()
+
+
+class TestLocalStorage(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(self.directory.name)
+        await self.storage.save("1/abc/10.webp", b"0123456789")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def test_response(self):
+        response = await self.storage.response("1/abc/10.webp", request(), {"Cache-Control": "immutable"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.media_type, "image/webp")
+        self.assertEqual(response.headers["etag"], '"1-abc-10.webp"')
+        self.assertEqual(response.headers["cache-control"], "immutable")
+        self.assertEqual(response.headers["content-length"], "10")
+
+    async def test_not_modified(self):
+        response = await self.storage.response("1/abc/10.webp", request({"if-none-match": '"1-abc-10.webp"'}), {})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_range(self):
+        response = await self.storage.response("1/abc/10.webp", request({"range": "bytes=2-4"}), {})
+        self.assertEqual((response.status_code, response.body), (206, b"234"))
+        self.assertEqual(response.headers["content-range"], "bytes 2-4/10")
+        response = await self.storage.response("1/abc/10.webp", request({"range": "bytes=-3"}), {})
+        self.assertEqual((response.body, response.headers["content-range"]), (b"789", "bytes 7-9/10"))
+        response = await self.storage.response("1/abc/10.webp", request({"range": "bytes=20-"}), {})
+        self.assertEqual((response.status_code, response.headers["content-range"]), (416, "bytes */10"))
+
+    async def test_accel_redirect(self):
+        storage = LocalStorage(self.directory.name, accel_redirect="/protected/avatars/")
+        response = await storage.response("1/abc/10.webp", request(), {})
+        self.assertEqual(response.headers["x-accel-redirect"], "/protected/avatars/1/abc/10.webp")
+        self.assertEqual(response.body, b"")
+
+    async def test_missing(self):
+        with self.assertRaises(HTTPException) as error:
+            await self.storage.response("1/abc/20.webp", request(), {})
+        self.assertEqual(error.exception.status_code, 404)
+        with self.assertRaises(ValueError):
+            self.storage.path("../secret")
+
+    async def test_saved_file_is_readable_by_others(self):
+        self.assertEqual(self.storage.path("1/abc/10.webp").stat().st_mode & 0o777, 0o644)
+
+    async def test_delete(self):
+        await self.storage.save("1/new/10.webp", b"new")
+        await self.storage.delete("1/abc")
+        self.assertFalse(self.storage.path("1/abc").exists())
+        self.assertTrue(self.storage.path("1/new/10.webp").exists())
+        await self.storage.delete("1/missing")
+
+    async def test_remove_old_avatar_keeps_concurrent_upload(self):
+        # Two uploads both replace abc; the one that commits last, def, must survive the cleanup of the other.
+        await self.storage.save("1/def/10.webp", b"def")
+        await self.storage.save("1/0123/10.webp", b"0123")
+        with patch.object(avatars, "storage", self.storage):
+            await avatars.remove_old_avatar(1, "abc", "0123")
+            await avatars.remove_old_avatar(1, None, "0123")
+            await avatars.remove_old_avatar(1, "0123", "0123")
+        self.assertFalse(self.storage.path("1/abc").exists())
+        self.assertTrue(self.storage.path("1/def/10.webp").exists())
+        self.assertTrue(self.storage.path("1/0123/10.webp").exists())
+
+    def test_avatar_version(self):
+        self.assertEqual(avatars.avatar_version(1, "/api/users/1/avatar/0123456789abcdef/128.webp"), "0123456789abcdef")
+        self.assertIsNone(avatars.avatar_version(2, "/api/users/1/avatar/0123456789abcdef/128.webp"))
+        self.assertIsNone(avatars.avatar_version(1, "https://www.gravatar.com/avatar/0123456789abcdef"))
+        self.assertIsNone(avatars.avatar_version(1, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from datetime import date
+
+import pytest
+
+from src.database.models import Contact, User
+from src.services.birthdays import build_digests, days_until
+from src.services.digests import STALE, digest_key, get_digest
+
+
+class TestDigests(unittest.IsolatedAsyncioTestCase):
+
+    @pytest.fixture(autouse=True)
+    def use_fixtures(self, session, fake_redis):
+        self.session = session
+        self.redis = fake_redis
+
+    def setUp(self):
+        self.day = date(2023, 5, 15)
+        self.users = [User(email=f"owner{number}@gmail.com", password="secret") for number in range(3)]
+        self.session.add_all(self.users)
+        self.session.commit()
+
+    def add_contact(self, user, birthday):
+        contact = Contact(name="Name", surname="Surname", phone_number="0671234567",
+                          email=f"contact{birthday.isoformat()}@ukr.net", birthday=birthday, user_id=user.id)
+        self.session.add(contact)
+        self.session.commit()
+        return contact
+
+    async def test_build_digests(self):
+        later = self.add_contact(self.users[0], date(1990, 5, 20))
+        sooner = self.add_contact(self.users[0], date(1991, 5, 16))
+        self.add_contact(self.users[1], date(1990, 1, 1))
+        digests = await build_digests(self.day, self.session)
+        self.assertEqual(list(digests), [self.users[0].id])
+        # Ordered by ID like the query of the route, not by the nearest birthday.
+        self.assertEqual([contact["id"] for contact in await get_digest(self.users[0], self.day)], [later.id, sooner.id])
+        self.assertEqual(await get_digest(self.users[1], self.day), [])
+
+    async def test_stale_digest_is_kept(self):
+        self.add_contact(self.users[0], date(1990, 5, 20))
+        self.add_contact(self.users[2], date(1990, 5, 20))
+        self.redis.data[digest_key(self.day, self.users[0].id)] = STALE
+        await build_digests(self.day, self.session)
+        self.assertEqual(self.redis.data[digest_key(self.day, self.users[0].id)], STALE)
+        self.assertIsNone(await get_digest(self.users[0], self.day))
+        self.assertEqual(len(await get_digest(self.users[2], self.day)), 1)
+
+    async def test_digest_before_the_job(self):
+        self.assertIsNone(await get_digest(self.users[0], self.day))
+
+    def test_days_until(self):
+        self.assertEqual(days_until(date(1990, 5, 15), self.day), 0)
+        self.assertEqual(days_until(date(1990, 5, 14), self.day), 365)
+        self.assertEqual(days_until(date(2000, 2, 29), date(2023, 2, 27)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
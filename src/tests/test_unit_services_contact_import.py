@@ -0,0 +1,42 @@
+import io
+import unittest
+from datetime import date
+
+from src.services.contact_import import read_contacts_csv
+
+
+def csv_file(text):
+    return io.BytesIO(text.encode("utf-8-sig"))
+
+
+class TestReadContactsCsv(unittest.TestCase):
+
+    def test_read(self):
+        file = csv_file('email,name,surname,phone_number,birthday,note\n'
+                        'olena@ukr.net,Olena,Koval,0671234567,1990-05-17,"two\nlines"\n'
+                        'ivan@gmail.com,Ivan,Moroz,380501234567,1985-01-02,\n')
+        contacts = list(read_contacts_csv(file, max_rows=10))
+        self.assertEqual([(contact.name, contact.email, contact.birthday) for contact in contacts],
+                         [("Olena", "olena@ukr.net", date(1990, 5, 17)), ("Ivan", "ivan@gmail.com", date(1985, 1, 2))])
+
+    def test_missing_column(self):
+        with self.assertRaisesRegex(ValueError, "Missing columns: phone_number, birthday"):
+            list(read_contacts_csv(csv_file("name,surname,email\n"), max_rows=10))
+
+    def test_invalid_row(self):
+        file = csv_file("name,surname,phone_number,email,birthday\n"
+                        "Olena,Koval,0671234567,olena@ukr.net,1990-05-17\n"
+                        "Ivan,Moroz,0501234567,ivan@gmail.com,someday\n")
+        contacts = read_contacts_csv(file, max_rows=10)
+        self.assertEqual(next(contacts).name, "Olena")
+        with self.assertRaisesRegex(ValueError, "Line 3: birthday: invalid date format"):
+            next(contacts)
+
+    def test_too_many_rows(self):
+        file = csv_file("name,surname,phone_number,email,birthday\n" + "A,B,1,a@b.c,2000-01-01\n" * 3)
+        with self.assertRaisesRegex(ValueError, "At most 2 contacts"):
+            list(read_contacts_csv(file, max_rows=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
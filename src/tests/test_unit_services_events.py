@@ -0,0 +1,192 @@
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+import unittest
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.conf.config import settings
+from src.services import digests, redis
+from src.services.events import EventHub, RESET, contact_changed, event_stream
+
+
+def encode(reply):
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"${len(reply.encode())}\r\n{reply}\r\n".encode()
+    return f"*{len(reply)}\r\n".encode() + b"".join(encode(item) for item in reply)
+
+
+class PubSubServer:
+    """
+    A Redis server with just enough of the protocol for a subscriber: SUBSCRIBE, UNSUBSCRIBE, PING
+    and published messages.
+    """
+
+    def __init__(self):
+        self.channels = {}
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for writer in set(self.channels.values()):
+            writer.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        subscribed = 0
+        while line := await reader.readline():
+            command = []
+            for _ in range(int(line[1:])):
+                length = int((await reader.readline())[1:])
+                command.append((await reader.readexactly(length + 2))[:-2].decode())
+            name = command[0].upper()
+            if name in ("SUBSCRIBE", "UNSUBSCRIBE"):
+                for channel in command[1:]:
+                    if name == "SUBSCRIBE":
+                        self.channels[channel] = writer
+                    else:
+                        self.channels.pop(channel, None)
+                    subscribed = sum(subscriber is writer for subscriber in self.channels.values())
+                    writer.write(encode([name.lower(), channel, subscribed]))
+            elif name == "PING" and not subscribed:
+                writer.write(b"+PONG\r\n")
+            elif name == "PING":
+                writer.write(encode(["pong", command[1] if len(command) > 1 else ""]))
+            else:
+                writer.write(b"+OK\r\n")
+            await writer.drain()
+
+    def publish(self, channel, data):
+        if channel in self.channels:
+            self.channels[channel].write(encode(["message", channel, data]))
+
+
+class TestContactChanged(unittest.IsolatedAsyncioTestCase):
+
+    def test_imports_on_its_own(self):
+        # Workers and scripts may import the module before the repositories that use it.
+        for module in ("src.services.events", "src.repository.tags", "src.services.birthdays"):
+            result = subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True, text=True,
+                                    cwd=Path(__file__).parents[2])
+            self.assertEqual(result.returncode, 0, result.stderr)
+
+    async def test_without_redis(self):
+        with patch.object(redis, "redis_client", None):
+            await contact_changed(1, "created", [2])
+
+    async def test_publish(self):
+        client = MagicMock()
+        pipeline = client.pipeline.return_value
+        pipeline.execute = AsyncMock(return_value=[1, True, 0])
+        with patch.object(redis, "redis_client", client), \
+                patch.object(digests, "utc_today", return_value=date(2023, 5, 17)):
+            await contact_changed(1, "merged", [2, 3])
+        client.pipeline.assert_called_once_with(transaction=False)
+        pipeline.incr.assert_called_once_with("contact_stats:1:version")
+        pipeline.set.assert_called_once_with("birthday_digest:2023-05-17:1", digests.STALE, ex=digests.DIGEST_TTL)
+        pipeline.publish.assert_called_once_with("contact_events:1",
+                                                 json.dumps({"action": "merged", "contact_ids": [2, 3]}))
+        pipeline.execute.assert_awaited_once()
+
+
+class TestEventHub(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.hub = EventHub(queue_size=2)
+        for name in ("follow", "unfollow"):
+            patcher = patch.object(self.hub, name, AsyncMock())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_dispatch_to_user(self):
+        async with self.hub.subscribe(1) as first, self.hub.subscribe(1) as second, self.hub.subscribe(2) as other:
+            self.hub.dispatch(1, "change")
+            self.assertEqual(first.get_nowait(), "change")
+            self.assertEqual(second.get_nowait(), "change")
+            self.assertTrue(other.empty())
+        self.assertEqual(dict(self.hub.subscribers), {})
+        self.assertEqual([call.args for call in self.hub.follow.await_args_list], [(1,), (2,)])
+        self.assertEqual([call.args for call in self.hub.unfollow.await_args_list], [(2,), (1,)])
+
+    async def test_slow_stream_is_reset(self):
+        async with self.hub.subscribe(1) as slow, self.hub.subscribe(1) as fast:
+            for number in range(3):
+                self.hub.dispatch(1, str(number))
+                fast.get_nowait()
+            self.assertEqual(slow.get_nowait(), RESET)
+            self.assertTrue(slow.empty())
+
+    async def test_close_all(self):
+        async with self.hub.subscribe(1) as queue:
+            self.hub.close_all()
+            self.assertIsNone(queue.get_nowait())
+
+    async def test_event_stream(self):
+        with patch("src.services.events.hub", self.hub):
+            stream = event_stream(1)
+            self.assertEqual(await stream.__anext__(), "retry: 3000\n\n")
+            self.hub.dispatch(1, '{"action": "created", "contact_ids": [5]}')
+            self.assertEqual(await stream.__anext__(),
+                             'event: contact\ndata: {"action": "created", "contact_ids": [5]}\n\n')
+            self.hub.close_all()
+            with self.assertRaises(StopAsyncIteration):
+                await stream.__anext__()
+        self.assertEqual(dict(self.hub.subscribers), {})
+
+    async def test_event_stream_heartbeat(self):
+        with patch("src.services.events.hub", self.hub), \
+                patch("src.services.events.settings.contact_events_heartbeat", 0.01):
+            stream = event_stream(1)
+            await stream.__anext__()
+            self.assertEqual(await stream.__anext__(), ": heartbeat\n\n")
+            await stream.aclose()
+
+
+class TestEventHubListen(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = PubSubServer()
+        port = await self.server.start()
+        for name, value in (("redis_host", "127.0.0.1"), ("redis_port", port), ("redis_socket_timeout", 0.1),
+                            ("redis_health_check_interval", 0.05)):
+            patcher = patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def test_quiet_channels_keep_streams_open(self):
+        hub = EventHub(queue_size=10)
+        async with hub.subscribe(1) as queue:
+            # Longer than the socket timeout of the pool, with health checks in between.
+            await asyncio.sleep(0.5)
+            self.assertFalse(hub.listener.done())
+            self.assertTrue(queue.empty())
+            self.server.publish("contact_events:1", "change")
+            self.assertEqual(await asyncio.wait_for(queue.get(), 1), "change")
+        await hub.stop()
+
+    async def test_subscribes_to_users_with_streams(self):
+        hub = EventHub(queue_size=10)
+        async with hub.subscribe(1) as first, hub.subscribe(1), hub.subscribe(2) as second:
+            await asyncio.sleep(0.1)
+            self.assertEqual(set(self.server.channels), {"contact_events:1", "contact_events:2"})
+            self.server.publish("contact_events:2", "change")
+            self.assertEqual(await asyncio.wait_for(second.get(), 1), "change")
+            self.assertTrue(first.empty())
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.server.channels, {})
+        self.assertFalse(hub.listener.done())
+        await hub.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from src.schemas import UserModel
+from src.services.idempotency import Idempotency
+
+
+class TestIdempotency(unittest.IsolatedAsyncioTestCase):
+
+    @pytest.fixture(autouse=True)
+    def use_fake_redis(self, fake_redis):
+        self.redis = fake_redis
+
+    def setUp(self):
+        self.idempotency = Idempotency(ttl=60, lock_timeout=1, poll_interval=0.01)
+        self.body = UserModel(username="testing", email="testing@example.com", password="testing")
+
+    async def test_without_key(self):
+        handler = AsyncMock(return_value=self.body)
+        result = await self.idempotency.run("signup", None, self.body, handler)
+        self.assertEqual(result, self.body)
+        self.assertEqual(self.redis.data, {})
+
+    async def test_retry_is_replayed(self):
+        handler = AsyncMock(return_value=self.body)
+        first = await self.idempotency.run("signup", "key", self.body, handler, 201)
+        retry = await self.idempotency.run("signup", "key", self.body, handler, 201)
+        handler.assert_awaited_once()
+        self.assertEqual(first, self.body)
+        self.assertIsInstance(retry, JSONResponse)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+
+    async def test_key_reused_for_other_body(self):
+        handler = AsyncMock(return_value=self.body)
+        await self.idempotency.run("signup", "key", self.body, handler)
+        other = self.body.copy(update={"email": "other@example.com"})
+        with self.assertRaises(HTTPException) as error:
+            await self.idempotency.run("signup", "key", other, handler)
+        self.assertEqual(error.exception.status_code, 422)
+
+    async def test_concurrent_duplicate_waits(self):
+        async def slow_handler():
+            await asyncio.sleep(0.05)
+            return self.body
+
+        handler = AsyncMock(side_effect=slow_handler)
+        first, duplicate = await asyncio.gather(
+            self.idempotency.run("signup", "key", self.body, handler),
+            self.idempotency.run("signup", "key", self.body, handler),
+        )
+        handler.assert_awaited_once()
+        self.assertEqual(first, self.body)
+        self.assertIsInstance(duplicate, JSONResponse)
+
+    async def test_failed_request_releases_key(self):
+        handler = AsyncMock(side_effect=[HTTPException(status_code=409), self.body])
+        with self.assertRaises(HTTPException):
+            await self.idempotency.run("signup", "key", self.body, handler)
+        result = await self.idempotency.run("signup", "key", self.body, handler)
+        self.assertEqual(result, self.body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+from src.services.login_guard import LoginGuard
+from src.services.redis import get_redis
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestLoginGuard(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.guard = LoginGuard(window=3600, account_free_failures=2, account_lockout_failures=5,
+                                ip_free_failures=4, ip_lockout_failures=8, backoff_base=1, backoff_max=3,
+                                lockout_seconds=900, dummy_rate=2)
+
+    def test_delay(self):
+        self.assertEqual([self.guard.delay("account", failures) for failures in range(1, 7)], [0, 0, 1, 2, 900, 900])
+        self.assertEqual([self.guard.delay("ip", failures) for failures in range(4, 9)], [0, 1, 2, 3, 900])
+
+    async def test_account_is_blocked_after_free_failures(self):
+        for _ in range(2):
+            await self.guard.failed("Owner@Gmail.com", "10.0.0.1")
+            self.assertEqual(await self.guard.check("owner@gmail.com", "10.0.0.1"), 0)
+        await self.guard.failed("owner@gmail.com ", "10.0.0.1")
+        self.assertEqual(await self.guard.check("owner@gmail.com", "10.0.0.2"), 1)
+        self.assertEqual(await self.guard.check("other@gmail.com", "10.0.0.1"), 0)
+        self.assertNotIn("owner@gmail.com", " ".join(get_redis().data))
+
+    async def test_ip_is_blocked_across_accounts(self):
+        for number in range(5):
+            await self.guard.failed(f"user{number}@gmail.com", "10.0.0.1")
+        self.assertEqual(await self.guard.check("new@gmail.com", "10.0.0.1"), 1)
+        self.assertEqual(await self.guard.check("new@gmail.com", "10.0.0.2"), 0)
+
+    async def test_lockout(self):
+        for _ in range(5):
+            await self.guard.failed("owner@gmail.com", "10.0.0.1")
+        self.assertEqual(await self.guard.check("owner@gmail.com", "10.0.0.3"), 900)
+
+    async def test_success_forgets_account_failures(self):
+        for _ in range(2):
+            await self.guard.failed("owner@gmail.com", "10.0.0.1")
+        await self.guard.succeeded("owner@gmail.com")
+        await self.guard.failed("owner@gmail.com", "10.0.0.1")
+        self.assertEqual(await self.guard.check("owner@gmail.com", "10.0.0.1"), 0)
+
+    def test_dummy_verify_is_budgeted(self):
+        with patch("src.services.login_guard.auth_service") as auth_service:
+            self.guard.dummy_hash = "hash"
+            results = [self.guard.dummy_verify("secret") for _ in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(auth_service.verify_password.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
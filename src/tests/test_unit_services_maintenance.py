@@ -0,0 +1,73 @@
+import unittest
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.database.models import Base, User
+from src.repository.users import clear_expired_tokens, remove_unconfirmed_users, token_expiry
+from src.services.maintenance import maintenance_job, reclaim
+from src.services.metrics import metrics
+
+
+class TestMaintenance(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.sessions = sessionmaker(bind=engine)
+        self.session = self.sessions()
+        self.now = datetime.utcnow()
+
+    def tearDown(self):
+        self.session.close()
+
+    def add_users(self, count, **values):
+        added = self.session.query(User).count()
+        self.session.add_all([User(email=f"user{added + number}@gmail.com", password="secret", **values)
+                              for number in range(count)])
+        self.session.commit()
+
+    async def test_unconfirmed_users_are_removed_in_batches(self):
+        self.add_users(5, confirmed=False, created_at=self.now - timedelta(days=10))
+        self.add_users(2, confirmed=False, created_at=self.now - timedelta(days=1))
+        self.add_users(2, confirmed=True, created_at=self.now - timedelta(days=10))
+        removed = metrics.value("maintenance_rows_reclaimed_total", kind="unconfirmed_users")
+        with patch("src.services.maintenance.repository_users.remove_unconfirmed_users",
+                   wraps=remove_unconfirmed_users) as batch:
+            total = await reclaim("unconfirmed_users", batch, self.now - timedelta(days=7), self.session, 2, 0)
+        self.assertEqual(total, 5)
+        self.assertEqual(batch.call_count, 3)
+        self.assertEqual(self.session.query(User).count(), 4)
+        self.assertEqual(self.session.query(User).filter(User.confirmed == False).count(), 2)
+        self.assertEqual(metrics.value("maintenance_rows_reclaimed_total", kind="unconfirmed_users"), removed + 5)
+
+    async def test_expired_tokens_are_cleared(self):
+        self.add_users(3, confirmed=True, refresh_token="expired", refresh_token_expires_at=self.now - timedelta(hours=1))
+        self.add_users(1, confirmed=True, refresh_token="valid", refresh_token_expires_at=self.now + timedelta(days=1))
+        cleared = await clear_expired_tokens(self.now, 10, self.session)
+        self.assertEqual(cleared, 3)
+        self.session.expire_all()
+        self.assertEqual([user.refresh_token for user in self.session.query(User)], [None, None, None, "valid"])
+
+    async def test_job(self):
+        self.add_users(1, confirmed=False, created_at=self.now - timedelta(days=30))
+        self.add_users(1, confirmed=True, refresh_token="expired", refresh_token_expires_at=self.now - timedelta(days=1))
+        with patch("src.services.maintenance.SessionLocal", self.sessions):
+            await maintenance_job(date.today())
+        self.session.expire_all()
+        users = self.session.query(User).all()
+        self.assertEqual(len(users), 1)
+        self.assertIsNone(users[0].refresh_token)
+
+    def test_token_expiry(self):
+        from jose import jwt
+
+        expires = datetime(2030, 1, 1)
+        self.assertEqual(token_expiry(jwt.encode({"exp": expires}, "secret", algorithm="HS256")), expires)
+        self.assertIsNone(token_expiry("not a token"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from src.services.normalize import phone_e164, phone_reversed
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_phone_e164(self):
+        for phone_number in ("+380971234567", "+38 (097) 123-45-67", "0971234567", "971234567", "380971234567",
+                             "00380971234567"):
+            self.assertEqual(phone_e164(phone_number), "+380971234567", phone_number)
+        self.assertEqual(phone_e164("+1 (555) 123-4567"), "+15551234567")
+        self.assertEqual(phone_e164("0044 20 7946 0958"), "+442079460958")
+        self.assertIsNone(phone_e164("---"))
+        self.assertIsNone(phone_e164("+1234567890123456"))
+
+    def test_phone_reversed(self):
+        self.assertEqual(phone_reversed("097 123 45 67"), "765432179083")
+        self.assertIsNone(phone_reversed(""))
+
+
+if __name__ == '__main__':
+    unittest.main()
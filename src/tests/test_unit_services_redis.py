@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import redis.asyncio
+from redis.asyncio.client import Pipeline
+
+from src.middleware.redis_calls import RedisCallsMiddleware
+from src.services.metrics import metrics
+from src.services.redis import CountingRedis, RedisBatch, get_redis, request_calls
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestRedisBatch(unittest.IsolatedAsyncioTestCase):
+
+    async def test_results_by_name(self):
+        await get_redis().set("a", "1")
+        batch = RedisBatch()
+        batch.queue("value", "get", "a")
+        batch.queue("counter", "incr", "b")
+        batch.queue("missing", "exists", "c")
+        self.assertEqual(await batch.send(), {"value": "1", "counter": 1, "missing": 0})
+
+    async def test_empty_batch(self):
+        self.assertEqual(await RedisBatch().send(), {})
+
+
+class TestRoundTrips(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.client = CountingRedis()
+
+    async def test_commands_and_pipelines_are_counted(self):
+        calls = [0, 0]
+        token = request_calls.set(calls)
+        try:
+            with patch.object(redis.asyncio.Redis, "execute_command", AsyncMock()), \
+                    patch.object(Pipeline, "execute", AsyncMock(return_value=[None, 1])):
+                await self.client.get("a")
+                pipeline = self.client.pipeline(transaction=False)
+                pipeline.get("a")
+                pipeline.incr("b")
+                await pipeline.execute()
+        finally:
+            request_calls.reset(token)
+        self.assertEqual(calls, [2, 3])
+
+    async def test_middleware_records_metrics(self):
+        async def app(scope, receive, send):
+            with patch.object(redis.asyncio.Redis, "execute_command", AsyncMock()):
+                await self.client.get("a")
+                await self.client.get("b")
+
+        requests = metrics.value("redis_requests_total", round_trips="2")
+        round_trips = metrics.value("redis_round_trips_total")
+        await RedisCallsMiddleware(app)({"type": "http", "method": "GET"}, None, None)
+        self.assertEqual(metrics.value("redis_requests_total", round_trips="2"), requests + 1)
+        self.assertEqual(metrics.value("redis_round_trips_total"), round_trips + 2)
+        self.assertIsNone(request_calls.get())
+
+
+if __name__ == '__main__':
+    unittest.main()
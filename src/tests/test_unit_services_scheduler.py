@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.services.scheduler import Scheduler
+
+
+class TestScheduler(unittest.IsolatedAsyncioTestCase):
+
+    @pytest.fixture(autouse=True)
+    def use_fake_redis(self, fake_redis):
+        self.redis = fake_redis
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.day = date(2023, 5, 15)
+
+    async def test_runs_once_per_day(self):
+        job = AsyncMock()
+        self.assertTrue(await self.scheduler.run_once("digest", self.day, job))
+        self.assertFalse(await self.scheduler.run_once("digest", self.day, job))
+        job.assert_awaited_once_with(self.day)
+        self.assertTrue(await self.scheduler.run_once("digest", date(2023, 5, 16), job))
+
+    async def test_lock_of_other_worker(self):
+        self.redis.data["scheduler:digest:2023-05-15"] = "other worker"
+        job = AsyncMock()
+        self.assertFalse(await self.scheduler.run_once("digest", self.day, job))
+        job.assert_not_awaited()
+        self.assertEqual(self.redis.data["scheduler:digest:2023-05-15"], "other worker")
+
+    async def test_failed_job_keeps_lock_of_other_worker(self):
+        async def outlive_lock(day):
+            # The lock has expired during the run and another worker has taken it.
+            self.redis.data["scheduler:digest:2023-05-15"] = "other worker"
+            raise RuntimeError("failed")
+
+        self.assertTrue(await self.scheduler.run_once("digest", self.day, outlive_lock))
+        self.assertEqual(self.redis.data["scheduler:digest:2023-05-15"], "other worker")
+
+    async def test_failed_job_releases_lock(self):
+        job = AsyncMock(side_effect=[RuntimeError("failed"), None])
+        self.assertTrue(await self.scheduler.run_once("digest", self.day, job))
+        self.assertTrue(await self.scheduler.run_once("digest", self.day, job))
+        self.assertEqual(job.await_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
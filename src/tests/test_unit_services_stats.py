@@ -0,0 +1,49 @@
+import unittest
+from datetime import date
+
+import pytest
+
+from src.services.events import contact_changed
+from src.services.stats import get_cached_stats, cache_stats
+
+
+class TestStatsCache(unittest.IsolatedAsyncioTestCase):
+
+    @pytest.fixture(autouse=True)
+    def use_fake_redis(self, fake_redis):
+        self.redis = fake_redis
+
+    def setUp(self):
+        self.stats = {"total": 1, "added_per_week": [{"week": date(2023, 5, 1), "count": 1}]}
+
+    async def test_miss_then_hit(self):
+        version, stats = await get_cached_stats(1)
+        self.assertIsNone(stats)
+        await cache_stats(1, version, self.stats)
+        _, stats = await get_cached_stats(1)
+        self.assertEqual(stats, {"total": 1, "added_per_week": [{"week": "2023-05-01", "count": 1}]})
+
+    async def test_change_invalidates(self):
+        version, _ = await get_cached_stats(1)
+        await cache_stats(1, version, self.stats)
+        await contact_changed(1, "created", [2])
+        _, stats = await get_cached_stats(1)
+        self.assertIsNone(stats)
+
+    async def test_change_during_computation(self):
+        version, _ = await get_cached_stats(1)
+        await contact_changed(1, "removed", [2])
+        await cache_stats(1, version, self.stats)
+        _, stats = await get_cached_stats(1)
+        self.assertIsNone(stats)
+
+    async def test_other_user_is_not_invalidated(self):
+        version, _ = await get_cached_stats(1)
+        await cache_stats(1, version, self.stats)
+        await contact_changed(2, "created", [3])
+        _, stats = await get_cached_stats(1)
+        self.assertIsNotNone(stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
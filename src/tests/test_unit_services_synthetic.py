@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, func, select
+
+from src.database.bulk import chunks
+from src.database.models import Base, Contact, User
+from src.seed import seed, split
+from src.services.normalize import normalize_email, normalize_phone
+from src.services.synthetic import generate_contacts, generate_user
+
+
+class TestSynthetic(unittest.TestCase):
+
+    def setUp(self):
+        self.today = date(2024, 5, 1)
+        self.now = datetime(2024, 5, 1, 12)
+
+    def contacts(self, user_id, seed=1, mean=50):
+        return list(generate_contacts(user_id, mean, 1000, self.today, self.now, seed))
+
+    def test_same_seed_same_data(self):
+        self.assertEqual(self.contacts(3), self.contacts(3))
+        self.assertEqual(generate_user(3, "hash", self.now, 1), generate_user(3, "hash", self.now, 1))
+        self.assertNotEqual(self.contacts(3), self.contacts(3, seed=2))
+        self.assertNotEqual(self.contacts(3), self.contacts(4))
+
+    def test_rows_fit_the_schema(self):
+        rows = [row for user_id in range(1, 30) for row in self.contacts(user_id)]
+        self.assertTrue(rows)
+        for (name, surname, phone, email, birthday, email_key, phone_key, domain, e164, reversed_phone, created_at,
+             user_id) in rows:
+            self.assertLessEqual(len(phone), 12)
+            self.assertLessEqual(len(email), 50)
+            self.assertEqual(email_key, normalize_email(email))
+            self.assertEqual(phone_key, normalize_phone(phone))
+            self.assertEqual(domain, email_key.rpartition("@")[2])
+            self.assertEqual(reversed_phone, e164[:0:-1])
+            self.assertTrue(date(1930, 1, 1) < birthday < date(2007, 1, 1))
+            self.assertLessEqual(created_at, self.now)
+
+    def test_counts_are_skewed(self):
+        counts = sorted(len(self.contacts(user_id)) for user_id in range(1, 201))
+        self.assertAlmostEqual(sum(counts) / len(counts), 50, delta=15)
+        self.assertLess(counts[len(counts) // 2], 50)
+        self.assertGreater(counts[-1], 150)
+
+    def test_split(self):
+        self.assertEqual(split(1, 11, 3), [(1, 5), (5, 9), (9, 11)])
+        self.assertEqual(split(1, 3, 8), [(1, 2), (2, 3)])
+        self.assertEqual(split(1, 1, 4), [])
+
+    def test_chunks(self):
+        self.assertEqual(list(chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+
+class TestSeed(unittest.TestCase):
+
+    def test_seed_sqlite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{os.path.join(directory, 'seed.db')}"
+            engine = create_engine(url)
+            Base.metadata.create_all(engine)
+            users, contacts = seed(url, 5, 20, 1, 4, 7, "password")
+            with engine.connect() as connection:
+                self.assertEqual(connection.execute(select(func.count(User.id))).scalar(), 5)
+                self.assertEqual(connection.execute(select(func.count(Contact.id))).scalar(), contacts)
+                self.assertEqual(connection.execute(select(func.count(func.distinct(Contact.user_id)))).scalar(),
+                                 len({row[-1] for user_id in range(1, 6) for row in
+                                      generate_contacts(user_id, 20, 1000, date.today(), datetime.now(), 1)}))
+            # Seeding again adds users after the existing ones.
+            self.assertEqual(seed(url, 2, 0, 1, 1, 7, "password"), (2, 0))
+            with engine.connect() as connection:
+                self.assertEqual(connection.execute(select(func.max(User.id))).scalar(), 7)
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()